@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class AccountConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "account"
+
+    def ready(self):
+        import account.signals  # noqa: F401
+        from account import metrics, replicas
+
+        replicas.check_configuration()
+
+        if settings.METRICS["ENABLED"]:
+            connection_created.connect(metrics.install_query_counter)
@@ -0,0 +1,190 @@
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+
+from user.authentication import CachedTokenAuthentication
+from account import comment_threads, conditional, graph, metrics, realtime
+from account.models import Profile, Post
+from account.pagination import FeedPagination
+from account.query_planning import plan_queryset
+from account.renderers import FastJSONRenderer
+from account.representation_cache import acached_representations
+from account.serializers import (
+    PostListSerializer,
+    PostRetrieveSerializer,
+    ProfileRetrieveSerializer,
+)
+
+
+class AsyncAPIView(View):
+    """Minimal async-native counterpart of a read-only DRF view.
+
+    Authentication goes through the async path of
+    ``CachedTokenAuthentication`` and handlers only use the async ORM, so
+    under ASGI a request does not hold a worker thread while it waits on
+    the cache or the database. Responses are rendered exactly like the
+    sync viewsets render them.
+    """
+
+    http_method_names = ["get", "head", "options"]
+    authentication = CachedTokenAuthentication()
+    renderer = FastJSONRenderer()
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            user_auth = await self.authentication.aauthenticate(request)
+            if user_auth is None:
+                raise exceptions.NotAuthenticated()
+            self.request = Request(request)
+            self.request.user, self.request.auth = user_auth
+            return await super().dispatch(self.request, *args, **kwargs)
+        except exceptions.APIException as error:
+            response = self.render({"detail": error.detail}, error.status_code)
+            if isinstance(
+                error, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)
+            ):
+                response["WWW-Authenticate"] = self.authentication.authenticate_header(
+                    request
+                )
+            return response
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        return HttpResponse(
+            self.renderer.render(data),
+            status=status_code,
+            content_type=self.renderer.media_type,
+        )
+
+    def get_serializer_context(self):
+        return {"request": self.request, "format": None, "view": self}
+
+    async def get_object(self, queryset, **lookup):
+        try:
+            return await queryset.aget(**lookup)
+        except queryset.model.DoesNotExist:
+            raise exceptions.NotFound(
+                f"No {queryset.model._meta.object_name} matches the given query."
+            )
+
+    async def validators(self, serializer_class, objects, model, relations, *extra):
+        return conditional.validators(
+            self.request,
+            serializer_class,
+            await conditional.aversioned(
+                conditional.dependencies(objects, model, relations)
+            ),
+            *extra,
+        )
+
+    async def retrieve(self, queryset, serializer_class, prepare=None, **lookup):
+        # prefetches only run for objects missing from the representation cache
+        queryset = plan_queryset(queryset, serializer_class)
+        obj = await self.get_object(queryset.prefetch_related(None), **lookup)
+        validators = await self.validators(serializer_class, [obj], type(obj), ())
+        response = conditional.not_modified(self.request, *validators)
+        if response is not None:
+            return response
+
+        representations = await acached_representations(
+            [obj],
+            serializer_class,
+            self.get_serializer_context(),
+            prefetches=queryset._prefetch_related_lookups,
+            prepare=prepare,
+        )
+        response = self.render(representations[0])
+        conditional.add_validators(response, *validators)
+        return response
+
+
+class FeedView(AsyncAPIView):
+    """Async home feed, same results and cursors as ``PostViewSet.list``."""
+
+    pagination_class = FeedPagination
+    serializer_class = PostListSerializer
+
+    async def get(self, request):
+        queryset = plan_queryset(Post.objects.all(), self.serializer_class)
+        hash_tags = request.query_params.get("tags")
+        if hash_tags:
+            queryset = queryset.filter(tags__name__icontains=hash_tags)
+
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(queryset, request)
+        validators = await self.validators(
+            self.serializer_class,
+            page,
+            Post,
+            ("author",),
+            paginator.get_next_link(),
+        )
+        response = conditional.not_modified(request, *validators)
+        if response is not None:
+            return response
+
+        await comment_threads.aattach(page)
+        serializer = self.serializer_class(
+            page, many=True, context=self.get_serializer_context()
+        )
+        with metrics.serializing():
+            data = serializer.data
+        response = self.render(paginator.get_paginated_response(data).data)
+        conditional.add_validators(response, *validators)
+        return response
+
+
+class PostDetailView(AsyncAPIView):
+    """Async counterpart of ``PostViewSet.retrieve``."""
+
+    serializer_class = PostRetrieveSerializer
+
+    async def get(self, request, pk):
+        return await self.retrieve(
+            Post.objects.all(),
+            self.serializer_class,
+            prepare=comment_threads.aattach,
+            pk=pk,
+        )
+
+
+class ProfileDetailView(AsyncAPIView):
+    """Async counterpart of ``ProfileViewSet.retrieve``."""
+
+    serializer_class = ProfileRetrieveSerializer
+
+    async def get(self, request, pk):
+        return await self.retrieve(
+            Profile.objects.filter(user=request.user),
+            self.serializer_class,
+            prepare=graph.aattach_counts,
+            pk=pk,
+        )
+
+
+class EventStreamView(AsyncAPIView):
+    """Server-sent events about followed authors' new posts and comments
+    and reactions on the user's posts.
+
+    Every connection gets a bounded buffer, when a client falls behind the
+    oldest events are dropped and a ``dropped`` event tells it to refresh
+    from the feed. Follows made after connecting apply on reconnect.
+    """
+
+    async def get(self, request):
+        hub = realtime.get_hub()
+        topics = await realtime.atopics_for(request.user.profile)
+        response = StreamingHttpResponse(
+            realtime.stream(hub.subscribe(topics)),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
@@ -0,0 +1,404 @@
+import json
+import math
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from http.client import HTTPConnection
+
+from django.core.asgi import get_asgi_application
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import Client
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.reverse import reverse
+from taggit.models import Tag
+
+from account.fast_serializers import compile_serializer
+from account.models import Profile, Post, Reaction
+from account.query_planning import plan_queryset
+from account.serializers import (
+    PostListSerializer,
+    ProfileListSerializer,
+    ReactionListSerializer,
+)
+
+try:
+    import uvicorn
+except ImportError:
+    uvicorn = None
+
+QUERY_COUNT_HEADER = "X-Benchmark-Queries"
+
+
+class QueryCounter:
+    """Count the queries executed on every connection of the current thread."""
+
+    def __init__(self):
+        self.count = 0
+        self._stack = ExitStack()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+
+class CountQueries:
+    """WSGI wrapper reporting the query count of a response in a header."""
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        counter = QueryCounter()
+
+        def counted_start_response(status, headers, exc_info=None):
+            headers = [*headers, (QUERY_COUNT_HEADER, str(counter.count))]
+            return start_response(status, headers, exc_info)
+
+        with counter:
+            return self.application(environ, counted_start_response)
+
+
+class ClientDriver:
+    """Send requests in-process through the Django test client."""
+
+    concurrent = False
+
+    def __init__(self):
+        self.client = Client(raise_request_exception=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def send(self, method, path, body, token):
+        with QueryCounter() as counter:
+            response = self.client.generic(
+                method,
+                path,
+                data=json.dumps(body) if body is not None else "",
+                content_type="application/json",
+                HTTP_AUTHORIZATION=f"Token {token}",
+            )
+        return response.status_code, counter.count
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class ServerDriver:
+    """Send requests over HTTP to a threaded WSGI server on a local port."""
+
+    concurrent = True
+
+    def __enter__(self):
+        self.server = ThreadedWSGIServer(("127.0.0.1", 0), QuietRequestHandler)
+        self.server.set_app(CountQueries(get_wsgi_application()))
+        self.address = self.server.server_address
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def send(self, method, path, body, token):
+        connection = HTTPConnection(*self.address)
+        try:
+            connection.request(
+                method,
+                path,
+                body=json.dumps(body) if body is not None else None,
+                headers={
+                    "Authorization": f"Token {token}",
+                    "Content-Type": "application/json",
+                    "Connection": "close",
+                },
+            )
+            response = connection.getresponse()
+            response.read()
+        finally:
+            connection.close()
+        queries = response.getheader(QUERY_COUNT_HEADER)
+        return response.status, int(queries) if queries is not None else None
+
+
+class AsgiServerDriver(ServerDriver):
+    """Send requests over HTTP to uvicorn serving the ASGI application.
+
+    Queries are not counted, the async ORM runs them in other threads.
+    """
+
+    def __enter__(self):
+        if uvicorn is None:
+            raise RuntimeError("uvicorn is required to benchmark the ASGI server.")
+        listener = socket.socket()
+        listener.bind(("127.0.0.1", 0))
+        self.address = listener.getsockname()
+        self.server = uvicorn.Server(
+            uvicorn.Config(
+                get_asgi_application(),
+                lifespan="off",
+                log_level="warning",
+                access_log=False,
+            )
+        )
+        self.thread = threading.Thread(
+            target=self.server.run, kwargs={"sockets": [listener]}, daemon=True
+        )
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+class Workload:
+    """Random requests against existing rows, on behalf of sampled users."""
+
+    def __init__(self, users=50, seed=0):
+        self.rng = random.Random(seed)
+        profiles = list(Profile.objects.values_list("pk", "user_id", "first_name"))
+        if not profiles:
+            raise ValueError("There are no profiles, seed the database first.")
+        self.members = [
+            (profile_id, Token.objects.get_or_create(user_id=user_id)[0].key)
+            for profile_id, user_id, _ in self.rng.sample(
+                profiles, min(users, len(profiles))
+            )
+        ]
+        self.names = [first_name for _, _, first_name in profiles]
+        self.post_ids = list(
+            Post.objects.order_by("-pk").values_list("pk", flat=True)[:10000]
+        )
+        self.words = list(Tag.objects.values_list("name", flat=True)[:1000]) or ["post"]
+
+    def post_id(self):
+        return self.rng.choice(self.post_ids)
+
+    def plan(self, scenario, count):
+        """Draw ``count`` ``(method, path, body, token)`` requests."""
+        requests = []
+        for _ in range(count):
+            profile_id, token = self.rng.choice(self.members)
+            method, path, body = SCENARIOS[scenario](self, profile_id)
+            requests.append((method, path, body, token))
+        return requests
+
+
+def with_query(path, **params):
+    return path + "?" + "&".join(f"{key}={value}" for key, value in params.items())
+
+
+SCENARIOS = {
+    "posts.list": lambda workload, profile_id: (
+        "GET",
+        reverse("account:post-list"),
+        None,
+    ),
+    "posts.retrieve": lambda workload, profile_id: (
+        "GET",
+        reverse("account:post-detail", args=[workload.post_id()]),
+        None,
+    ),
+    "posts.search": lambda workload, profile_id: (
+        "GET",
+        with_query(
+            reverse("account:post-search"), q=workload.rng.choice(workload.words)
+        ),
+        None,
+    ),
+    "profiles.list": lambda workload, profile_id: (
+        "GET",
+        reverse("account:profile-list"),
+        None,
+    ),
+    "profiles.retrieve": lambda workload, profile_id: (
+        "GET",
+        reverse("account:profile-detail", args=[profile_id]),
+        None,
+    ),
+    "profiles.search": lambda workload, profile_id: (
+        "GET",
+        with_query(
+            reverse("account:profile-search"),
+            q=workload.rng.choice(workload.names)[:3],
+        ),
+        None,
+    ),
+    "comments.list": lambda workload, profile_id: (
+        "GET",
+        with_query(reverse("account:comment-list"), post=workload.post_id()),
+        None,
+    ),
+    "reactions.list": lambda workload, profile_id: (
+        "GET",
+        reverse("account:reaction-list"),
+        None,
+    ),
+    "async.posts.list": lambda workload, profile_id: (
+        "GET",
+        reverse("account:async-post-list"),
+        None,
+    ),
+    "async.posts.retrieve": lambda workload, profile_id: (
+        "GET",
+        reverse("account:async-post-detail", args=[workload.post_id()]),
+        None,
+    ),
+    "async.profiles.retrieve": lambda workload, profile_id: (
+        "GET",
+        reverse("account:async-profile-detail", args=[profile_id]),
+        None,
+    ),
+    "reactions.create": lambda workload, profile_id: (
+        "POST",
+        reverse("account:reaction-list"),
+        {
+            "post": workload.post_id(),
+            "reaction_type": workload.rng.choice(Reaction.ReactionChoices.values),
+        },
+    ),
+}
+
+
+def percentile(ordered, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(latency * 1000 for latency, _, _ in samples)
+    queries = [count for _, _, count in samples if count is not None]
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, status, _ in samples if status >= 400),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "queries_per_request": (
+            round(sum(queries) / len(queries), 2) if queries else None
+        ),
+        "max_queries": max(queries, default=None),
+    }
+
+
+def run_scenario(driver, requests, concurrency=1):
+    def send(request):
+        started = time.perf_counter()
+        status, queries = driver.send(*request)
+        return time.perf_counter() - started, status, queries
+
+    started = time.perf_counter()
+    if driver.concurrent and concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(send, requests))
+    else:
+        samples = [send(request) for request in requests]
+    return summarize(samples, time.perf_counter() - started)
+
+
+def compare(current, baseline):
+    """Lines describing p95 and throughput changes against ``baseline``."""
+    lines = []
+    for name, stats in current["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            continue
+        p95 = stats["p95_ms"] / previous["p95_ms"] if previous["p95_ms"] else 0
+        rps = (
+            stats["throughput_rps"] / previous["throughput_rps"]
+            if previous["throughput_rps"]
+            else 0
+        )
+        lines.append(
+            f"{name}: p95 {previous['p95_ms']} -> {stats['p95_ms']} ms "
+            f"(x{p95:.2f}), throughput {previous['throughput_rps']} -> "
+            f"{stats['throughput_rps']} rps (x{rps:.2f}), queries "
+            f"{previous['queries_per_request']} -> {stats['queries_per_request']}"
+        )
+    return lines
+
+
+SERIALIZER_CASES = {
+    # tags are loaded per post like in the post list: the taggit prefetch
+    # does not keep the order of post.tags.all()
+    "posts": (
+        PostListSerializer,
+        lambda: Post.objects.select_related("author").order_by("-pub_date", "-id"),
+    ),
+    "profiles": (
+        ProfileListSerializer,
+        lambda: plan_queryset(Profile.objects.order_by("id"), ProfileListSerializer),
+    ),
+    "reactions": (
+        ReactionListSerializer,
+        lambda: plan_queryset(Reaction.objects.order_by("id"), ReactionListSerializer),
+    ),
+}
+
+
+def best_of(function, repeat):
+    """Shortest of ``repeat`` timed calls and the result of the last one."""
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def compare_serializers(serializer_class, queryset, context, repeat=5):
+    """Time loading and rendering ``queryset`` with the serializer against
+    its compiled row serializer, which loads rows of the same queryset."""
+    compiled = compile_serializer(serializer_class)
+    if compiled is None:
+        raise ValueError(f"{serializer_class.__name__} does not compile.")
+
+    def regular():
+        return serializer_class(list(queryset.all()), many=True, context=context).data
+
+    def fast():
+        return compiled.render(compiled.rows(queryset), context)
+
+    with QueryCounter() as regular_queries:
+        regular_time, regular_data = best_of(regular, repeat)
+    with QueryCounter() as fast_queries:
+        fast_time, fast_data = best_of(fast, repeat)
+
+    rows = max(len(fast_data), 1)
+    renderer = JSONRenderer()
+    return {
+        "rows": len(fast_data),
+        "regular_us_per_row": round(regular_time / rows * 1e6, 2),
+        "fast_us_per_row": round(fast_time / rows * 1e6, 2),
+        "speedup": round(regular_time / fast_time, 2) if fast_time else None,
+        "regular_queries": regular_queries.count // repeat,
+        "fast_queries": fast_queries.count // repeat,
+        "identical": renderer.render(regular_data) == renderer.render(fast_data),
+    }
@@ -0,0 +1,158 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models.signals import m2m_changed
+
+from account import counters, realtime
+from account.models import Profile, Post, Reaction
+
+Follow = Profile.following.through
+
+# attempts of a bulk write racing concurrent inserts of the same rows
+CONFLICT_ATTEMPTS = 3
+
+
+def _unique(values):
+    return list(dict.fromkeys(values))
+
+
+def _retry_on_conflict(write):
+    """Run ``write`` in a transaction, again from the start when a
+    concurrent request inserted one of its rows first."""
+    for attempt in range(CONFLICT_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return write()
+        except IntegrityError:
+            if attempt == CONFLICT_ATTEMPTS - 1:
+                raise
+
+
+def _send_follow_signal(profile, action, pk_set):
+    # bulk_create/delete skip m2m_changed, timelines and caches rely on it
+    m2m_changed.send(
+        sender=Follow,
+        instance=profile,
+        action=action,
+        reverse=False,
+        model=Profile,
+        pk_set=set(pk_set),
+        using=Follow.objects.db,
+    )
+
+
+def bulk_follow(profile, follow_ids=(), unfollow_ids=()):
+    """Follow and unfollow many profiles at once.
+
+    Returns one ``{"id", "action", "status"}`` result per requested id.
+    """
+    follow_ids, unfollow_ids = _unique(follow_ids), _unique(unfollow_ids)
+    return _retry_on_conflict(lambda: _bulk_follow(profile, follow_ids, unfollow_ids))
+
+
+def _bulk_follow(profile, follow_ids, unfollow_ids):
+    results = []
+    known = set(
+        Profile.objects.filter(pk__in=follow_ids + unfollow_ids).values_list(
+            "pk", flat=True
+        )
+    )
+    following = set(
+        Follow.objects.filter(
+            from_profile=profile, to_profile_id__in=follow_ids + unfollow_ids
+        ).values_list("to_profile_id", flat=True)
+    )
+
+    added = []
+    for pk in follow_ids:
+        if pk not in known:
+            state = "not_found"
+        elif pk == profile.pk:
+            state = "invalid"
+        elif pk in following:
+            state = "already_following"
+        else:
+            state = "followed"
+            added.append(pk)
+        results.append({"id": pk, "action": "follow", "status": state})
+
+    removed = []
+    for pk in unfollow_ids:
+        if pk not in known:
+            state = "not_found"
+        elif pk not in following:
+            state = "not_following"
+        else:
+            state = "unfollowed"
+            removed.append(pk)
+        results.append({"id": pk, "action": "unfollow", "status": state})
+
+    if added:
+        _send_follow_signal(profile, "pre_add", added)
+        Follow.objects.bulk_create(
+            [Follow(from_profile=profile, to_profile_id=pk) for pk in added]
+        )
+        _send_follow_signal(profile, "post_add", added)
+    if removed:
+        _send_follow_signal(profile, "pre_remove", removed)
+        Follow.objects.filter(from_profile=profile, to_profile_id__in=removed).delete()
+        _send_follow_signal(profile, "post_remove", removed)
+
+    return results
+
+
+def bulk_react(profile, reactions):
+    """Create or switch the profile's reactions to many posts.
+
+    ``reactions`` is a list of ``{"post", "reaction_type"}``; when a post
+    appears more than once the last entry wins. Returns one
+    ``{"post", "reaction_type", "status"}`` result per post.
+    """
+    wanted = {item["post"]: item["reaction_type"] for item in reactions}
+    return _retry_on_conflict(lambda: _bulk_react(profile, wanted))
+
+
+def _bulk_react(profile, wanted):
+    results = []
+    known = set(Post.objects.filter(pk__in=wanted).values_list("pk", flat=True))
+    existing = {
+        reaction.post_id: reaction
+        for reaction in Reaction.objects.select_for_update().filter(
+            user=profile, post_id__in=wanted
+        )
+    }
+
+    created, updated = [], []
+    transitions = defaultdict(list)
+    for post_id, reaction_type in wanted.items():
+        reaction = existing.get(post_id)
+        if post_id not in known:
+            state = "not_found"
+        elif reaction is None:
+            state = "created"
+            created.append(
+                Reaction(user=profile, post_id=post_id, reaction_type=reaction_type)
+            )
+            transitions[(None, reaction_type)].append(post_id)
+        elif reaction.reaction_type == reaction_type:
+            state = "unchanged"
+        else:
+            state = "updated"
+            transitions[(reaction.reaction_type, reaction_type)].append(post_id)
+            reaction.reaction_type = reaction_type
+            updated.append(reaction)
+        results.append(
+            {"post": post_id, "reaction_type": reaction_type, "status": state}
+        )
+
+    # a reaction created concurrently fails the insert instead of being
+    # counted and published as created
+    Reaction.objects.bulk_create(created)
+    Reaction.objects.bulk_update(updated, ["reaction_type"])
+    counters.reactions_changed(transitions)
+    realtime.reactions_changed(
+        profile.pk,
+        {reaction.post_id: reaction.reaction_type for reaction in created + updated},
+    )
+
+    return results
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
+
+from account.models import Comment
+from account.pagination import CommentPagination
+
+
+def ranked_comments(post_ids, size):
+    return (
+        Comment.objects.filter(post_id__in=post_ids)
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F("post_id"),
+                order_by=(F("created_at").desc(), F("id").desc()),
+            )
+        )
+        # one extra row tells whether the thread continues
+        .filter(position__lte=size + 1)
+        .order_by("post_id", "position")
+    )
+
+
+def collect(threads, comments, size):
+    for comment in comments:
+        thread, has_more = threads[comment.post_id]
+        if comment.position > size:
+            threads[comment.post_id] = (thread, True)
+        else:
+            thread.append(comment)
+    return threads
+
+
+def latest_comments(post_ids, size=None):
+    """Return ``{post_id: (comments, has_more)}`` with the newest ``size``
+    comments of every post, loaded by a single windowed query."""
+    size = settings.COMMENT_THREAD_SIZE if size is None else size
+    threads = {post_id: ([], False) for post_id in post_ids}
+    if not threads or size <= 0:
+        return threads
+    return collect(threads, ranked_comments(list(threads), size), size)
+
+
+async def alatest_comments(post_ids, size=None):
+    size = settings.COMMENT_THREAD_SIZE if size is None else size
+    threads = {post_id: ([], False) for post_id in post_ids}
+    if not threads or size <= 0:
+        return threads
+    comments = [comment async for comment in ranked_comments(list(threads), size)]
+    return collect(threads, comments, size)
+
+
+def attach(posts, size=None):
+    """Store the latest comments of ``posts`` on ``post.comment_thread``."""
+    posts = [post for post in posts if not hasattr(post, "comment_thread")]
+    threads = latest_comments([post.pk for post in posts], size)
+    for post in posts:
+        post.comment_thread = threads[post.pk]
+
+
+async def aattach(posts, size=None):
+    posts = [post for post in posts if not hasattr(post, "comment_thread")]
+    threads = await alatest_comments([post.pk for post in posts], size)
+    for post in posts:
+        post.comment_thread = threads[post.pk]
+
+
+def next_link(request, post_id, last_comment):
+    """URL of the comment list continuing a thread after ``last_comment``."""
+    url = reverse("account:comment-list", request=request)
+    url = replace_query_param(url, "post", post_id)
+    pagination = CommentPagination()
+    cursor = pagination.encode_cursor(pagination.position_of(last_comment))
+    return replace_query_param(url, pagination.cursor_query_param, cursor)
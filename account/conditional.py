@@ -0,0 +1,143 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from account.representation_cache import aversions, versions
+
+
+class NotModified(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def value_of(obj, name):
+    return obj[name] if isinstance(obj, dict) else getattr(obj, name)
+
+
+def dependencies(objects, model, relations=()):
+    """``(model, pks)`` pairs whose versions a page of ``objects`` (instances
+    or rows) is rendered from: the objects and the forward relations they
+    embed."""
+    pk = model._meta.pk.attname
+    pairs = [(model, [value_of(obj, pk) for obj in objects])]
+    for name in relations:
+        field = model._meta.get_field(name)
+        pairs.append(
+            (field.related_model, [value_of(obj, field.attname) for obj in objects])
+        )
+    return pairs
+
+
+def versioned(pairs):
+    """``(model, pk, version)`` triples of ``(model, pks)`` pairs."""
+    triples = []
+    for model, pks in pairs:
+        object_versions = versions(model, {pk for pk in pks if pk is not None})
+        triples.extend((model, pk, object_versions.get(pk)) for pk in pks)
+    return triples
+
+
+async def aversioned(pairs):
+    triples = []
+    for model, pks in pairs:
+        object_versions = await aversions(model, {pk for pk in pks if pk is not None})
+        triples.extend((model, pk, object_versions.get(pk)) for pk in pks)
+    return triples
+
+
+def validators(request, serializer_class, versioned, *extra):
+    """``(etag, last_modified)`` of a response rendered with
+    ``serializer_class`` from objects at the given versions.
+
+    ``versioned`` are ``(model, pk, version)`` triples; the versions are
+    ``time_ns()`` tokens taken when the objects last changed, the newest
+    one is the modification time. ``extra`` covers whatever else the body
+    depends on, like the next page link.
+    """
+    accepted = getattr(request, "accepted_renderer", None)
+    key = repr(
+        (
+            serializer_class.__module__,
+            serializer_class.__qualname__,
+            accepted.format if accepted is not None else "json",
+            f"{request.scheme}://{request.get_host()}",
+            [
+                (model._meta.label_lower, pk, version)
+                for model, pk, version in versioned
+            ],
+            extra,
+        )
+    )
+    etag = f'"{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}"'
+    last_modified = max(
+        (version for _, _, version in versioned if version is not None), default=None
+    )
+    return etag, None if last_modified is None else last_modified // 10**9
+
+
+def not_modified(request, etag, last_modified):
+    """A 304 (or 412) response when the request's preconditions are
+    answered by the validators alone, otherwise ``None``."""
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        add_validators(response, etag, last_modified)
+    return response
+
+
+def add_validators(response, etag, last_modified):
+    response.headers.setdefault("ETag", etag)
+    if last_modified is not None:
+        response.headers.setdefault("Last-Modified", http_date(last_modified))
+
+
+class ConditionalGetMixin:
+    """Answer conditional GETs with 304 before anything is serialized.
+
+    ``conditional_actions`` maps the actions to the forward relations
+    their representations embed. The ETag and Last-Modified of a response
+    derive from the representation versions of the objects and those
+    relations, checked as soon as ``get_object`` or ``paginate_queryset``
+    has loaded them.
+    """
+
+    conditional_actions = {}
+
+    def check_not_modified(self, objects, model, *extra):
+        relations = self.conditional_actions.get(self.action)
+        if relations is None or self.request.method not in ("GET", "HEAD"):
+            return
+        self.conditional_validators = validators(
+            self.request,
+            self.get_serializer_class(),
+            versioned(dependencies(objects, model, relations)),
+            *extra,
+        )
+        response = not_modified(self.request, *self.conditional_validators)
+        if response is not None:
+            raise NotModified(response)
+
+    def get_object(self):
+        obj = super().get_object()
+        self.check_not_modified([obj], type(obj))
+        return obj
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.check_not_modified(
+                page, queryset.model, self.paginator.get_next_link()
+            )
+        return page
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, "conditional_validators", None)
+        if validators is not None and response.status_code == 200:
+            add_validators(response, *validators)
+        return response
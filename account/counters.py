@@ -0,0 +1,78 @@
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from account import representation_cache
+from account.models import Post, Reaction, Comment
+
+REACTION_COUNTERS = {
+    Reaction.ReactionChoices.LIKE: "like_count",
+    Reaction.ReactionChoices.DISLIKE: "dislike_count",
+}
+
+
+def _increment(name):
+    return F(name) + 1
+
+
+def _decrement(name):
+    return Greatest(F(name) - 1, Value(0))
+
+
+def _reaction_changes(old_type, new_type):
+    changes = {}
+    if old_type == new_type:
+        return changes
+    if old_type in REACTION_COUNTERS:
+        changes[REACTION_COUNTERS[old_type]] = _decrement(REACTION_COUNTERS[old_type])
+    if new_type in REACTION_COUNTERS:
+        changes[REACTION_COUNTERS[new_type]] = _increment(REACTION_COUNTERS[new_type])
+    return changes
+
+
+def reaction_changed(post_id, old_type=None, new_type=None):
+    """Move a post's reaction counters from ``old_type`` to ``new_type``.
+
+    Either side may be ``None`` for a created or deleted reaction. Must run
+    in the same transaction as the reaction write.
+    """
+    reactions_changed({(old_type, new_type): [post_id]})
+
+
+def reactions_changed(transitions):
+    """Apply ``{(old_type, new_type): [post_id, ...]}`` with one ``UPDATE``
+    per kind of transition."""
+    for (old_type, new_type), post_ids in transitions.items():
+        changes = _reaction_changes(old_type, new_type)
+        if changes and post_ids:
+            Post.objects.filter(pk__in=post_ids).update(**changes)
+            representation_cache.bump(Post, post_ids)
+
+
+def comment_added(post_id):
+    Post.objects.filter(pk=post_id).update(comment_count=_increment("comment_count"))
+    representation_cache.bump(Post, [post_id])
+
+
+def comment_removed(post_id):
+    Post.objects.filter(pk=post_id).update(comment_count=_decrement("comment_count"))
+    representation_cache.bump(Post, [post_id])
+
+
+def _count(queryset):
+    counted = queryset.values("post").annotate(total=Count("id")).values("total")
+    return Coalesce(Subquery(counted), Value(0))
+
+
+def reconcile(queryset):
+    """Recompute the counters of ``queryset`` from the source tables."""
+    reactions = Reaction.objects.filter(post=OuterRef("pk"))
+    representation_cache.bump(Post, list(queryset.values_list("pk", flat=True)))
+    return queryset.update(
+        like_count=_count(
+            reactions.filter(reaction_type=Reaction.ReactionChoices.LIKE)
+        ),
+        dislike_count=_count(
+            reactions.filter(reaction_type=Reaction.ReactionChoices.DISLIKE)
+        ),
+        comment_count=_count(Comment.objects.filter(post=OuterRef("pk"))),
+    )
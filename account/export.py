@@ -0,0 +1,94 @@
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from account.models import Comment, Reaction
+
+CHUNK_SIZE = 500
+
+
+def export_queryset(queryset):
+    """Posts with the relations exported alongside them, in primary key order."""
+    return (
+        queryset.order_by("pk")
+        .only(
+            "id",
+            "title",
+            "author_id",
+            "description",
+            "pub_date",
+            "like_count",
+            "dislike_count",
+            "comment_count",
+        )
+        .prefetch_related(
+            "tags",
+            Prefetch(
+                "post_comments",
+                queryset=Comment.objects.only(
+                    "id", "author_id", "post_id", "description", "created_at"
+                ).order_by("created_at", "id"),
+            ),
+            Prefetch(
+                "reaction_set",
+                queryset=Reaction.objects.only(
+                    "user_id", "post_id", "reaction_type"
+                ).order_by("id"),
+            ),
+        )
+    )
+
+
+def post_record(post):
+    return {
+        "id": post.pk,
+        "title": post.title,
+        "author": post.author_id,
+        "description": post.description,
+        "pub_date": post.pub_date,
+        "tags": sorted(tag.name for tag in post.tags.all()),
+        "like_count": post.like_count,
+        "dislike_count": post.dislike_count,
+        "comment_count": post.comment_count,
+        "comments": [
+            {
+                "id": comment.pk,
+                "author": comment.author_id,
+                "description": comment.description,
+                "created_at": comment.created_at,
+            }
+            for comment in post.post_comments.all()
+        ],
+        "reactions": [
+            {"user": reaction.user_id, "reaction_type": reaction.reaction_type}
+            for reaction in post.reaction_set.all()
+        ],
+    }
+
+
+def ndjson(queryset, chunk_size=CHUNK_SIZE):
+    """Yield one NDJSON encoded post per line.
+
+    Posts are fetched ``chunk_size`` at a time together with their
+    prefetched relations, so memory does not grow with the export.
+    """
+    encoder = DjangoJSONEncoder(separators=(",", ":"), ensure_ascii=False)
+    for post in export_queryset(queryset).iterator(chunk_size=chunk_size):
+        yield (encoder.encode(post_record(post)) + "\n").encode()
+
+
+def gzipped(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export(queryset, compress=False, chunk_size=CHUNK_SIZE):
+    """Byte chunks of the NDJSON export of ``queryset``, gzip compressed
+    when ``compress`` is set."""
+    chunks = ndjson(queryset, chunk_size)
+    return gzipped(chunks) if compress else chunks
@@ -0,0 +1,378 @@
+from functools import lru_cache
+from operator import itemgetter
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import F
+from rest_framework import serializers
+from rest_framework.response import Response
+from taggit.models import CommonGenericTaggedItemBase
+from taggit.serializers import TagListSerializerField
+
+from account import comment_threads, graph, metrics
+from account.query_planning import _model_field
+from account.serializers import (
+    CommentThreadField,
+    FollowCountField,
+    ImageRenditionsField,
+    ThreadCommentSerializer,
+    image_renditions,
+)
+
+# fields whose representation is the model value itself
+PASSTHROUGH = (
+    serializers.ReadOnlyField,
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+)
+
+OWNER = "fast_owner"
+
+
+class Unsupported(Exception):
+    pass
+
+
+class Column:
+    """A field rendered from one ``values()`` column, ``convert`` is applied
+    to non-null values like DRF applies ``to_representation``."""
+
+    def __init__(self, name, column, convert=None):
+        self.name = name
+        self.columns = (column,)
+        if convert is None:
+            self.render = itemgetter(column)
+        else:
+
+            def render(row):
+                value = row[column]
+                return None if value is None else convert(value)
+
+            self.render = render
+
+    def bind(self, ids, context):
+        return self.render
+
+
+class FileColumn:
+    def __init__(self, name, column, storage):
+        self.name = name
+        self.column = column
+        self.columns = (column,)
+        self.storage = storage
+
+    def bind(self, ids, context):
+        column, url, request = self.column, self.storage.url, context.get("request")
+
+        def render(row):
+            value = row[column]
+            if not value:
+                return None
+            # a FieldFile when the row was read from an instance
+            value = getattr(value, "name", value)
+            if request is None:
+                return url(value)
+            return request.build_absolute_uri(url(value))
+
+        return render
+
+
+class RenditionsColumn:
+    def __init__(self, name, column):
+        self.name = name
+        self.column = column
+        self.columns = (column,)
+
+    def bind(self, ids, context):
+        column, request = self.column, context.get("request")
+
+        def render(row):
+            value = row[column]
+            return None if value is None else image_renditions(value, request)
+
+        return render
+
+
+class Tags:
+    """Tag names of the page in one query, in the order taggit returns them."""
+
+    columns = ()
+
+    def __init__(self, name, model, through, pk):
+        self.name = name
+        self.model = model
+        self.through = through
+        self.pk = pk
+
+    def bind(self, ids, context):
+        tags = {pk: [] for pk in ids}
+        tagged = (
+            self.through.objects.filter(
+                content_type=ContentType.objects.get_for_model(self.model),
+                object_id__in=ids,
+            )
+            .order_by("pk")
+            .values_list("object_id", "tag__name")
+        )
+        for object_id, name in tagged:
+            tags[object_id].append(name)
+        pk = self.pk
+        return lambda row: tags[row[pk]]
+
+
+class FollowCounts:
+    columns = ()
+
+    def __init__(self, name, index, pk):
+        self.name = name
+        self.count = (graph.follower_counts, graph.following_counts)[index]
+        self.pk = pk
+
+    def bind(self, ids, context):
+        counts, pk = self.count(ids), self.pk
+        return lambda row: counts[row[pk]]
+
+
+class CommentThreads:
+    columns = ()
+
+    def __init__(self, name, pk):
+        self.name = name
+        self.pk = pk
+        self.comments = compile_serializer(ThreadCommentSerializer)
+
+    def bind(self, ids, context):
+        threads = comment_threads.latest_comments(ids)
+        rendered = iter(
+            self.comments.render(
+                [
+                    comment.__dict__
+                    for thread, _ in threads.values()
+                    for comment in thread
+                ],
+                context,
+            )
+        )
+        results = {
+            pk: [next(rendered) for _ in thread] for pk, (thread, _) in threads.items()
+        }
+        request, pk = context.get("request"), self.pk
+
+        def render(row):
+            thread, has_more = threads[row[pk]]
+            next_link = None
+            if has_more and request is not None:
+                next_link = comment_threads.next_link(request, row[pk], thread[-1])
+            return {"next": next_link, "results": results[row[pk]]}
+
+        return render
+
+
+class Nested:
+    """A many-valued relation rendered by a nested serializer, loaded for
+    the whole page with one query in the order of the prefetch."""
+
+    columns = ()
+
+    def __init__(self, name, model_field, child, pk):
+        self.name = name
+        self.child = child
+        self.pk = pk
+        self.related_model = model_field.related_model
+        if model_field.concrete:
+            self.query_name = model_field.related_query_name()
+        else:
+            self.query_name = model_field.field.name
+
+    def bind(self, ids, context):
+        model = self.related_model
+        rows = list(
+            model._default_manager.filter(**{f"{self.query_name}__in": ids})
+            .order_by(*model._meta.ordering, "pk")
+            .values(*self.child.columns, **{OWNER: F(self.query_name)})
+        )
+        related = {pk: [] for pk in ids}
+        for row, rendered in zip(rows, self.child.render(rows, context)):
+            related[row[OWNER]].append(rendered)
+        pk = self.pk
+        return lambda row: related[row[pk]]
+
+
+def path_getter(column):
+    """Read ``author__first_name`` as ``obj.author.first_name``, ``None``
+    when a relation on the way is null like a joined column would be."""
+    first, *rest = column.split("__")
+
+    def get(obj):
+        value = getattr(obj, first)
+        for name in rest:
+            if value is None:
+                return None
+            value = getattr(value, name)
+        return value
+
+    return get
+
+
+class CompiledSerializer:
+    """Renders rows of ``values(*columns)`` exactly like the serializer it
+    was compiled from renders model instances."""
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = fields
+        self.pk = model._meta.pk.attname
+        self.columns = tuple(
+            dict.fromkeys(
+                [self.pk, *(column for field in fields for column in field.columns)]
+            )
+        )
+
+    def rows(self, queryset, *extra):
+        columns = dict.fromkeys([*self.columns, *extra])
+        return queryset.prefetch_related(None).values(*columns)
+
+    def rows_of(self, objects):
+        """Rows of already loaded instances, joined columns are read from
+        their ``select_related`` relations."""
+        getters = [(column, path_getter(column)) for column in self.columns]
+        return [{column: get(obj) for column, get in getters} for obj in objects]
+
+    @metrics.timed
+    def render(self, rows, context):
+        rows = list(rows)
+        ids = list(dict.fromkeys(row[self.pk] for row in rows))
+        renderers = [(field.name, field.bind(ids, context)) for field in self.fields]
+        return [{name: render(row) for name, render in renderers} for row in rows]
+
+
+def passthrough(field):
+    return any(
+        type(field).to_representation is base.to_representation for base in PASSTHROUGH
+    )
+
+
+def compile_field(field, model, pk):
+    source = field.source
+    if source == "*":
+        if isinstance(field, FollowCountField):
+            return FollowCounts(field.field_name, field.index, pk)
+        if isinstance(field, CommentThreadField):
+            return CommentThreads(field.field_name, pk)
+        raise Unsupported(field.field_name)
+
+    model_field = None if "." in source else _model_field(model, source)
+    if model_field is None:
+        raise Unsupported(field.field_name)
+
+    if isinstance(field, TagListSerializerField):
+        through = getattr(model_field, "through", None)
+        if through is None or not issubclass(through, CommonGenericTaggedItemBase):
+            raise Unsupported(field.field_name)
+        return Tags(field.field_name, model, through, pk)
+
+    if isinstance(field, serializers.ListSerializer):
+        if not (model_field.many_to_many or model_field.one_to_many) or not (
+            isinstance(field.child, serializers.ModelSerializer)
+        ):
+            raise Unsupported(field.field_name)
+        return Nested(field.field_name, model_field, _compile(field.child), pk)
+
+    if model_field.is_relation:
+        if not (model_field.many_to_one or model_field.one_to_one) or not (
+            model_field.concrete
+        ):
+            raise Unsupported(field.field_name)
+        if isinstance(field, serializers.SlugRelatedField):
+            return Column(field.field_name, f"{source}__{field.slug_field}")
+        if isinstance(field, serializers.PrimaryKeyRelatedField) and (
+            field.pk_field is None
+        ):
+            return Column(field.field_name, model_field.attname)
+        raise Unsupported(field.field_name)
+
+    if not model_field.concrete:
+        raise Unsupported(field.field_name)
+    if isinstance(field, ImageRenditionsField):
+        return RenditionsColumn(field.field_name, model_field.attname)
+    if isinstance(field, serializers.FileField):
+        if not getattr(field, "use_url", True):
+            raise Unsupported(field.field_name)
+        return FileColumn(field.field_name, model_field.attname, model_field.storage)
+    if passthrough(field):
+        return Column(field.field_name, model_field.attname)
+    return Column(field.field_name, model_field.attname, field.to_representation)
+
+
+def _compile(serializer):
+    if (
+        type(serializer).to_representation
+        is not serializers.Serializer.to_representation
+    ):
+        raise Unsupported(type(serializer).__name__)
+    model = serializer.Meta.model
+    pk = model._meta.pk.attname
+    return CompiledSerializer(
+        model,
+        [
+            compile_field(field, model, pk)
+            for field in serializer.fields.values()
+            if not field.write_only
+        ],
+    )
+
+
+@lru_cache(maxsize=None)
+def compile_serializer(serializer_class):
+    """Compile a read-only ``ModelSerializer`` into a renderer of ``values()``
+    rows, or ``None`` when one of its fields has no row equivalent."""
+    try:
+        return _compile(serializer_class())
+    except Unsupported:
+        return None
+
+
+class FastListMixin:
+    """Render ``list`` pages from ``values()`` rows with the compiled list
+    serializer, skipping model instances and the DRF field machinery.
+
+    Viewsets opt in by including the mixin; serializers that do not
+    compile and ``FAST_LIST_SERIALIZERS = False`` fall back to the regular
+    path. With ``CachedRepresentationMixin`` the cache misses of the page
+    are rendered from the instances it already loaded.
+    """
+
+    # columns the view itself reads from the page rows
+    row_columns = ()
+
+    def get_compiled_serializer(self):
+        if self.action != "list" or not settings.FAST_LIST_SERIALIZERS:
+            return None
+        return compile_serializer(self.get_serializer_class())
+
+    def list(self, request, *args, **kwargs):
+        compiled = self.get_compiled_serializer()
+        if compiled is None or self.action in getattr(
+            self, "cached_representation_actions", ()
+        ):
+            return super().list(request, *args, **kwargs)
+
+        # the paginator seeks on its ordering fields, they must be in the rows
+        queryset = compiled.rows(
+            self.filter_queryset(self.get_queryset()),
+            *getattr(self.paginator, "fields", ()),
+            *self.row_columns,
+        )
+        context = self.get_serializer_context()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(compiled.render(page, context))
+        return Response(compiled.render(queryset, context))
+
+    def render_representations(self, objects):
+        compiled = self.get_compiled_serializer()
+        if compiled is None:
+            return super().render_representations(objects)
+
+        return compiled.render(compiled.rows_of(objects), self.get_serializer_context())
@@ -0,0 +1,242 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from account.models import Profile
+
+Follow = Profile.following.through
+
+FOLLOWING = "following"
+FOLLOWERS = "followers"
+
+# (filtered column, collected column) of the through table per direction
+COLUMNS = {
+    FOLLOWING: ("from_profile_id", "to_profile_id"),
+    FOLLOWERS: ("to_profile_id", "from_profile_id"),
+}
+
+
+def load(kind, profile_ids):
+    """Read the ``kind`` adjacency sets of ``profile_ids`` with one query."""
+    column, other = COLUMNS[kind]
+    adjacency = {profile_id: set() for profile_id in profile_ids}
+    if adjacency:
+        rows = Follow.objects.filter(**{f"{column}__in": adjacency}).values_list(
+            column, other
+        )
+        for profile_id, related_id in rows:
+            adjacency[profile_id].add(related_id)
+    return {profile_id: frozenset(ids) for profile_id, ids in adjacency.items()}
+
+
+class LocalGraph:
+    """Per-process LRU of frozen adjacency sets with a TTL.
+
+    Follow changes invalidate entries in the process that made them, the
+    TTL bounds how long other processes may serve a stale set.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def members(self, kind, profile_ids):
+        found, missing = {}, []
+        now = time.monotonic()
+        with self._lock:
+            for profile_id in profile_ids:
+                entry = self._entries.get((kind, profile_id))
+                if entry is None or entry[0] < now:
+                    missing.append(profile_id)
+                else:
+                    self._entries.move_to_end((kind, profile_id))
+                    found[profile_id] = entry[1]
+
+        if missing:
+            loaded = load(kind, missing)
+            expires_at = time.monotonic() + self.ttl
+            with self._lock:
+                for profile_id, ids in loaded.items():
+                    self._entries[(kind, profile_id)] = (expires_at, ids)
+                    self._entries.move_to_end((kind, profile_id))
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+            found.update(loaded)
+        return found
+
+    def counts(self, kind, profile_ids):
+        return {
+            profile_id: len(ids)
+            for profile_id, ids in self.members(kind, profile_ids).items()
+        }
+
+    def contains(self, kind, profile_id, related_id):
+        return related_id in self.members(kind, [profile_id])[profile_id]
+
+    def intersection(self, kind, profile_id, other_kind, other_id):
+        first = self.members(kind, [profile_id])[profile_id]
+        second = self.members(other_kind, [other_id])[other_id]
+        # set & set iterates over the smaller operand
+        return first & second
+
+    def invalidate(self, kind, profile_ids):
+        with self._lock:
+            for profile_id in profile_ids:
+                self._entries.pop((kind, profile_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisGraph:
+    """Adjacency sets shared by all processes as redis sets.
+
+    Small sets of integers use the compact intset encoding. Every loaded
+    set holds the sentinel member 0 so that an empty set stays cached.
+    """
+
+    sentinel = 0
+
+    def __init__(self, url, ttl):
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def key(self, kind, profile_id):
+        return f"graph:{kind}:{profile_id}"
+
+    def ensure(self, kind, profile_ids):
+        pipeline = self.client.pipeline(transaction=False)
+        for profile_id in profile_ids:
+            pipeline.exists(self.key(kind, profile_id))
+        missing = [
+            profile_id
+            for profile_id, exists in zip(profile_ids, pipeline.execute())
+            if not exists
+        ]
+        if not missing:
+            return
+
+        pipeline = self.client.pipeline(transaction=False)
+        for profile_id, ids in load(kind, missing).items():
+            key = self.key(kind, profile_id)
+            pipeline.sadd(key, self.sentinel, *ids)
+            pipeline.expire(key, self.ttl)
+        pipeline.execute()
+
+    def members(self, kind, profile_ids):
+        profile_ids = list(profile_ids)
+        self.ensure(kind, profile_ids)
+        pipeline = self.client.pipeline(transaction=False)
+        for profile_id in profile_ids:
+            pipeline.smembers(self.key(kind, profile_id))
+        return {
+            profile_id: frozenset(int(member) for member in members) - {self.sentinel}
+            for profile_id, members in zip(profile_ids, pipeline.execute())
+        }
+
+    def counts(self, kind, profile_ids):
+        profile_ids = list(profile_ids)
+        self.ensure(kind, profile_ids)
+        pipeline = self.client.pipeline(transaction=False)
+        for profile_id in profile_ids:
+            pipeline.scard(self.key(kind, profile_id))
+        return {
+            profile_id: max(count - 1, 0)
+            for profile_id, count in zip(profile_ids, pipeline.execute())
+        }
+
+    def contains(self, kind, profile_id, related_id):
+        self.ensure(kind, [profile_id])
+        return bool(self.client.sismember(self.key(kind, profile_id), related_id))
+
+    def intersection(self, kind, profile_id, other_kind, other_id):
+        self.ensure(kind, [profile_id])
+        self.ensure(other_kind, [other_id])
+        members = self.client.sinter(
+            self.key(kind, profile_id), self.key(other_kind, other_id)
+        )
+        return frozenset(int(member) for member in members) - {self.sentinel}
+
+    def invalidate(self, kind, profile_ids):
+        keys = [self.key(kind, profile_id) for profile_id in profile_ids]
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self):
+        for key in self.client.scan_iter("graph:*"):
+            self.client.delete(key)
+
+
+@lru_cache(maxsize=None)
+def get_graph():
+    config = settings.FOLLOW_GRAPH
+    if config["BACKEND"] == "redis":
+        return RedisGraph(config["REDIS_URL"], config["TTL"])
+    return LocalGraph(config["LOCAL_MAX_SIZE"], config["TTL"])
+
+
+def following_ids(profile_id):
+    return get_graph().members(FOLLOWING, [profile_id])[profile_id]
+
+
+def follower_ids(profile_id):
+    return get_graph().members(FOLLOWERS, [profile_id])[profile_id]
+
+
+def follower_counts(profile_ids):
+    return get_graph().counts(FOLLOWERS, profile_ids)
+
+
+def following_counts(profile_ids):
+    return get_graph().counts(FOLLOWING, profile_ids)
+
+
+def is_following(profile_id, other_id):
+    return get_graph().contains(FOLLOWING, profile_id, other_id)
+
+
+def common_following(profile_id, other_id):
+    """Profiles followed by both ``profile_id`` and ``other_id``."""
+    return get_graph().intersection(FOLLOWING, profile_id, FOLLOWING, other_id)
+
+
+def attach_counts(profiles):
+    """Store ``(followers, following)`` counts on ``profile.follow_counts``."""
+    profiles = [
+        profile for profile in profiles if not hasattr(profile, "follow_counts")
+    ]
+    profile_ids = [profile.pk for profile in profiles]
+    followers, following = follower_counts(profile_ids), following_counts(profile_ids)
+    for profile in profiles:
+        profile.follow_counts = (followers[profile.pk], following[profile.pk])
+
+
+# the backends are synchronous, in async views they run in the sync thread
+afollowing_ids = sync_to_async(following_ids)
+aattach_counts = sync_to_async(attach_counts)
+
+
+def _invalidate(follower_ids, followed_ids):
+    graph = get_graph()
+    graph.invalidate(FOLLOWING, follower_ids)
+    graph.invalidate(FOLLOWERS, followed_ids)
+
+
+def follows_changed(follower_ids, followed_ids):
+    """Drop the adjacency sets touched by a follow change.
+
+    They are dropped immediately and once more after commit, so a reader
+    that loaded the pre-commit state in between is discarded too.
+    """
+    follower_ids, followed_ids = list(follower_ids), list(followed_ids)
+    _invalidate(follower_ids, followed_ids)
+    transaction.on_commit(lambda: _invalidate(follower_ids, followed_ids))
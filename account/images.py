@@ -0,0 +1,83 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+from account import representation_cache
+
+EXTENSIONS = {"WEBP": "webp", "JPEG": "jpg"}
+
+
+def needs_processing(instance):
+    source = instance.image.name if instance.image else None
+    return instance.image_renditions.get("source") != source
+
+
+def render(file, size, image_format):
+    """Return ``(bytes, width, height)`` of ``file`` bounded to ``size``.
+
+    The image is rotated according to its EXIF orientation and re-encoded
+    without any metadata.
+    """
+    with Image.open(file) as original:
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+
+        has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+        if image_format == "JPEG" or not has_alpha:
+            image = image.convert("RGB")
+        else:
+            image = image.convert("RGBA")
+
+        buffer = BytesIO()
+        image.save(buffer, image_format, quality=settings.IMAGE_RENDITION_QUALITY)
+        return buffer.getvalue(), image.width, image.height
+
+
+def delete_renditions(storage, renditions):
+    for name, rendition in renditions.items():
+        if name != "source":
+            storage.delete(rendition["name"])
+
+
+def process(instance):
+    """Generate the configured renditions of ``instance.image``.
+
+    The result is written with a conditional ``update`` so a newer upload
+    that raced with this run is never overwritten.
+    """
+    storage = instance._meta.get_field("image").storage
+    source = instance.image.name if instance.image else None
+    renditions = {"source": source}
+
+    if source:
+        image_format = settings.IMAGE_RENDITION_FORMAT
+        folder, filename = os.path.split(source)
+        stem, _ = os.path.splitext(filename)
+
+        for name, size in settings.IMAGE_RENDITIONS.items():
+            with storage.open(source, "rb") as file:
+                content, width, height = render(file, size, image_format)
+            saved_name = storage.save(
+                os.path.join(
+                    folder, "renditions", f"{stem}-{name}.{EXTENSIONS[image_format]}"
+                ),
+                ContentFile(content),
+            )
+            renditions[name] = {"name": saved_name, "width": width, "height": height}
+
+    current = type(instance).objects.filter(pk=instance.pk)
+    if source:
+        current = current.filter(image=source)
+    else:
+        current = current.filter(Q(image="") | Q(image__isnull=True))
+
+    if current.update(image_renditions=renditions):
+        representation_cache.bump(type(instance), [instance.pk])
+        delete_renditions(storage, instance.image_renditions)
+    else:
+        # the image was replaced meanwhile, its own task will take over
+        delete_renditions(storage, renditions)
@@ -0,0 +1,253 @@
+import csv
+import gzip
+import io
+import json
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+from taggit.models import Tag, TaggedItem
+
+from account import graph
+from account.models import Profile, Post, Comment, Reaction
+from account.timeline import ID_BATCH_SIZE
+
+Follow = Profile.following.through
+
+# CSV files hold post tags in a single column
+CSV_TAG_SEPARATOR = "|"
+
+
+def read_records(path):
+    """Yield dicts from a JSONL or CSV file, optionally gzip compressed."""
+    binary = gzip.open(path) if path.endswith(".gz") else open(path, "rb")
+    name = path.removesuffix(".gz")
+    with io.TextIOWrapper(binary, encoding="utf-8", newline="") as file:
+        if name.endswith(".csv"):
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def chunked(records, size):
+    records = iter(records)
+    while chunk := list(islice(records, size)):
+        yield chunk
+
+
+def _datetime(value):
+    if not value:
+        return timezone.now()
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid datetime {value!r}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _reaction_type(value):
+    if value not in Reaction.ReactionChoices.values:
+        raise ValueError(f"Unknown reaction_type {value!r}")
+    return value
+
+
+@contextmanager
+def keep_timestamps():
+    """Let bulk inserts keep imported ``auto_now_add`` values."""
+    fields = [Post._meta.get_field("pub_date"), Comment._meta.get_field("created_at")]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class GraphImporter:
+    """Insert graph records in chunks, keeping their primary keys.
+
+    Records reference each other by primary key, so nothing but the tag
+    name lookup is kept in memory between chunks. Users without a
+    ``password`` hash share ``default_password``, hashed once, or get an
+    unusable password.
+    """
+
+    def __init__(self, batch_size=5000, default_password=None):
+        self.batch_size = batch_size
+        self.password = make_password(default_password)
+        self.tag_ids = {}
+        self.post_type = ContentType.objects.get_for_model(Post)
+
+    def insert(self, model, objects, ignore_conflicts=False):
+        model.objects.bulk_create(
+            objects, batch_size=self.batch_size, ignore_conflicts=ignore_conflicts
+        )
+        return len(objects)
+
+    def users(self, records):
+        User = get_user_model()
+        return self.insert(
+            User,
+            [
+                User(
+                    pk=int(record["id"]),
+                    email=User.objects.normalize_email(record["email"]),
+                    password=record.get("password") or self.password,
+                )
+                for record in records
+            ],
+        )
+
+    def profiles(self, records):
+        return self.insert(
+            Profile,
+            [
+                Profile(
+                    pk=int(record["id"]),
+                    user_id=int(record["user"]),
+                    first_name=record["first_name"],
+                    last_name=record["last_name"],
+                    bio=record.get("bio") or "",
+                )
+                for record in records
+            ],
+        )
+
+    def follows(self, records):
+        return self.insert(
+            Follow,
+            [
+                Follow(
+                    from_profile_id=int(record["from"]),
+                    to_profile_id=int(record["to"]),
+                )
+                for record in records
+                if record["from"] != record["to"]
+            ],
+            ignore_conflicts=True,
+        )
+
+    def posts(self, records):
+        inserted = self.insert(
+            Post,
+            [
+                Post(
+                    pk=int(record["id"]),
+                    author_id=int(record["author"]),
+                    title=record["title"],
+                    description=record.get("description") or "",
+                    pub_date=_datetime(record.get("pub_date")),
+                )
+                for record in records
+            ],
+        )
+        self.tag_posts(records)
+        return inserted
+
+    def tag_posts(self, records):
+        tags = {}
+        for record in records:
+            names = record.get("tags") or []
+            if isinstance(names, str):
+                names = [name for name in names.split(CSV_TAG_SEPARATOR) if name]
+            tags[int(record["id"])] = names
+
+        self.resolve_tags({name for names in tags.values() for name in names})
+        self.insert(
+            TaggedItem,
+            [
+                TaggedItem(
+                    content_type=self.post_type,
+                    object_id=post_id,
+                    tag_id=self.tag_ids[name],
+                )
+                for post_id, names in tags.items()
+                for name in set(names)
+            ],
+            ignore_conflicts=True,
+        )
+
+    def resolve_tags(self, names):
+        missing = names - self.tag_ids.keys()
+        if not missing:
+            return
+        Tag.objects.bulk_create(
+            [
+                Tag(name=name, slug=slugify(name, allow_unicode=True))
+                for name in missing
+            ],
+            ignore_conflicts=True,
+        )
+        for names in chunked(missing, ID_BATCH_SIZE):
+            self.tag_ids.update(
+                Tag.objects.filter(name__in=names).values_list("name", "pk")
+            )
+        # names whose slug collided with an existing tag get a unique slug
+        for name in missing - self.tag_ids.keys():
+            self.tag_ids[name] = Tag.objects.create(name=name).pk
+
+    def comments(self, records):
+        return self.insert(
+            Comment,
+            [
+                Comment(
+                    pk=int(record["id"]),
+                    author_id=int(record["author"]),
+                    post_id=int(record["post"]),
+                    description=record.get("description") or "",
+                    created_at=_datetime(record.get("created_at")),
+                )
+                for record in records
+            ],
+        )
+
+    def reactions(self, records):
+        return self.insert(
+            Reaction,
+            [
+                Reaction(
+                    user_id=int(record["user"]),
+                    post_id=int(record["post"]),
+                    reaction_type=_reaction_type(record["reaction_type"]),
+                )
+                for record in records
+            ],
+            ignore_conflicts=True,
+        )
+
+
+# dependency order of the record kinds
+KINDS = ("users", "profiles", "follows", "posts", "comments", "reactions")
+
+
+def reset_sequences():
+    """Move primary key sequences past the imported ids."""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [get_user_model(), Profile, Post, Comment, Reaction, Tag]
+    )
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def rebuild_derived_data(stdout, profile_ids=None):
+    """Rebuild what signals maintain after rows were bulk inserted."""
+    graph.get_graph().clear()
+    call_command("rebuild_timelines", profiles=profile_ids, stdout=stdout)
+    call_command("reconcile_post_counters", stdout=stdout)
+    call_command("rebuild_search_index", stdout=stdout)
+    call_command("rebuild_profile_search_index", stdout=stdout)
+    call_command("refresh_follow_suggestions", all=True, stdout=stdout)
+    call_command("rebuild_trending_tags", stdout=stdout)
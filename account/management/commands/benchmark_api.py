@@ -0,0 +1,109 @@
+import json
+import platform
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from account import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the account API endpoints against the current database and "
+        "report latency percentiles, queries per request and throughput as "
+        "JSON. Seed data with seed_graph first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            choices=sorted(benchmark.SCENARIOS),
+            help="Only run the given scenario (repeatable).",
+        )
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument(
+            "--server",
+            nargs="?",
+            const="wsgi",
+            choices=("wsgi", "asgi"),
+            help="Go through a local threaded WSGI server, or uvicorn with "
+            "--server=asgi, instead of the in-process test client.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Parallel clients, only used with --server.",
+        )
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the JSON report to a file.")
+        parser.add_argument(
+            "--baseline", help="Compare against a previous JSON report."
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] > 1 and not options["server"]:
+            raise CommandError("--concurrency requires --server.")
+
+        try:
+            workload = benchmark.Workload(users=options["users"], seed=options["seed"])
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        drivers = {
+            None: benchmark.ClientDriver,
+            "wsgi": benchmark.ServerDriver,
+            "asgi": benchmark.AsgiServerDriver,
+        }
+        if options["server"] == "asgi" and benchmark.uvicorn is None:
+            raise CommandError("--server=asgi requires uvicorn.")
+        driver = drivers[options["server"]]()
+        scenarios = options["scenarios"] or list(benchmark.SCENARIOS)
+        report = {
+            "meta": {
+                "created_at": timezone.now().isoformat(),
+                "mode": options["server"] or "client",
+                "concurrency": options["concurrency"],
+                "requests": options["requests"],
+                "seed": options["seed"],
+                "database": connection.vendor,
+                "python": platform.python_version(),
+            },
+            "scenarios": {},
+        }
+
+        hosts = [*settings.ALLOWED_HOSTS, "testserver", "127.0.0.1"]
+        # all sampled users write from one address, measure the endpoints
+        # rather than the throttles
+        throttling = {**settings.THROTTLING, "ENABLED": False}
+        with override_settings(ALLOWED_HOSTS=hosts, THROTTLING=throttling), driver:
+            for name in scenarios:
+                benchmark.run_scenario(
+                    driver, workload.plan(name, options["warmup"]), 1
+                )
+                report["scenarios"][name] = benchmark.run_scenario(
+                    driver,
+                    workload.plan(name, options["requests"]),
+                    options["concurrency"],
+                )
+                self.stderr.write(f"{name}: {report['scenarios'][name]}")
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+        if options["baseline"]:
+            with open(options["baseline"]) as file:
+                baseline = json.load(file)
+            for line in benchmark.compare(report, baseline):
+                self.stderr.write(line)
@@ -0,0 +1,48 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from account import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the latest rows of the list serializers with DRF and with "
+        "their compiled row serializers, report the time per row of both as "
+        "JSON and fail if their output differs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--case",
+            action="append",
+            dest="cases",
+            choices=sorted(benchmark.SERIALIZER_CASES),
+            help="Only run the given case (repeatable).",
+        )
+        parser.add_argument("--rows", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        report = {}
+        hosts = [*settings.ALLOWED_HOSTS, "testserver"]
+        with override_settings(ALLOWED_HOSTS=hosts):
+            context = {"request": Request(APIRequestFactory().get("/"))}
+            for name in options["cases"] or list(benchmark.SERIALIZER_CASES):
+                serializer_class, queryset = benchmark.SERIALIZER_CASES[name]
+                report[name] = benchmark.compare_serializers(
+                    serializer_class,
+                    queryset()[: options["rows"]],
+                    context,
+                    repeat=max(options["repeat"], 1),
+                )
+                self.stderr.write(f"{name}: {report[name]}")
+
+        self.stdout.write(json.dumps(report, indent=2))
+        different = [name for name, stats in report.items() if not stats["identical"]]
+        if different:
+            raise CommandError(f"Different output for {', '.join(different)}.")
@@ -0,0 +1,164 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from account import synthetic, timeline
+from account.models import Comment
+from account.views import PostViewSet, CommentViewSet, ReactionViewSet
+
+# tables whose access must always go through an index
+CHECKED_TABLES = (
+    "account_post",
+    "account_comment",
+    "account_reaction",
+    "account_timelineentry",
+    "account_profile_following",
+)
+
+# "SCAN t USING INDEX" walks an index in order and stops at the LIMIT
+SQLITE_FULL_SCAN = re.compile(r"\bSCAN (\w+)\s*$")
+POSTGRES_FULL_SCAN = re.compile(r"Seq Scan on (\w+)")
+# a page sorted after the fact reads every row matching the filter
+SQLITE_SORT = re.compile(r"USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY")
+POSTGRES_SORT = re.compile(r"(?<!Incremental )\bSort  \(")
+SUBQUERY_ALIAS = re.compile(r'"(\w+)" (U\d+)')
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic dataset in a rolled back transaction and fail "
+        "if the EXPLAIN plan of a PostViewSet/CommentViewSet/ReactionViewSet "
+        "query falls back to a full table scan, or if a page of the feed "
+        "or a list is sorted instead of read in index order."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", type=int, default=300)
+        parser.add_argument("--posts-per-profile", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                failures = self.check_plans(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError(
+                "Full table scans or sorted pages found:\n\n"
+                + "\n\n".join(f"{name}:\n{plan}" for name, plan in failures)
+            )
+        self.stdout.write(self.style.SUCCESS("All query plans use indexes."))
+
+    def check_plans(self, options):
+        profiles = synthetic.generate(
+            profiles=options["profiles"],
+            posts_per_profile=options["posts_per_profile"],
+            seed=options["seed"],
+        )
+        profile = profiles[0]
+        # one followed author is pulled at read time, to check its feed leg
+        profile.following.filter(
+            pk=profile.following.values_list("pk", flat=True)[:1]
+        ).update(is_high_fanout=True)
+        timeline.rebuild(profile)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        failures = []
+        for name, queryset, paginated in self.queries(profile):
+            plan = queryset.explain()
+            scanned = self.full_scans(plan, str(queryset.query))
+            if paginated and self.sorts(plan):
+                scanned.append("sort")
+            if scanned:
+                failures.append((name, plan))
+                self.stdout.write(self.style.ERROR(f"FAIL {name}: {scanned}"))
+            else:
+                self.stdout.write(f"ok   {name}")
+        return failures
+
+    def full_scans(self, plan, sql):
+        pattern = (
+            POSTGRES_FULL_SCAN
+            if connection.vendor == "postgresql"
+            else SQLITE_FULL_SCAN
+        )
+        # subqueries alias their tables as U0, U1...; map them back
+        aliases = {alias: table for table, alias in SUBQUERY_ALIAS.findall(sql)}
+        scanned = []
+        for line in plan.splitlines():
+            match = pattern.search(line)
+            if match:
+                table = aliases.get(match.group(1), match.group(1))
+                if table in CHECKED_TABLES:
+                    scanned.append(table)
+        return scanned
+
+    def request(self, user, params=None):
+        request = APIRequestFactory().get("/", params)
+        force_authenticate(request, user=user)
+        request = Request(request)
+        request.user = user
+        return request
+
+    def sorts(self, plan):
+        pattern = POSTGRES_SORT if connection.vendor == "postgresql" else SQLITE_SORT
+        return pattern.search(plan) is not None
+
+    def view(self, viewset_class, action, user, **kwargs):
+        view = viewset_class()
+        view.action = action
+        view.kwargs = kwargs
+        view.format_kwarg = None
+        view.request = self.request(user)
+        return view
+
+    def pages(self, view):
+        """First page and a deep page of the view's keyset pagination, one
+        query per leg."""
+        paginator = view.pagination_class()
+        queryset = view.filter_queryset(view.get_queryset())
+        request = view.request
+        for page in ("first page", "deep page"):
+            sources = paginator.get_sources(queryset, request)
+            for index, leg in enumerate(paginator.page_querysets(sources, request)):
+                yield page if index == 0 else f"{page} leg {index}", leg
+            # ten pages down
+            for _ in range(10):
+                paginator.paginate_queryset(queryset, request)
+                if not paginator.has_next:
+                    return
+                cursor = paginator.encode_cursor(
+                    paginator.position_of(paginator.page[-1])
+                )
+                request = self.request(
+                    request.user, {paginator.cursor_query_param: cursor}
+                )
+
+    def queries(self, profile):
+        user = profile.user
+        for name, view_class in (
+            ("PostViewSet.list", PostViewSet),
+            ("CommentViewSet.list", CommentViewSet),
+            ("ReactionViewSet.list", ReactionViewSet),
+        ):
+            view = self.view(view_class, "list", user)
+            for page, queryset in self.pages(view):
+                yield f"{name} {page}", queryset, True
+
+        post_id = profile.posts.values_list("pk", flat=True).first()
+        view = self.view(PostViewSet, "retrieve", user, pk=post_id)
+        retrieve = view.filter_queryset(view.get_queryset()).filter(pk=post_id)
+        yield "PostViewSet.retrieve", retrieve, False
+        thread = Comment.objects.filter(post_id=post_id).order_by("-created_at", "-id")
+        yield "Comment thread of a post", thread[:10], True
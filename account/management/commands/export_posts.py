@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from account import export
+from account.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream all posts with their tags, comments and reactions as NDJSON, "
+        "gzip compressed when the output file ends with .gz or --gzip is set."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", default="-", help="Output file, standard output by default."
+        )
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument(
+            "--author",
+            type=int,
+            action="append",
+            dest="authors",
+            help="Only export posts of the given profile id (repeatable).",
+        )
+        parser.add_argument("--chunk-size", type=int, default=export.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if options["authors"]:
+            posts = posts.filter(author_id__in=options["authors"])
+
+        path = options["output"]
+        compress = options["gzip"] or path.endswith(".gz")
+        chunks = export.export(
+            posts, compress=compress, chunk_size=options["chunk_size"]
+        )
+
+        if path == "-":
+            output = sys.stdout.buffer
+            for chunk in chunks:
+                output.write(chunk)
+            output.flush()
+            return
+
+        with open(path, "wb") as output:
+            for chunk in chunks:
+                output.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Exported posts to {path}."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from account.models import Post, Profile
+from account.tasks import process_image
+
+
+class Command(BaseCommand):
+    help = "Queue rendition generation for images uploaded before it existed."
+
+    def handle(self, *args, **options):
+        queued = 0
+        for model in (Profile, Post):
+            instances = model.objects.exclude(image="").exclude(image__isnull=True)
+            for instance in instances.only("pk", "image", "image_renditions"):
+                if instance.image_renditions.get("source") != instance.image.name:
+                    process_image.delay(model._meta.label, instance.pk)
+                    queued += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Queued {queued} image(s)."))
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from account import importing
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream users, profiles, follows, posts (with tags), comments and "
+        "reactions from JSONL or CSV files (optionally .gz) into the database "
+        "in chunks, then rebuild timelines, counters and search indexes. "
+        "Records keep their ids and reference each other by id."
+    )
+
+    def add_arguments(self, parser):
+        for kind in importing.KINDS:
+            parser.add_argument(f"--{kind}", metavar="PATH")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--default-password",
+            help="Password for users without a hash, unusable when omitted.",
+        )
+        parser.add_argument(
+            "--skip-derived",
+            action="store_true",
+            help="Do not rebuild timelines, counters and search indexes.",
+        )
+
+    def handle(self, *args, **options):
+        paths = {kind: options[kind] for kind in importing.KINDS if options[kind]}
+        if not paths:
+            raise CommandError("Nothing to import, pass at least one file.")
+
+        importer = importing.GraphImporter(
+            batch_size=options["batch_size"],
+            default_password=options["default_password"],
+        )
+        started = time.perf_counter()
+        with importing.keep_timestamps():
+            for kind, path in paths.items():
+                imported = 0
+                for chunk in importing.chunked(
+                    importing.read_records(path), options["batch_size"]
+                ):
+                    try:
+                        with transaction.atomic():
+                            imported += getattr(importer, kind)(chunk)
+                    except (KeyError, ValueError, IntegrityError) as error:
+                        raise CommandError(
+                            f"Failed to import {kind} after {imported} row(s): "
+                            f"{error!r}"
+                        )
+                self.stdout.write(f"Imported {imported} {kind}.")
+        importing.reset_sequences()
+
+        if not options["skip_derived"]:
+            importing.rebuild_derived_data(self.stdout)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported graph in {time.perf_counter() - started:.1f}s."
+            )
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from account import profile_search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the prefix index behind the profile typeahead search."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        profile_search.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS("Rebuilt profile search index."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from account import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the post full-text index (SQLite FTS5 or the table backed "
+        "fallback, depending on POST_SEARCH_BACKEND)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        search.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt search index with {type(search.get_backend()).__name__}."
+            )
+        )
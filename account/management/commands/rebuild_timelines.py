@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from account import timeline
+from account.models import Profile
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute high fan-out author flags and rebuild materialized "
+        "home timelines. Run it after bulk changes to Profile.following."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profile",
+            type=int,
+            action="append",
+            dest="profiles",
+            help="Only rebuild the timeline of the given profile id (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        timeline.refresh_fanout_flags()
+
+        profiles = Profile.objects.order_by("pk")
+        if options["profiles"]:
+            profiles = profiles.filter(pk__in=options["profiles"])
+
+        rebuilt = 0
+        for profile in profiles.iterator(chunk_size=500):
+            timeline.rebuild(profile)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} timeline(s)."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from account import trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Refill the shared redis trending tag sketches from the tags of posts "
+        "published within the trending window, e.g. after bulk imports. The "
+        "local backend refills every process from the database on its own."
+    )
+
+    def handle(self, *args, **options):
+        counted = trending.rebuild(trending.recent_tags())
+        self.stdout.write(self.style.SUCCESS(f"Counted {counted} tag use(s)."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from account import counters
+from account.models import Post
+
+
+class Command(BaseCommand):
+    help = "Recompute Post like/dislike/comment counters in primary key chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        bounds = Post.objects.aggregate(low=Min("pk"), high=Max("pk"))
+        if bounds["low"] is None:
+            self.stdout.write("No posts to reconcile.")
+            return
+
+        updated = 0
+        for start in range(bounds["low"], bounds["high"] + 1, chunk_size):
+            with transaction.atomic():
+                updated += counters.reconcile(
+                    Post.objects.filter(pk__gte=start, pk__lt=start + chunk_size)
+                )
+
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {updated} post(s)."))
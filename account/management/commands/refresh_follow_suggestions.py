@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from account import suggestions
+from account.models import Profile
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the stored follow suggestions of profiles flagged stale "
+        "by follow changes, or of every profile with --all."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute every profile, e.g. to pick up changed post tags.",
+        )
+        parser.add_argument(
+            "--profile",
+            type=int,
+            action="append",
+            dest="profiles",
+            help="Only recompute the given profile id (repeatable).",
+        )
+        parser.add_argument("--top-k", type=int)
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        profile_ids = options["profiles"]
+        if options["all"]:
+            profile_ids = Profile.objects.values_list("pk", flat=True)
+
+        refreshed = suggestions.refresh(
+            profile_ids,
+            top_k=options["top_k"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Refreshed suggestions of {refreshed} profile(s).")
+        )
@@ -0,0 +1,355 @@
+import bisect
+import functools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.cache import add_never_cache_headers
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+LABELS = ("view", "method")
+# any other request method is recorded as "other"
+METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+_current = ContextVar("metrics_record", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative histogram per label values, rendered in Prometheus text
+    format. The registry serializes access to it."""
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def snapshot(self):
+        return {
+            labels: (list(counts), total)
+            for labels, (counts, total) in self._series.items()
+        }
+
+    def expose(self, snapshot):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        bounds = [_number(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, (counts, total) in sorted(snapshot.items()):
+            base = _labels(LABELS, labels)
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {_number(total)}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+    def reset(self):
+        self._series.clear()
+
+
+class Registry:
+    def __init__(self):
+        self.duration = Histogram(
+            "http_request_duration_seconds",
+            "Wall time of requests per view action.",
+            DURATION_BUCKETS,
+        )
+        self.queries = Histogram(
+            "http_request_db_queries",
+            "Database queries per request.",
+            QUERY_BUCKETS,
+        )
+        self.db_duration = Histogram(
+            "http_request_db_duration_seconds",
+            "Time spent executing database queries per request.",
+            DURATION_BUCKETS,
+        )
+        self.serializer_duration = Histogram(
+            "http_request_serializer_duration_seconds",
+            "Time spent in serializers per request.",
+            DURATION_BUCKETS,
+        )
+        self.response_size = Histogram(
+            "http_response_size_bytes",
+            "Size of non-streaming response bodies.",
+            SIZE_BUCKETS,
+        )
+        self.histograms = (
+            self.duration,
+            self.queries,
+            self.db_duration,
+            self.serializer_duration,
+            self.response_size,
+        )
+        self.slow_requests = deque()
+        self._lock = threading.Lock()
+
+    def observe(self, record, response_size):
+        labels = (record.view, record.method)
+        with self._lock:
+            self.duration.observe(labels, record.duration)
+            self.queries.observe(labels, record.queries)
+            self.db_duration.observe(labels, record.db_time)
+            self.serializer_duration.observe(labels, record.serializer_time)
+            if response_size is not None:
+                self.response_size.observe(labels, response_size)
+
+    def log_slow(self, entry):
+        with self._lock:
+            self.slow_requests.append(entry)
+            while len(self.slow_requests) > settings.METRICS["SLOW_LOG_SIZE"]:
+                self.slow_requests.popleft()
+
+    def slow_log(self):
+        with self._lock:
+            return list(self.slow_requests)
+
+    def expose(self):
+        with self._lock:
+            snapshots = [histogram.snapshot() for histogram in self.histograms]
+        lines = []
+        for histogram, snapshot in zip(self.histograms, snapshots):
+            lines.extend(histogram.expose(snapshot))
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            for histogram in self.histograms:
+                histogram.reset()
+            self.slow_requests.clear()
+
+
+registry = Registry()
+
+
+class Record:
+    """Measurements of one request, also the execute wrapper counting its
+    queries and keeping their SQL for the slow log."""
+
+    __slots__ = (
+        "view",
+        "method",
+        "started",
+        "duration",
+        "queries",
+        "db_time",
+        "serializer_time",
+        "depth",
+        "statements",
+        "max_statements",
+    )
+
+    def __init__(self, method, max_statements):
+        self.view = "unmatched"
+        self.method = method
+        self.started = time.perf_counter()
+        self.duration = 0
+        self.queries = 0
+        self.db_time = 0
+        self.serializer_time = 0
+        self.depth = 0
+        self.statements = []
+        self.max_statements = max_statements
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            if len(self.statements) < self.max_statements:
+                self.statements.append(sql)
+
+
+def count_queries(execute, sql, params, many, context):
+    """Execute wrapper of every connection, handing the queries to the
+    record of the request they run for, on whatever thread."""
+    record = _current.get()
+    if record is None:
+        return execute(sql, params, many, context)
+    return record(execute, sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """``connection_created`` receiver wrapping new connections, those of
+    the threads running the async ORM included."""
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_queries)
+
+
+@contextmanager
+def serializing():
+    """Count the time spent in the block as serializer time of the current
+    request."""
+    record = _current.get()
+    # only the outermost block is timed, nested ones are part of it
+    if record is None or record.depth:
+        yield
+        return
+    record.depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record.serializer_time += time.perf_counter() - started
+        record.depth -= 1
+
+
+def timed(render):
+    """Count the time spent in ``render`` as serializer time."""
+
+    @functools.wraps(render)
+    def wrapper(*args, **kwargs):
+        with serializing():
+            return render(*args, **kwargs)
+
+    return wrapper
+
+
+def view_name(view_func, method):
+    """``ViewSet.action`` of a DRF view, ``View.method`` of a class-based
+    view or the function name."""
+    cls = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+    if cls is None:
+        return getattr(view_func, "__name__", "unknown")
+    actions = getattr(view_func, "actions", None) or {}
+    return f"{cls.__name__}.{actions.get(method.lower(), method.lower())}"
+
+
+class MetricsMiddleware:
+    """Record wall time, query count and time, serializer time and response
+    size of every request per view action, and keep slow requests with
+    their SQL."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS["ENABLED"]:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def start(self, request):
+        method = request.method if request.method in METHODS else "other"
+        record = Record(method, settings.METRICS["SLOW_LOG_STATEMENTS"])
+        request._metrics_record = record
+        return record, _current.set(record)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        record, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, record)
+        return response
+
+    async def __acall__(self, request):
+        record, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, record)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        record = getattr(request, "_metrics_record", None)
+        if record is not None:
+            record.view = view_name(view_func, record.method)
+
+    def finish(self, request, response, record):
+        record.duration = time.perf_counter() - record.started
+        size = None if response.streaming else len(response.content)
+        registry.observe(record, size)
+
+        if record.duration * 1000 >= settings.METRICS["SLOW_REQUEST_MS"]:
+            entry = {
+                "view": record.view,
+                "method": record.method,
+                "path": request.get_full_path(),
+                "status": response.status_code,
+                "duration_ms": round(record.duration * 1000, 3),
+                "queries": record.queries,
+                "db_ms": round(record.db_time * 1000, 3),
+                "serializer_ms": round(record.serializer_time * 1000, 3),
+                "sql": record.statements,
+            }
+            registry.log_slow(entry)
+            logger.warning(
+                "Slow request %s %s took %.1fms with %d queries",
+                record.method,
+                entry["path"],
+                entry["duration_ms"],
+                record.queries,
+            )
+
+
+def allowed(request):
+    token = settings.METRICS["TOKEN"]
+    if token:
+        return request.headers.get("Authorization") == f"Bearer {token}"
+    return request.META.get("REMOTE_ADDR") in settings.INTERNAL_IPS
+
+
+def metrics_view(request):
+    """Histograms in the Prometheus text exposition format."""
+    if not allowed(request):
+        return HttpResponseForbidden()
+    response = HttpResponse(
+        registry.expose(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+    add_never_cache_headers(response)
+    return response
+
+
+def slow_log_view(request):
+    """The latest slow requests with the SQL they executed."""
+    if not allowed(request):
+        return HttpResponseForbidden()
+    response = HttpResponse(
+        json.dumps({"results": registry.slow_log()}),
+        content_type="application/json",
+    )
+    add_never_cache_headers(response)
+    return response
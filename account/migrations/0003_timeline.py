@@ -0,0 +1,60 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="is_high_fanout",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name="TimelineEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("pub_date", models.DateTimeField()),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timeline_entries",
+                        to="account.post",
+                    ),
+                ),
+                (
+                    "profile",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timeline",
+                        to="account.profile",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("-pub_date",),
+                "indexes": [
+                    models.Index(
+                        fields=["profile", "-pub_date"],
+                        name="account_timeline_feed_idx",
+                    )
+                ],
+                "unique_together": {("profile", "post")},
+            },
+        ),
+    ]
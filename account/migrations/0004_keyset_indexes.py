@@ -0,0 +1,31 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0003_timeline"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="account_comment_keyset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["-pub_date", "-id"], name="account_post_keyset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reaction",
+            index=models.Index(
+                fields=["user", "id"], name="account_reaction_keyset_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:08
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Post = apps.get_model("account", "Post")
+    Reaction = apps.get_model("account", "Reaction")
+    Comment = apps.get_model("account", "Comment")
+
+    def count(queryset):
+        counted = queryset.values("post").annotate(total=Count("id")).values("total")
+        return Coalesce(Subquery(counted), Value(0))
+
+    reactions = Reaction.objects.filter(post=OuterRef("pk"))
+    Post.objects.update(
+        like_count=count(reactions.filter(reaction_type="Like")),
+        dislike_count=count(reactions.filter(reaction_type="Dislike")),
+        comment_count=count(Comment.objects.filter(post=OuterRef("pk"))),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0004_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="comment_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="dislike_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="like_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0005_post_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="image_renditions",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="image_renditions",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
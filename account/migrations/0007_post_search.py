@@ -0,0 +1,92 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.utils import OperationalError
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    try:
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS account_post_fts "
+            "USING fts5(title, description, tags, tokenize='unicode61')"
+        )
+    except OperationalError:
+        # SQLite built without FTS5, the table backed index is used instead
+        return
+
+    Post = apps.get_model("account", "Post")
+    TaggedItem = apps.get_model("taggit", "TaggedItem")
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    content_type = ContentType.objects.filter(app_label="account", model="post")
+    for post in Post.objects.iterator():
+        tags = TaggedItem.objects.filter(
+            content_type__in=content_type, object_id=post.pk
+        ).values_list("tag__name", flat=True)
+        schema_editor.execute(
+            "INSERT INTO account_post_fts (rowid, title, description, tags) "
+            "VALUES (%s, %s, %s, %s)",
+            [post.pk, post.title, post.description, " ".join(tags)],
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS account_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0006_image_renditions"),
+        ("contenttypes", "0002_remove_content_type_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PostSearchDocument",
+            fields=[
+                (
+                    "post",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="account.post",
+                    ),
+                ),
+                ("length", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="PostSearchTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(max_length=64)),
+                ("frequency", models.PositiveIntegerField()),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_terms",
+                        to="account.post",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("term", "post")},
+            },
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
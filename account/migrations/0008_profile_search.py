@@ -0,0 +1,93 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:14
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# the indexing rules of account.profile_search when this migration was made
+MIN_PREFIX = 2
+MAX_PREFIX = 50
+FIELD_WEIGHTS = (("first_name", 3), ("last_name", 3), ("email", 1))
+WORD_RE = re.compile(r"[^\W_]+")
+
+
+def words(text):
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    normalized = "".join(
+        char for char in decomposed if not unicodedata.combining(char)
+    ).casefold()
+    return WORD_RE.findall(normalized)
+
+
+def keys_for(first_name, last_name, email):
+    values = {
+        "first_name": first_name,
+        "last_name": last_name,
+        "email": (email or "").split("@")[0],
+    }
+    keys = {}
+    for field, weight in FIELD_WEIGHTS:
+        for word in words(values[field]):
+            word = word[:MAX_PREFIX]
+            for end in range(MIN_PREFIX, len(word) + 1):
+                score = weight * 2 if end == len(word) else weight
+                keys[word[:end]] = max(keys.get(word[:end], 0), score)
+    return keys
+
+
+def populate_search_keys(apps, schema_editor):
+    Profile = apps.get_model("account", "Profile")
+    ProfileSearchKey = apps.get_model("account", "ProfileSearchKey")
+    profiles = Profile.objects.values_list(
+        "pk", "first_name", "last_name", "user__email"
+    ).order_by("pk")
+    batch = []
+    for pk, first_name, last_name, email in profiles.iterator(chunk_size=1000):
+        batch.extend(
+            ProfileSearchKey(key=key, profile_id=pk, weight=weight)
+            for key, weight in keys_for(first_name, last_name, email).items()
+        )
+        if len(batch) >= 1000:
+            ProfileSearchKey.objects.bulk_create(batch)
+            batch = []
+    ProfileSearchKey.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0007_post_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProfileSearchKey",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=50)),
+                ("weight", models.PositiveSmallIntegerField()),
+                (
+                    "profile",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_keys",
+                        to="account.profile",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("key", "profile")},
+            },
+        ),
+        migrations.RunPython(populate_search_keys, migrations.RunPython.noop),
+    ]
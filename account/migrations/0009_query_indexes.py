@@ -0,0 +1,31 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0008_profile_search"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "-created_at", "-id"], name="account_comment_post_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["author", "-pub_date", "-id"], name="account_post_author_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reaction",
+            index=models.Index(
+                fields=["post", "reaction_type"], name="account_reaction_post_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0009_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="suggestions_stale",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.CreateModel(
+            name="FollowSuggestion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField()),
+                ("score", models.FloatField()),
+                ("mutual_count", models.PositiveIntegerField()),
+                ("tag_affinity", models.FloatField()),
+                (
+                    "profile",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="follow_suggestions",
+                        to="account.profile",
+                    ),
+                ),
+                (
+                    "suggested",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="account.profile",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("rank",),
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("profile", "rank"), name="account_suggestion_rank_uniq"
+                    )
+                ],
+            },
+        ),
+    ]
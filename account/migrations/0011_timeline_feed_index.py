@@ -0,0 +1,24 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0010_follow_suggestions"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="timelineentry",
+            name="account_timeline_feed_idx",
+        ),
+        migrations.AddIndex(
+            model_name="timelineentry",
+            index=models.Index(
+                fields=["profile", "-pub_date", "-post"],
+                name="account_timeline_feed_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0011_timeline_feed_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="profilesearchkey",
+            index=models.Index(
+                fields=["key", "-weight", "profile"], name="account_search_key_rank_idx"
+            ),
+        ),
+    ]
@@ -36,8 +36,11 @@ class Profile(models.Model):
     first_name = models.CharField(max_length=50, blank=True)
     last_name = models.CharField(max_length=50, blank=True)
     image = models.ImageField(upload_to=image_custom_path, blank=True, null=True)
+    image_renditions = models.JSONField(default=dict, blank=True)
     bio = models.TextField(blank=True, null=True)
     following = models.ManyToManyField("Profile", related_name="followers", blank=True)
+    is_high_fanout = models.BooleanField(default=False)
+    suggestions_stale = models.BooleanField(default=True)
 
     class Meta:
         ordering = ("last_name",)
@@ -51,11 +54,21 @@ class Post(models.Model):
     author = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="posts")
     description = models.TextField()
     image = models.ImageField(upload_to=image_custom_path, blank=True, null=True)
+    image_renditions = models.JSONField(default=dict, blank=True)
     pub_date = models.DateTimeField(auto_now_add=True)
     tags = TaggableManager()
+    like_count = models.PositiveIntegerField(default=0)
+    dislike_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ("-pub_date",)
+        indexes = [
+            models.Index(fields=["-pub_date", "-id"], name="account_post_keyset_idx"),
+            models.Index(
+                fields=["author", "-pub_date", "-id"], name="account_post_author_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} by {self.author}"
@@ -75,6 +88,12 @@ class Reaction(models.Model):
             "user",
             "post",
         )
+        indexes = [
+            models.Index(fields=["user", "id"], name="account_reaction_keyset_idx"),
+            models.Index(
+                fields=["post", "reaction_type"], name="account_reaction_post_idx"
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -89,6 +108,113 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ("author",)
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"], name="account_comment_keyset_idx"
+            ),
+            models.Index(
+                fields=["post", "-created_at", "-id"], name="account_comment_post_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.author}"
+
+
+class TimelineEntry(models.Model):
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="timeline"
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="timeline_entries"
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ("-pub_date",)
+        unique_together = (
+            "profile",
+            "post",
+        )
+        indexes = [
+            models.Index(
+                fields=["profile", "-pub_date", "-post"],
+                name="account_timeline_feed_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} in timeline of {self.profile_id}"
+
+
+class FollowSuggestion(models.Model):
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="follow_suggestions"
+    )
+    suggested = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    mutual_count = models.PositiveIntegerField()
+    tag_affinity = models.FloatField()
+
+    class Meta:
+        ordering = ("rank",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["profile", "rank"], name="account_suggestion_rank_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.suggested_id} suggested to {self.profile_id}"
+
+
+class PostSearchDocument(models.Model):
+    post = models.OneToOneField(
+        Post, on_delete=models.CASCADE, primary_key=True, related_name="search_document"
+    )
+    length = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Search document of {self.post_id}"
+
+
+class PostSearchTerm(models.Model):
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="search_terms"
+    )
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = (
+            "term",
+            "post",
+        )
+
+    def __str__(self):
+        return f"{self.term} in {self.post_id}"
+
+
+class ProfileSearchKey(models.Model):
+    key = models.CharField(max_length=50)
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="search_keys"
+    )
+    weight = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = (
+            "key",
+            "profile",
+        )
+        indexes = [
+            # covers a single prefix lookup, read best first up to the limit
+            models.Index(
+                fields=["key", "-weight", "profile"],
+                name="account_search_key_rank_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.key} for {self.profile_id}"
@@ -0,0 +1,235 @@
+import base64
+import heapq
+import json
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q, aprefetch_related_objects, prefetch_related_objects
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from account import timeline
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination seeking on a composite ``ordering`` key.
+
+    Every page is a single indexed range query (``WHERE key < cursor
+    ORDER BY key LIMIT n``), so its cost does not depend on how deep the
+    client has paged, and no ``COUNT(*)`` is issued. All ordering fields
+    must share the same direction and the last one must be unique.
+    Subclasses may page several legs with ``get_sources``, one such query
+    each, and merge them.
+    """
+
+    ordering = ("-id",)
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "limit"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        sources = self.get_sources(queryset, request)
+        pages = [list(page) for page in self.page_querysets(sources, request)]
+        page = self.set_page(pages)
+        if len(pages) > 1:
+            prefetch_related_objects(page, *queryset._prefetch_related_lookups)
+        return page
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        sources = await self.aget_sources(queryset, request)
+        pages = [
+            [obj async for obj in page]
+            for page in self.page_querysets(sources, request)
+        ]
+        page = self.set_page(pages)
+        if len(pages) > 1:
+            await aprefetch_related_objects(page, *queryset._prefetch_related_lookups)
+        return page
+
+    def get_sources(self, queryset, request):
+        """``(queryset, condition, ordering)`` legs merged into every page.
+
+        Every leg is paged on its own ``ordering``, which must sort like
+        ``ordering``. ``condition`` is filtered together with the seek
+        predicate so that both go through the same joins.
+        """
+        return [(queryset, Q(), self.ordering)]
+
+    async def aget_sources(self, queryset, request):
+        return self.get_sources(queryset, request)
+
+    def page_querysets(self, sources, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.model = sources[0][0].model
+
+        position = self.decode_cursor(request)
+        pages = []
+        for queryset, condition, ordering in sources:
+            if len(sources) > 1:
+                # prefetched once for the merged page
+                queryset = queryset.prefetch_related(None)
+            if position is not None:
+                condition &= self.seek_filter(position, ordering)
+            # one extra row tells whether there is a next page
+            pages.append(
+                queryset.filter(condition).order_by(*ordering)[: self.page_size + 1]
+            )
+        return pages
+
+    def set_page(self, pages):
+        results = pages[0] if len(pages) == 1 else self.merge(pages)
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    def merge(self, pages):
+        """Merge the pages of several legs, a row found by more than one leg
+        is kept once."""
+        merged = []
+        rows = heapq.merge(*pages, key=self.position_of, reverse=self.descending)
+        for row in rows:
+            if merged and self.position_of(merged[-1]) == self.position_of(row):
+                continue
+            merged.append(row)
+            if len(merged) > self.page_size:
+                break
+        return merged
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    @property
+    def fields(self):
+        return [name.lstrip("-") for name in self.ordering]
+
+    @property
+    def descending(self):
+        return self.ordering[0].startswith("-")
+
+    def seek_filter(self, position, ordering=None):
+        """``key < position`` in the ordering direction, on the fields of
+        ``ordering`` when a leg sorts on copies of the ordering fields.
+
+        The expanded ``(a < x) OR (a = x AND b < y)`` is led by the range
+        bound ``a <= x`` so that the planner walks the ordering index from
+        the cursor and stops at the LIMIT instead of OR-ing index lookups
+        and sorting every row past the cursor.
+        """
+        fields = [name.lstrip("-") for name in ordering or self.ordering]
+        lookup = "lt" if self.descending else "gt"
+        conditions = []
+        for index, name in enumerate(fields):
+            equal = dict(zip(fields[:index], position[:index]))
+            conditions.append(Q(**equal, **{f"{name}__{lookup}": position[index]}))
+        if len(conditions) == 1:
+            return conditions[0]
+        bound = Q(**{f"{fields[0]}__{lookup}e": position[0]})
+        return bound & reduce(or_, conditions)
+
+    def position_of(self, obj):
+        if isinstance(obj, dict):
+            return [obj[name] for name in self.fields]
+        return [getattr(obj, name) for name in self.fields]
+
+    def encode_cursor(self, position):
+        values = [
+            value.isoformat() if hasattr(value, "isoformat") else value
+            for value in position
+        ]
+        raw = json.dumps(values, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+            values = json.loads(raw)
+            if len(values) != len(self.fields):
+                raise ValueError
+            return [
+                self.model._meta.get_field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        cursor = self.encode_cursor(self.position_of(self.page[-1]))
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+
+class PostPagination(KeysetPagination):
+    ordering = ("-pub_date", "-id")
+
+
+class FeedPagination(PostPagination):
+    """Home feed pages of the requesting profile, merged from the legs of
+    ``timeline.home_feed`` over the view's posts."""
+
+    def get_sources(self, queryset, request):
+        profile_id = request.user.profile.pk
+        pulled = timeline.pulled_author_ids(profile_id).using(queryset.db)
+        return timeline.home_feed(queryset, profile_id, pulled)
+
+    async def aget_sources(self, queryset, request):
+        profile_id = request.user.profile.pk
+        pulled = timeline.pulled_author_ids(profile_id).using(queryset.db)
+        return timeline.home_feed(
+            queryset, profile_id, [author_id async for author_id in pulled]
+        )
+
+
+class CommentPagination(KeysetPagination):
+    ordering = ("-created_at", "-id")
+
+
+class ReactionPagination(KeysetPagination):
+    ordering = ("id",)
@@ -1,5 +1,7 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+from account.models import Profile
+
 
 class IsOwnerOrReadOnly(BasePermission):
     def has_object_permission(self, request, view, obj):
@@ -10,6 +12,8 @@ class IsOwnerOrReadOnly(BasePermission):
             return obj.author == request.user.profile
 
         if hasattr(obj, "user"):  # Якщо об'єкт напряму має поле `user`
+            if isinstance(obj.user, Profile):  # Reaction.user є профілем
+                return obj.user == request.user.profile
             return obj.user == request.user
 
         if hasattr(obj, "profile"):  # Якщо об'єкт пов'язаний з профілем
@@ -0,0 +1,128 @@
+import re
+import unicodedata
+
+from django.db.models import OuterRef, Subquery
+
+from account.models import Profile, ProfileSearchKey
+
+MIN_PREFIX = 2
+MAX_PREFIX = 50
+# profiles scored for a query of several words
+MAX_CANDIDATES = 500
+
+# (field, weight) of the searchable parts of a profile
+FIELD_WEIGHTS = (("first_name", 3), ("last_name", 3), ("email", 1))
+WORD_RE = re.compile(r"[^\W_]+")
+
+
+def normalize(text):
+    """Casefold ``text`` and strip diacritics, ``"Ólga"`` -> ``"olga"``."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(
+        char for char in decomposed if not unicodedata.combining(char)
+    ).casefold()
+
+
+def words(text):
+    return WORD_RE.findall(normalize(text))
+
+
+def keys_for(first_name, last_name, email):
+    """Map every indexed prefix of a profile to its best weight.
+
+    Each word contributes all its prefixes from ``MIN_PREFIX`` characters;
+    a complete word counts twice as much as a bare prefix of it.
+    """
+    values = {
+        "first_name": first_name,
+        "last_name": last_name,
+        "email": (email or "").split("@")[0],
+    }
+    keys = {}
+    for field, weight in FIELD_WEIGHTS:
+        for word in words(values[field]):
+            word = word[:MAX_PREFIX]
+            for end in range(MIN_PREFIX, len(word) + 1):
+                score = weight * 2 if end == len(word) else weight
+                key = word[:end]
+                keys[key] = max(keys.get(key, 0), score)
+    return keys
+
+
+def index_profile(profile):
+    ProfileSearchKey.objects.filter(profile=profile).delete()
+    ProfileSearchKey.objects.bulk_create(
+        ProfileSearchKey(key=key, profile=profile, weight=weight)
+        for key, weight in keys_for(
+            profile.first_name, profile.last_name, profile.user.email
+        ).items()
+    )
+
+
+def rebuild(batch_size=1000):
+    ProfileSearchKey.objects.all().delete()
+    profiles = Profile.objects.values_list(
+        "pk", "first_name", "last_name", "user__email"
+    ).order_by("pk")
+    batch = []
+    for pk, first_name, last_name, email in profiles.iterator(chunk_size=batch_size):
+        batch.extend(
+            ProfileSearchKey(key=key, profile_id=pk, weight=weight)
+            for key, weight in keys_for(first_name, last_name, email).items()
+        )
+        if len(batch) >= batch_size:
+            ProfileSearchKey.objects.bulk_create(batch)
+            batch = []
+    ProfileSearchKey.objects.bulk_create(batch)
+
+
+def ranked(term):
+    """Ids of the profiles having the prefix ``term``, read best first off
+    the rank index."""
+    return (
+        ProfileSearchKey.objects.filter(key=term)
+        .order_by("-weight", "profile_id")
+        .values_list("profile_id", flat=True)
+    )
+
+
+def matches(terms):
+    """Ids of the profiles having every prefix of ``terms``, best first.
+
+    More prefixes only score the best ``MAX_CANDIDATES`` profiles of the
+    one with the fewest rows, each looked up by key and profile, so two
+    broad prefixes never read all their rows.
+    """
+    if len(terms) == 1:
+        return ranked(*terms)
+    rarest = min(
+        sorted(terms),
+        key=lambda term: ProfileSearchKey.objects.filter(key=term)[
+            :MAX_CANDIDATES
+        ].count(),
+    )
+    # null unless the profile has every prefix
+    score = sum(
+        Subquery(
+            ProfileSearchKey.objects.filter(key=term, profile=OuterRef("pk")).values(
+                "weight"
+            )
+        )
+        for term in sorted(terms)
+    )
+    return (
+        Profile.objects.filter(pk__in=ranked(rarest)[:MAX_CANDIDATES])
+        .alias(score=score)
+        .filter(score__isnull=False)
+        .order_by("-score", "pk")
+        .values_list("pk", flat=True)
+    )
+
+
+def search(query, limit=10):
+    """Return ids of profiles matching every word of ``query`` as a prefix,
+    best matches first."""
+    terms = {word[:MAX_PREFIX] for word in words(query) if len(word) >= MIN_PREFIX}
+    if not terms:
+        return []
+    return list(matches(terms)[:limit])
@@ -0,0 +1,86 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def _model_field(model, source):
+    try:
+        return model._meta.get_field(source)
+    except FieldDoesNotExist:
+        return None
+
+
+def _concrete_names(serializer):
+    model = serializer.Meta.model
+    names = []
+    for field in serializer.fields.values():
+        model_field = _model_field(model, field.source)
+        if model_field is not None and model_field.concrete:
+            names.append(model_field.attname)
+    return tuple(names)
+
+
+@lru_cache(maxsize=None)
+def plan_for(serializer_class):
+    """Derive the relations a serializer touches.
+
+    Returns ``(select_related, prefetch_related)`` where every prefetch is a
+    ``(lookup, model, only_fields)`` triple. Forward single-valued relations
+    rendered through a non-pk field are joined; many-valued relations are
+    prefetched, restricted to the columns the nested serializer renders.
+    """
+    model = serializer_class.Meta.model
+    select, prefetch = [], []
+
+    for field in serializer_class().fields.values():
+        if field.write_only or field.source == "*" or "." in field.source:
+            continue
+        model_field = _model_field(model, field.source)
+        if model_field is None or not model_field.is_relation:
+            continue
+
+        related_model = model_field.related_model
+        if model_field.many_to_many or model_field.one_to_many:
+            if isinstance(field, serializers.ListSerializer) and isinstance(
+                field.child, serializers.ModelSerializer
+            ):
+                only = _concrete_names(field.child)
+            elif isinstance(field, serializers.ManyRelatedField):
+                only = (related_model._meta.pk.attname,)
+            else:
+                only = ()
+            prefetch.append((field.source, related_model, only))
+        elif isinstance(field, serializers.PrimaryKeyRelatedField):
+            # rendered from the local "<name>_id" column, no join required
+            continue
+        elif model_field.concrete:
+            select.append(field.source)
+
+    return tuple(select), tuple(prefetch)
+
+
+def related_queryset(model, only):
+    """Prefetch queryset of ``model`` in its default ordering, ties broken by
+    the primary key so that nested lists render in a stable order."""
+    queryset = model.objects.only(*only)
+    if model._meta.ordering:
+        queryset = queryset.order_by(*model._meta.ordering, "pk")
+    return queryset
+
+
+def plan_queryset(queryset, serializer_class):
+    select, prefetch = plan_for(serializer_class)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(
+            *(
+                Prefetch(
+                    lookup, queryset=related_queryset(model, only) if only else None
+                )
+                for lookup, model, only in prefetch
+            )
+        )
+    return queryset
@@ -0,0 +1,231 @@
+import asyncio
+import itertools
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from account import graph
+from account.models import Post
+
+
+def author_topic(profile_id):
+    return f"author:{profile_id}"
+
+
+def profile_topic(profile_id):
+    return f"profile:{profile_id}"
+
+
+class Subscription:
+    """Bounded event buffer of one connection.
+
+    When a slow client lets the buffer fill up, the oldest events are
+    dropped and counted instead of blocking publishers or growing memory.
+    """
+
+    def __init__(self, topics, maxsize):
+        self.topics = frozenset(topics)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def offer(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def take_dropped(self):
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class LocalHub:
+    """In-process pub/sub delivering events to subscriptions by topic.
+
+    ``publish`` may be called from any thread, events are handed over to
+    the event loop of every subscription.
+    """
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics, maxsize=None):
+        subscription = Subscription(topics, maxsize or settings.REALTIME["BUFFER_SIZE"])
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscriptions[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscriptions.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[topic]
+
+    def publish(self, topics, event):
+        self.deliver(topics, event)
+
+    def deliver(self, topics, event):
+        with self._lock:
+            subscriptions = set(
+                itertools.chain.from_iterable(
+                    self._subscriptions.get(topic, ()) for topic in topics
+                )
+            )
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # the loop of a dead connection is already closed
+                self.unsubscribe(subscription)
+
+
+class RedisHub(LocalHub):
+    """Relay events between processes through a redis channel.
+
+    Every process listens to a single channel and delivers the messages to
+    its own local subscriptions.
+    """
+
+    channel = "realtime:events"
+
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+        self._listeners = {}
+
+    def subscribe(self, topics, maxsize=None):
+        subscription = super().subscribe(topics, maxsize)
+        loop = subscription.loop
+        listener = self._listeners.get(loop)
+        if listener is None or listener.done():
+            self._listeners[loop] = loop.create_task(self.listen())
+        return subscription
+
+    def publish(self, topics, event):
+        message = json.dumps(
+            {"topics": list(topics), "event": event}, cls=DjangoJSONEncoder
+        )
+        self.client.publish(self.channel, message)
+
+    async def listen(self):
+        client = aioredis.Redis.from_url(self.url)
+        async with client.pubsub() as pubsub:
+            await pubsub.subscribe(self.channel)
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                data = json.loads(message["data"])
+                self.deliver(data["topics"], data["event"])
+
+
+@lru_cache(maxsize=None)
+def get_hub():
+    if settings.REALTIME["HUB"] == "redis":
+        return RedisHub(settings.REALTIME["REDIS_URL"])
+    return LocalHub()
+
+
+def publish_on_commit(topics, event):
+    topics = list(topics)
+    transaction.on_commit(lambda: get_hub().publish(topics, event))
+
+
+async def atopics_for(profile):
+    """Topics a connected profile listens to: its own notifications and the
+    posts of every profile it follows."""
+    following = await graph.afollowing_ids(profile.pk)
+    return [profile_topic(profile.pk), *map(author_topic, sorted(following))]
+
+
+def post_created(post):
+    publish_on_commit(
+        [author_topic(post.author_id)],
+        {
+            "type": "post",
+            "id": post.pk,
+            "author": post.author_id,
+            "title": post.title,
+            "pub_date": post.pub_date,
+        },
+    )
+
+
+def comment_created(comment, post_author_id):
+    if comment.author_id == post_author_id:
+        return
+    publish_on_commit(
+        [profile_topic(post_author_id)],
+        {
+            "type": "comment",
+            "id": comment.pk,
+            "post": comment.post_id,
+            "author": comment.author_id,
+            "description": comment.description,
+            "created_at": comment.created_at,
+        },
+    )
+
+
+def reactions_changed(profile_id, reactions):
+    """Notify post authors about ``{post_id: reaction_type}`` of a profile."""
+    authors = Post.objects.filter(pk__in=reactions).values_list("pk", "author_id")
+    for post_id, author_id in authors:
+        if author_id == profile_id:
+            continue
+        publish_on_commit(
+            [profile_topic(author_id)],
+            {
+                "type": "reaction",
+                "post": post_id,
+                "user": profile_id,
+                "reaction_type": reactions[post_id],
+            },
+        )
+
+
+def encode(event, event_id=None):
+    """Encode an event in the SSE wire format."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event['type']}")
+    lines.append("data: " + json.dumps(event, cls=DjangoJSONEncoder))
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+async def stream(subscription, keepalive=None):
+    """Yield SSE frames of ``subscription`` until the client disconnects."""
+    keepalive = keepalive or settings.REALTIME["KEEPALIVE"]
+    hub = get_hub()
+    try:
+        yield f"retry: {settings.REALTIME['RETRY_MS']}\n\n".encode()
+        for event_id in itertools.count(1):
+            try:
+                event = await asyncio.wait_for(subscription.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            dropped = subscription.take_dropped()
+            if dropped:
+                # the client missed events and should refresh from the API
+                yield encode({"type": "dropped", "count": dropped})
+            yield encode(event, event_id)
+    finally:
+        hub.unsubscribe(subscription)
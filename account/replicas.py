@@ -0,0 +1,129 @@
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+REPLICA = "replica"
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+def pin_key(user_id):
+    return f"db:pinned:{user_id}"
+
+
+def pin_to_primary(user_id):
+    cache.set(pin_key(user_id), True, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+async def apin_to_primary(user_id):
+    await cache.aset(pin_key(user_id), True, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return cache.get(pin_key(user_id), False)
+
+
+def check_configuration():
+    """Refuse a replica whose read-your-writes pins would not reach the
+    other processes."""
+    if REPLICA in connections.databases and not settings.SHARED_CACHE:
+        raise ImproperlyConfigured(
+            "A replica database requires a cache shared by every process "
+            "(REDIS_URL), the primary pins of writers are kept there."
+        )
+
+
+def reads_from_replica():
+    return _replica_reads.get() and REPLICA in connections.databases
+
+
+def cache_timeout(timeout):
+    """Timeout of data cached from the current reads. What was read from a
+    lagging replica expires with the pin window rather than staying stale
+    under a version that was bumped on the primary."""
+    if reads_from_replica():
+        return min(timeout, settings.REPLICA_PIN_SECONDS)
+    return timeout
+
+
+class PrimaryReplicaRouter:
+    """Send reads to the replica while a view allows it, everything else to
+    the primary. Without a configured replica every query stays on default.
+    """
+
+    def db_for_read(self, model, **hints):
+        if reads_from_replica():
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica mirrors the primary, objects of both may be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class ReplicaReadMixin:
+    """Serve safe requests of a viewset from the replica, unless
+    ``ReplicaPinMiddleware`` pinned the user to the primary."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        user_id = request.user.pk
+        if request.method in READ_METHODS and not (
+            user_id is not None and is_pinned(user_id)
+        ):
+            self._replica_token = _replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_replica_token", None)
+        if token is not None:
+            _replica_reads.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaPinMiddleware:
+    """Pin the user of every successful write, whichever view handled it,
+    to the primary for ``REPLICA_PIN_SECONDS`` so that they read their own
+    writes."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def writer(self, request, response):
+        if request.method in READ_METHODS or response.status_code >= 400:
+            return None
+        # views authenticating with DRF set the user on the request too
+        return getattr(getattr(request, "user", None), "pk", None)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        user_id = self.writer(request, response)
+        if user_id is not None:
+            pin_to_primary(user_id)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        user_id = self.writer(request, response)
+        if user_id is not None:
+            await apin_to_primary(user_id)
+        return response
@@ -0,0 +1,194 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import aprefetch_related_objects, prefetch_related_objects
+from rest_framework.response import Response
+
+from account import metrics, replicas
+
+
+def version_key(model, pk):
+    return f"repr:v:{model._meta.label_lower}:{pk}"
+
+
+def version_timeout():
+    # versions in a per-process cache never see the bumps of other processes
+    if settings.SHARED_CACHE:
+        return None
+    return settings.REPRESENTATION_CACHE_LOCAL_TIMEOUT
+
+
+def fragment_timeout():
+    if settings.SHARED_CACHE:
+        return settings.REPRESENTATION_CACHE_TIMEOUT
+    return settings.REPRESENTATION_CACHE_LOCAL_TIMEOUT
+
+
+def _bump_now(model, pks):
+    # a fresh token rather than an increment: an evicted version can never
+    # resurrect a fragment cached under an older one
+    token = time.time_ns()
+    cache.set_many(
+        {version_key(model, pk): token for pk in pks}, timeout=version_timeout()
+    )
+
+
+def bump(model, pks):
+    """Invalidate the cached representations of ``model`` objects ``pks``.
+
+    The versions are bumped immediately and once more after commit, so a
+    reader that cached the pre-commit state in between is discarded too.
+    """
+    pks = [pk for pk in pks if pk is not None]
+    if not pks:
+        return
+    _bump_now(model, pks)
+    transaction.on_commit(lambda: _bump_now(model, pks))
+
+
+def versions(model, pks):
+    keys = {pk: version_key(model, pk) for pk in pks}
+    found = cache.get_many(keys.values())
+    missing = {key: time.time_ns() for key in keys.values() if key not in found}
+    for key, token in missing.items():
+        if not cache.add(key, token, timeout=version_timeout()):
+            # lost the race, read the version the other writer stored
+            missing[key] = cache.get(key, token)
+    found.update(missing)
+    return {pk: found[key] for pk, key in keys.items()}
+
+
+async def aversions(model, pks):
+    keys = {pk: version_key(model, pk) for pk in pks}
+    found = await cache.aget_many(keys.values())
+    missing = {key: time.time_ns() for key in keys.values() if key not in found}
+    for key, token in missing.items():
+        if not await cache.aadd(key, token, timeout=version_timeout()):
+            missing[key] = await cache.aget(key, token)
+    found.update(missing)
+    return {pk: found[key] for pk, key in keys.items()}
+
+
+def fragment_key(serializer_class, request, obj, version):
+    return (
+        f"repr:{serializer_class.__module__}.{serializer_class.__qualname__}:"
+        f"{request.scheme}://{request.get_host()}:"
+        f"{obj._meta.label_lower}:{obj.pk}:{version}"
+    )
+
+
+async def acached_representations(
+    objects, serializer_class, context, prefetches=(), prepare=None
+):
+    """Async counterpart of ``CachedRepresentationMixin.cached_representations``
+    sharing its fragments.
+
+    ``prepare`` is awaited with the cache misses before they are serialized,
+    to load whatever the serializer would otherwise query synchronously.
+    """
+    if not objects:
+        return []
+
+    model = type(objects[0])
+    object_versions = await aversions(model, [obj.pk for obj in objects])
+    keys = [
+        fragment_key(serializer_class, context["request"], obj, object_versions[obj.pk])
+        for obj in objects
+    ]
+    fragments = await cache.aget_many(keys)
+
+    misses = [obj for obj, key in zip(objects, keys) if key not in fragments]
+    if misses:
+        await aprefetch_related_objects(misses, *prefetches)
+        if prepare is not None:
+            await prepare(misses)
+        with metrics.serializing():
+            rendered = serializer_class(misses, many=True, context=context).data
+        by_pk = dict(zip((obj.pk for obj in misses), rendered))
+        new_fragments = {
+            key: by_pk[obj.pk]
+            for obj, key in zip(objects, keys)
+            if key not in fragments
+        }
+        await cache.aset_many(new_fragments, timeout=fragment_timeout())
+        fragments.update(new_fragments)
+
+    return [fragments[key] for key in keys]
+
+
+class CachedRepresentationMixin:
+    """Serve ``list``/``retrieve`` from per-object cached representations.
+
+    Every object is rendered into its own fragment keyed by serializer,
+    origin and object version. Pages are assembled with one multi-get;
+    misses are prefetched and serialized in a single batch. Prefetches of
+    the view queryset are deferred so that cache hits never trigger them.
+    """
+
+    cached_representation_actions = ("list", "retrieve")
+
+    def caches_representation(self):
+        return self.action in self.cached_representation_actions
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.caches_representation():
+            self.deferred_prefetches = queryset._prefetch_related_lookups
+            queryset = queryset.prefetch_related(None)
+        return queryset
+
+    def fragment_key(self, serializer_class, obj, version):
+        return fragment_key(serializer_class, self.request, obj, version)
+
+    def cached_representations(self, objects):
+        if not objects:
+            return []
+
+        serializer_class = self.get_serializer_class()
+        model = type(objects[0])
+        object_versions = versions(model, [obj.pk for obj in objects])
+        keys = [
+            self.fragment_key(serializer_class, obj, object_versions[obj.pk])
+            for obj in objects
+        ]
+        fragments = cache.get_many(keys)
+
+        misses = [obj for obj, key in zip(objects, keys) if key not in fragments]
+        if misses:
+            rendered = self.render_representations(misses)
+            by_pk = dict(zip((obj.pk for obj in misses), rendered))
+            new_fragments = {
+                key: by_pk[obj.pk]
+                for obj, key in zip(objects, keys)
+                if key not in fragments
+            }
+            cache.set_many(
+                new_fragments,
+                timeout=replicas.cache_timeout(fragment_timeout()),
+            )
+            fragments.update(new_fragments)
+
+        return [fragments[key] for key in keys]
+
+    def render_representations(self, objects):
+        prefetch_related_objects(objects, *self.deferred_prefetches)
+        with metrics.serializing():
+            return self.get_serializer(objects, many=True).data
+
+    def list(self, request, *args, **kwargs):
+        if not self.caches_representation():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.cached_representations(page))
+        return Response(self.cached_representations(list(queryset)))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.caches_representation():
+            return super().retrieve(request, *args, **kwargs)
+
+        return Response(self.cached_representations([self.get_object()])[0])
@@ -0,0 +1,208 @@
+import math
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Q
+
+from account.models import Post, PostSearchDocument, PostSearchTerm
+
+FTS_TABLE = "account_post_fts"
+
+# column weights used for BM25 ranking by both backends
+WEIGHTS = {"title": 10.0, "description": 1.0, "tags": 5.0}
+
+TOKEN_RE = re.compile(r"\w+")
+QUERY_RE = re.compile(r"(\w+)(\*?)")
+
+
+def tokenize(text):
+    return [token.casefold()[:64] for token in TOKEN_RE.findall(text or "")]
+
+
+def parse_query(query):
+    """Split a user query into ``(term, is_prefix)`` pairs. A trailing
+    ``*`` turns a term into a prefix match, e.g. ``djan*``."""
+    return [
+        (term.casefold(), bool(star)) for term, star in QUERY_RE.findall(query or "")
+    ]
+
+
+def document(post):
+    return {
+        "title": post.title,
+        "description": post.description,
+        "tags": " ".join(tag.name for tag in post.tags.all()),
+    }
+
+
+class FTS5Backend:
+    """SQLite FTS5 virtual table keyed by the post id (``rowid``)."""
+
+    def index(self, posts):
+        with connection.cursor() as cursor:
+            for post in posts:
+                fields = document(post)
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post.pk])
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, title, description, tags) "
+                    "VALUES (%s, %s, %s, %s)",
+                    [post.pk, fields["title"], fields["description"], fields["tags"]],
+                )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    def search(self, terms, limit, offset):
+        match = " ".join(
+            '"{}"{}'.format(term.replace('"', '""'), "*" if prefix else "")
+            for term, prefix in terms
+        )
+        weights = ", ".join(str(weight) for weight in WEIGHTS.values())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s OFFSET %s",
+                [match, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class TableBackend:
+    """Inverted index stored in ordinary tables, ranked with BM25 in Python.
+
+    Works on every database. Each ``(term, post)`` row holds the
+    field-weighted term frequency; documents store their weighted length.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def index(self, posts):
+        for post in posts:
+            frequencies = Counter()
+            for field, text in document(post).items():
+                for token in tokenize(text):
+                    frequencies[token] += WEIGHTS[field]
+
+            PostSearchTerm.objects.filter(post=post).delete()
+            PostSearchTerm.objects.bulk_create(
+                PostSearchTerm(term=term, post=post, frequency=round(frequency))
+                for term, frequency in frequencies.items()
+            )
+            PostSearchDocument.objects.update_or_create(
+                post=post, defaults={"length": round(sum(frequencies.values()))}
+            )
+
+    def remove(self, post_id):
+        PostSearchTerm.objects.filter(post_id=post_id).delete()
+        PostSearchDocument.objects.filter(post_id=post_id).delete()
+
+    def clear(self):
+        PostSearchTerm.objects.all().delete()
+        PostSearchDocument.objects.all().delete()
+
+    def search(self, terms, limit, offset):
+        total = PostSearchDocument.objects.count()
+        if not total:
+            return []
+        average_length = PostSearchDocument.objects.aggregate(avg=Avg("length"))["avg"]
+
+        scores = None
+        for term, prefix in terms:
+            if prefix:
+                # range lookup keeps the prefix match on the term index
+                lookup = Q(term__gte=term, term__lt=term + "\uffff")
+            else:
+                lookup = Q(term=term)
+            rows = PostSearchTerm.objects.filter(lookup).values_list(
+                "post_id", "frequency", "post__search_document__length"
+            )
+
+            frequencies = defaultdict(int)
+            lengths = {}
+            for post_id, frequency, length in rows:
+                frequencies[post_id] += frequency
+                lengths[post_id] = length or 0
+
+            matches = len(frequencies)
+            idf = math.log((total - matches + 0.5) / (matches + 0.5) + 1)
+            term_scores = {
+                post_id: idf
+                * frequency
+                * (self.k1 + 1)
+                / (
+                    frequency
+                    + self.k1
+                    * (1 - self.b + self.b * lengths[post_id] / average_length)
+                )
+                for post_id, frequency in frequencies.items()
+            }
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    post_id: score + term_scores[post_id]
+                    for post_id, score in scores.items()
+                    if post_id in term_scores
+                }
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return [post_id for post_id, _ in ranked[offset : offset + limit]]
+
+
+@lru_cache(maxsize=None)
+def fts5_available(alias):
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [FTS_TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def get_backend():
+    name = settings.POST_SEARCH_BACKEND
+    if name == "auto":
+        name = "fts5" if fts5_available(connection.alias) else "table"
+    return FTS5Backend() if name == "fts5" else TableBackend()
+
+
+def index_posts(posts):
+    get_backend().index(posts)
+
+
+def remove_post(post_id):
+    get_backend().remove(post_id)
+
+
+def rebuild(batch_size=500):
+    backend = get_backend()
+    with transaction.atomic():
+        backend.clear()
+        posts = Post.objects.prefetch_related("tags").order_by("pk")
+        batch = []
+        for post in posts.iterator(chunk_size=batch_size):
+            batch.append(post)
+            if len(batch) >= batch_size:
+                backend.index(batch)
+                batch = []
+        backend.index(batch)
+
+
+def search(query, limit=20, offset=0):
+    """Return post ids matching every term of ``query``, best first."""
+    terms = parse_query(query)
+    if not terms:
+        return []
+    return get_backend().search(terms, limit, offset)
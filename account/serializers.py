@@ -1,10 +1,63 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models
 from rest_framework import serializers
 
-from account.models import Profile, Post, Reaction, Comment
+from account import comment_threads, graph
+from account.models import FollowSuggestion, Profile, Post, Reaction, Comment
 from taggit.serializers import TagListSerializerField, TaggitSerializer
 
 
+def image_renditions(value, request=None):
+    """Stored image renditions as ``{name: {url, width, height}}``."""
+    renditions = {}
+    for name, rendition in value.items():
+        if name == "source":
+            continue
+        url = default_storage.url(rendition["name"])
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        renditions[name] = {
+            "url": url,
+            "width": rendition["width"],
+            "height": rendition["height"],
+        }
+    return renditions
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """Render stored image renditions as ``{name: {url, width, height}}``."""
+
+    def to_representation(self, value):
+        return image_renditions(value, self.context.get("request"))
+
+
+class FollowCountField(serializers.ReadOnlyField):
+    """Render a follower or following count from the follow graph."""
+
+    def __init__(self, index, **kwargs):
+        self.index = index
+        kwargs["source"] = "*"
+        super().__init__(**kwargs)
+
+    def to_representation(self, profile):
+        if not hasattr(profile, "follow_counts"):
+            graph.attach_counts([profile])
+        return profile.follow_counts[self.index]
+
+
+class ProfileGraphListSerializer(serializers.ListSerializer):
+    """Load the follow counts of the whole page in one batch."""
+
+    def to_representation(self, data):
+        profiles = list(data.all() if isinstance(data, models.Manager) else data)
+        graph.attach_counts(profiles)
+        return super().to_representation(profiles)
+
+
 class ProfileSerializer(serializers.ModelSerializer):
+    image_renditions = ImageRenditionsField()
+
     class Meta:
         model = Profile
         fields = (
@@ -13,6 +66,7 @@ class ProfileSerializer(serializers.ModelSerializer):
             "first_name",
             "last_name",
             "image",
+            "image_renditions",
             "bio",
             "following",
         )
@@ -24,7 +78,17 @@ class FollowerSerializer(serializers.ModelSerializer):
         fields = ("id", "first_name", "last_name")
 
 
+class ProfileSearchSerializer(FollowerSerializer):
+    user = serializers.SlugRelatedField(read_only=True, slug_field="email")
+
+    class Meta:
+        model = Profile
+        fields = ("id", "user", "first_name", "last_name")
+
+
 class ProfileListSerializer(ProfileSerializer):
+    followers_count = FollowCountField(0)
+    following_count = FollowCountField(1)
     following = FollowerSerializer(many=True, read_only=True)
     followers = FollowerSerializer(many=True, read_only=True)
     user = serializers.SlugRelatedField(read_only=True, slug_field="email")
@@ -37,14 +101,27 @@ class ProfileListSerializer(ProfileSerializer):
             "first_name",
             "last_name",
             "image",
+            "image_renditions",
             "bio",
             "following",
             "followers",
+            "followers_count",
+            "following_count",
         )
-        read_only_fields = ("id", "user", "image", "following", "followers")
+        read_only_fields = (
+            "id",
+            "user",
+            "image",
+            "image_renditions",
+            "following",
+            "followers",
+        )
+        list_serializer_class = ProfileGraphListSerializer
 
 
 class ProfileRetrieveSerializer(ProfileSerializer):
+    followers_count = FollowCountField(0)
+    following_count = FollowCountField(1)
     following = FollowerSerializer(many=True, read_only=False)
     followers = FollowerSerializer(many=True, read_only=True)
 
@@ -54,11 +131,23 @@ class ProfileRetrieveSerializer(ProfileSerializer):
             "first_name",
             "last_name",
             "image",
+            "image_renditions",
             "bio",
             "following",
             "followers",
+            "followers_count",
+            "following_count",
         )
         read_only_fields = ("id", "user", "followers")
+        list_serializer_class = ProfileGraphListSerializer
+
+
+class FollowSuggestionSerializer(serializers.ModelSerializer):
+    profile = FollowerSerializer(source="suggested", read_only=True)
+
+    class Meta:
+        model = FollowSuggestion
+        fields = ("profile", "mutual_count", "tag_affinity", "score")
 
 
 class ReactionSerializer(serializers.ModelSerializer):
@@ -77,6 +166,35 @@ class ReactionListSerializer(ReactionSerializer):
     post = serializers.SlugRelatedField(slug_field="title", read_only=True)
 
 
+class BulkFollowSerializer(serializers.Serializer):
+    follow = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+    unfollow = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+
+    def validate(self, attrs):
+        if not attrs["follow"] and not attrs["unfollow"]:
+            raise serializers.ValidationError("Must be follow or unfollow")
+        if len(attrs["follow"]) + len(attrs["unfollow"]) > settings.BULK_MAX_ITEMS:
+            raise serializers.ValidationError(
+                f"At most {settings.BULK_MAX_ITEMS} profiles per request"
+            )
+        return attrs
+
+
+class BulkReactionItemSerializer(serializers.Serializer):
+    post = serializers.IntegerField()
+    reaction_type = serializers.ChoiceField(choices=Reaction.ReactionChoices)
+
+
+class BulkReactionSerializer(serializers.Serializer):
+    reactions = BulkReactionItemSerializer(
+        many=True, allow_empty=False, max_length=settings.BULK_MAX_ITEMS
+    )
+
+
 class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
@@ -90,9 +208,47 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ("id", "created_at")
 
 
+class ThreadCommentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Comment
+        fields = ("id", "author", "description", "created_at")
+
+
+class CommentThreadField(serializers.ReadOnlyField):
+    """Render the latest comments of a post with a cursor to the rest."""
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "*"
+        super().__init__(**kwargs)
+
+    def to_representation(self, post):
+        if not hasattr(post, "comment_thread"):
+            comment_threads.attach([post])
+        comments, has_more = post.comment_thread
+
+        request = self.context.get("request")
+        next_link = None
+        if has_more and request is not None:
+            next_link = comment_threads.next_link(request, post.pk, comments[-1])
+        return {
+            "next": next_link,
+            "results": ThreadCommentSerializer(comments, many=True).data,
+        }
+
+
+class PostThreadListSerializer(serializers.ListSerializer):
+    """Load the comment threads of the whole page with one query."""
+
+    def to_representation(self, data):
+        posts = list(data.all() if isinstance(data, models.Manager) else data)
+        comment_threads.attach(posts)
+        return super().to_representation(posts)
+
+
 class PostSerializer(TaggitSerializer, serializers.ModelSerializer):
     tags = TagListSerializerField()
-    comments = CommentSerializer(many=True, read_only=True)
+    image_renditions = ImageRenditionsField()
+    comments = CommentThreadField()
 
     class Meta:
         model = Post
@@ -102,15 +258,23 @@ class PostSerializer(TaggitSerializer, serializers.ModelSerializer):
             "author",
             "description",
             "image",
+            "image_renditions",
             "pub_date",
             "tags",
+            "like_count",
+            "dislike_count",
+            "comment_count",
             "comments",
         )
         read_only_fields = (
             "id",
             "pub_date",
+            "like_count",
+            "dislike_count",
+            "comment_count",
             "comments",
         )
+        list_serializer_class = PostThreadListSerializer
 
 
 class PostListSerializer(PostSerializer):
@@ -126,15 +290,23 @@ class PostRetrieveSerializer(PostSerializer):
             "author",
             "description",
             "image",
+            "image_renditions",
+            "like_count",
+            "dislike_count",
+            "comment_count",
             "comments",
             "pub_date",
         )
         read_only_fields = (
             "id",
             "author",
+            "like_count",
+            "dislike_count",
+            "comment_count",
             "comments",
             "pub_date",
         )
+        list_serializer_class = PostThreadListSerializer
 
 
 class PostTitleSerializer(PostSerializer):
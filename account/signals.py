@@ -0,0 +1,298 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from account import (
+    counters,
+    graph,
+    images,
+    profile_search,
+    realtime,
+    representation_cache,
+    search,
+    suggestions,
+    timeline,
+    trending,
+)
+from account.tasks import process_image
+from account.models import Post, Profile, Reaction, Comment
+from taggit.models import Tag
+from user.authentication import invalidate_user
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    # the token cache keeps request.user.profile alongside the user
+    invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_save, sender=Post)
+def schedule_image_processing(sender, instance, **kwargs):
+    if images.needs_processing(instance):
+        label = instance._meta.label
+        transaction.on_commit(lambda: process_image.delay(label, instance.pk))
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out_post(instance)
+
+
+@receiver(m2m_changed, sender=Profile.following.through)
+def remember_cleared_follows(sender, instance, action, reverse, **kwargs):
+    if action == "pre_clear":
+        # pk_set is not provided on clear, remember the related ids up front
+        related = instance.followers if reverse else instance.following
+        instance._cleared_follow_ids = set(related.values_list("pk", flat=True))
+
+
+def follow_change(instance, action, pk_set):
+    """Reduce an m2m action on ``Profile.following`` to ``(action, pk_set)``
+    with action "post_add" or "post_remove", or ``None`` if nothing changed."""
+    if action == "post_clear":
+        pk_set = getattr(instance, "_cleared_follow_ids", set())
+        action = "post_remove"
+
+    if action not in ("post_add", "post_remove") or not pk_set:
+        return None
+    return action, pk_set
+
+
+@receiver(m2m_changed, sender=Profile.following.through)
+def sync_timelines_on_follow(sender, instance, action, reverse, pk_set, **kwargs):
+    change = follow_change(instance, action, pk_set)
+    if change is None:
+        return
+    action, pk_set = change
+
+    if reverse:
+        # instance gained/lost followers from pk_set
+        followers, authors = pk_set, {instance.pk}
+    else:
+        # instance started/stopped following pk_set
+        followers, authors = {instance.pk}, pk_set
+
+    timeline.refresh_fanout_flags(authors)
+
+    if action == "post_add":
+        for follower_id in followers:
+            timeline.backfill(follower_id, authors)
+    else:
+        timeline.remove_authors(followers, authors)
+
+
+@receiver(m2m_changed, sender=Profile.following.through)
+def invalidate_follow_graph(sender, instance, action, reverse, pk_set, **kwargs):
+    change = follow_change(instance, action, pk_set)
+    if change is None:
+        return
+    if reverse:
+        graph.follows_changed(change[1], {instance.pk})
+    else:
+        graph.follows_changed({instance.pk}, change[1])
+
+
+@receiver(m2m_changed, sender=Profile.following.through)
+def flag_stale_suggestions(sender, instance, action, reverse, pk_set, **kwargs):
+    change = follow_change(instance, action, pk_set)
+    if change is not None:
+        suggestions.follows_changed(change[1] if reverse else {instance.pk})
+
+
+@receiver(post_save, sender=Profile)
+def reset_new_profile_graph(sender, instance, created, **kwargs):
+    # a new profile follows nobody, drop whatever a reused pk left behind
+    if created:
+        graph.follows_changed([instance.pk], [instance.pk])
+
+
+@receiver(pre_delete, sender=Profile)
+def invalidate_deleted_profile_graph(sender, instance, **kwargs):
+    follows = Profile.following.through.objects
+    graph.follows_changed(
+        [
+            instance.pk,
+            *follows.filter(to_profile=instance).values_list(
+                "from_profile_id", flat=True
+            ),
+        ],
+        [
+            instance.pk,
+            *follows.filter(from_profile=instance).values_list(
+                "to_profile_id", flat=True
+            ),
+        ],
+    )
+
+
+@receiver(post_save, sender=Post)
+def publish_new_post(sender, instance, created, **kwargs):
+    if created:
+        realtime.post_created(instance)
+
+
+@receiver(post_save, sender=Comment)
+def publish_new_comment(sender, instance, created, **kwargs):
+    if not created:
+        return
+    if Comment.post.is_cached(instance):
+        author_id = instance.post.author_id
+    else:
+        author_id = (
+            Post.objects.filter(pk=instance.post_id)
+            .values_list("author_id", flat=True)
+            .first()
+        )
+    realtime.comment_created(instance, author_id)
+
+
+@receiver(post_init, sender=Reaction)
+def remember_reaction_type(sender, instance, **kwargs):
+    # None when the field is deferred, the next save is then published
+    instance._saved_reaction_type = instance.__dict__.get("reaction_type")
+
+
+@receiver(post_save, sender=Reaction)
+def publish_reaction(sender, instance, created, **kwargs):
+    if created or instance.reaction_type != instance._saved_reaction_type:
+        realtime.reactions_changed(
+            instance.user_id, {instance.post_id: instance.reaction_type}
+        )
+    instance._saved_reaction_type = instance.reaction_type
+
+
+@receiver(post_delete, sender=Reaction)
+def decrement_reaction_counter(sender, instance, **kwargs):
+    counters.reaction_changed(instance.post_id, old_type=instance.reaction_type)
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_counter(sender, instance, created, **kwargs):
+    if created:
+        counters.comment_added(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_counter(sender, instance, **kwargs):
+    counters.comment_removed(instance.post_id)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.index_posts([instance])
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def reindex_post_tags(sender, instance, action, **kwargs):
+    if isinstance(instance, Post) and action in (
+        "post_add",
+        "post_remove",
+        "post_clear",
+    ):
+        search.index_posts([instance])
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def count_trending_tags(sender, instance, action, pk_set, **kwargs):
+    if not isinstance(instance, Post):
+        return
+    if action == "pre_clear":
+        # pk_set is not provided on clear, remember the names up front
+        instance._cleared_tag_names = list(instance.tags.names())
+    elif action == "post_clear":
+        trending.count(instance.pub_date, instance._cleared_tag_names, delta=-1)
+    elif action in ("post_add", "post_remove") and pk_set:
+        names = Tag.objects.filter(pk__in=pk_set).values_list("name", flat=True)
+        trending.count(
+            instance.pub_date, names, delta=1 if action == "post_add" else -1
+        )
+
+
+@receiver(pre_delete, sender=Post)
+def uncount_deleted_post_tags(sender, instance, **kwargs):
+    # the tagged items are removed by the cascade without any m2m signal
+    trending.count(instance.pub_date, instance.tags.names(), delta=-1)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+def index_profile(sender, instance, **kwargs):
+    profile_search.index_profile(instance)
+
+
+@receiver(post_save, sender=get_user_model())
+def reindex_profile_email(sender, instance, created, **kwargs):
+    profile = Profile.objects.filter(user=instance).first()
+    if profile is not None:
+        profile_search.index_profile(profile)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_representation(sender, instance, **kwargs):
+    representation_cache.bump(sender, [instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_thread(sender, instance, **kwargs):
+    # posts embed their latest comments
+    representation_cache.bump(Post, [instance.post_id])
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_post_tags(sender, instance, action, **kwargs):
+    if isinstance(instance, Post) and action.startswith("post_"):
+        representation_cache.bump(Post, [instance.pk])
+
+
+def related_profile_ids(profile):
+    """Profiles whose representation nests ``profile`` in following/followers."""
+    follows = Profile.following.through.objects
+    return {
+        *follows.filter(to_profile=profile).values_list("from_profile_id", flat=True),
+        *follows.filter(from_profile=profile).values_list("to_profile_id", flat=True),
+    }
+
+
+@receiver(post_save, sender=Profile)
+def invalidate_profile_representation(sender, instance, created, **kwargs):
+    related = set() if created else related_profile_ids(instance)
+    representation_cache.bump(Profile, [instance.pk, *related])
+
+
+@receiver(pre_delete, sender=Profile)
+def invalidate_deleted_profile_representation(sender, instance, **kwargs):
+    # the follow rows are removed by the cascade without any m2m signal
+    representation_cache.bump(Profile, [instance.pk, *related_profile_ids(instance)])
+
+
+@receiver(m2m_changed, sender=Profile.following.through)
+def invalidate_follow_representation(sender, instance, action, pk_set, **kwargs):
+    change = follow_change(instance, action, pk_set)
+    if change is not None:
+        representation_cache.bump(Profile, [instance.pk, *change[1]])
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_profile_email(sender, instance, created, **kwargs):
+    if not created:
+        representation_cache.bump(
+            Profile, Profile.objects.filter(user=instance).values_list("pk", flat=True)
+        )
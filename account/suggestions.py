@@ -0,0 +1,197 @@
+import itertools
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from account import graph
+from account.models import FollowSuggestion, Profile, Post
+from account.timeline import ID_BATCH_SIZE, batched
+
+Follow = Profile.following.through
+
+
+def _pairs(rows):
+    """Read id pairs as an ``(n, 2)`` array."""
+    flat = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64)
+    return flat.reshape(-1, 2)
+
+
+def reachable_follows(profile_ids):
+    """Distinct ``(follower, followed)`` pairs of the follows of
+    ``profile_ids`` and of the profiles they follow, all the edges two hops
+    from them go through."""
+    followed = Follow.objects.filter(from_profile_id__in=profile_ids)
+    second = Follow.objects.filter(from_profile_id__in=followed.values("to_profile_id"))
+    pairs = [
+        _pairs(follows.values_list("from_profile_id", "to_profile_id"))
+        for follows in (followed, second)
+    ]
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+def follow_matrix(index, pairs):
+    """Adjacency matrix of the ``(follower, followed)`` pairs over the
+    sorted profile ids of ``index``, ``A[i, j]`` is 1 when profile
+    ``index[i]`` follows profile ``index[j]``."""
+    rows = np.searchsorted(index, pairs[:, 0])
+    columns = np.searchsorted(index, pairs[:, 1])
+    return sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.float32), (rows, columns)),
+        shape=(len(index), len(index)),
+    )
+
+
+def tag_matrix(index):
+    """Row-normalized profile x tag matrix counting the tags of the posts
+    of the profiles of ``index``."""
+    pairs = np.concatenate(
+        [np.empty((0, 2), dtype=np.int64)]
+        + [
+            _pairs(
+                Post.objects.filter(
+                    author_id__in=authors, tags__isnull=False
+                ).values_list("author_id", "tags__id")
+            )
+            for authors in batched(index.tolist())
+        ]
+    )
+    tags, columns = np.unique(pairs[:, 1], return_inverse=True)
+    counts = sparse.csr_matrix(
+        (
+            np.ones(len(pairs), dtype=np.float32),
+            (np.searchsorted(index, pairs[:, 0]), columns),
+        ),
+        shape=(len(index), len(tags)),
+    )
+    norms = np.sqrt(np.asarray(counts.multiply(counts).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ counts
+
+
+def rank(rows, follows, tags, top_k, tag_weight):
+    """Top ``top_k`` friends-of-friends of the profiles at ``rows``.
+
+    Returns ``(row, column, mutual, affinity, score, rank)`` arrays where
+    ``row`` indexes ``rows`` and ``column`` the profile index. Candidates
+    are reached in two hops, the profile itself and the profiles it
+    already follows are excluded. Scores are the number of mutual follows
+    plus ``tag_weight`` times the cosine similarity of their tags.
+    """
+    followed = follows[rows]
+    itself = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (np.arange(len(rows)), rows)),
+        shape=followed.shape,
+    )
+    excluded = (followed + itself).astype(bool)
+    mutual = followed @ follows
+    mutual = (mutual - mutual.multiply(excluded)).tocoo()
+    mutual.eliminate_zeros()
+
+    row, column, count = mutual.row, mutual.col, mutual.data
+    affinity = np.asarray(
+        tags[rows[row]].multiply(tags[column]).sum(axis=1), dtype=np.float32
+    ).ravel()
+    score = count + tag_weight * affinity
+
+    # per row by descending score, ties keep the lower profile id first
+    order = np.lexsort((column, -score, row))
+    row, column, count, affinity, score = (
+        values[order] for values in (row, column, count, affinity, score)
+    )
+    starts = np.searchsorted(row, row)
+    position = np.arange(len(row)) - starts
+    keep = position < top_k
+    return (
+        row[keep],
+        column[keep],
+        count[keep],
+        affinity[keep],
+        score[keep],
+        position[keep],
+    )
+
+
+def mark_stale(profile_ids):
+    for batch in batched(profile_ids):
+        Profile.objects.filter(pk__in=batch, suggestions_stale=False).update(
+            suggestions_stale=True
+        )
+
+
+def follows_changed(follower_ids):
+    """Flag the profiles whose friends-of-friends changed when
+    ``follower_ids`` followed or unfollowed someone: they themselves and
+    everyone following them."""
+    follower_ids = list(follower_ids)
+    followers = graph.get_graph().members(graph.FOLLOWERS, follower_ids)
+    mark_stale({*follower_ids, *itertools.chain.from_iterable(followers.values())})
+
+
+def store(batch, index, ranked):
+    row, column, mutual, affinity, score, position = ranked
+    suggestions = [
+        FollowSuggestion(
+            profile_id=int(batch[r]),
+            suggested_id=int(index[c]),
+            rank=int(p),
+            score=float(s),
+            mutual_count=int(m),
+            tag_affinity=float(a),
+        )
+        for r, c, m, a, s, p in zip(row, column, mutual, affinity, score, position)
+    ]
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(profile_id__in=batch.tolist()).delete()
+        FollowSuggestion.objects.bulk_create(suggestions)
+
+
+def refresh_batch(batch, top_k, tag_weight):
+    """Rank the suggestions of the ``batch`` profile ids from the part of
+    the graph within two hops of them."""
+    pairs = reachable_follows(batch.tolist())
+    index = np.union1d(batch, pairs.ravel())
+    store(
+        batch,
+        index,
+        rank(
+            np.searchsorted(index, batch),
+            follow_matrix(index, pairs),
+            tag_matrix(index),
+            top_k,
+            tag_weight,
+        ),
+    )
+
+
+def refresh(profile_ids=None, top_k=None, batch_size=None, tag_weight=None):
+    """Recompute the stored suggestions of stale profiles, or of
+    ``profile_ids`` when given, and return the number of profiles done.
+
+    Profiles are ranked ``batch_size`` at a time, each batch clears its
+    stale flags before the graph is read, so a follow made while the job
+    runs flags its profiles again for the next run.
+    """
+    config = settings.FOLLOW_SUGGESTIONS
+    top_k = top_k or config["TOP_K"]
+    # every batch binds its ids into single statements
+    batch_size = min(batch_size or config["BATCH_SIZE"], ID_BATCH_SIZE)
+    tag_weight = config["TAG_WEIGHT"] if tag_weight is None else tag_weight
+
+    targets = Profile.objects.order_by("pk")
+    if profile_ids is None:
+        targets = targets.filter(suggestions_stale=True)
+    else:
+        targets = targets.filter(pk__in=profile_ids)
+    targets = np.fromiter(targets.values_list("pk", flat=True), dtype=np.int64)
+
+    for start in range(0, len(targets), batch_size):
+        batch = targets[start : start + batch_size]
+        Profile.objects.filter(pk__in=batch.tolist()).update(suggestions_stale=False)
+        try:
+            refresh_batch(batch, top_k, tag_weight)
+        except Exception:
+            mark_stale(batch.tolist())
+            raise
+    return len(targets)
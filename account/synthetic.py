@@ -0,0 +1,163 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+from taggit.models import Tag, TaggedItem
+
+from account.models import Profile, Post, Comment, Reaction
+
+Follow = Profile.following.through
+
+
+def popularity(rng, ids, exponent):
+    """Zipf-like cumulative weights over a shuffled copy of ``ids``."""
+    ranked = list(ids)
+    rng.shuffle(ranked)
+    weights = [1 / (rank + 1) ** exponent for rank in range(len(ranked))]
+    return ranked, list(accumulate(weights))
+
+
+def pick(rng, population, count, cum_weights=None):
+    """Up to ``count`` distinct items, uniformly or by cumulative weight."""
+    count = min(count, len(population))
+    if cum_weights is None:
+        return rng.sample(population, count)
+    return set(rng.choices(population, cum_weights=cum_weights, k=count))
+
+
+def generate(
+    profiles=200,
+    posts_per_profile=10,
+    follows_per_profile=20,
+    comments_per_post=2,
+    reactions_per_post=3,
+    tags_per_post=0,
+    tag_vocabulary=200,
+    follower_exponent=0,
+    seed=0,
+    batch_size=1000,
+):
+    """Bulk insert a synthetic social graph and return the new profiles.
+
+    With a positive ``follower_exponent`` followed profiles are drawn from a
+    power-law popularity distribution instead of uniformly, and tags follow
+    the same distribution over ``tag_vocabulary`` names. Signals are
+    bypassed, so derived data (timelines, counters, search indexes) has to
+    be rebuilt by the caller when it matters.
+    """
+    rng = random.Random(seed)
+    prefix = f"synthetic-{seed}-{rng.getrandbits(32):08x}"
+    now = timezone.now()
+    password = make_password(None)
+
+    users = get_user_model().objects.bulk_create(
+        [
+            get_user_model()(email=f"{prefix}-{index}@example.com", password=password)
+            for index in range(profiles)
+        ],
+        batch_size=batch_size,
+    )
+    created_profiles = Profile.objects.bulk_create(
+        [
+            Profile(user=user, first_name=f"first{index}", last_name=f"last{index}")
+            for index, user in enumerate(users)
+        ],
+        batch_size=batch_size,
+    )
+    profile_ids = [profile.pk for profile in created_profiles]
+
+    ranked, cum_weights = profile_ids, None
+    if follower_exponent:
+        ranked, cum_weights = popularity(rng, profile_ids, follower_exponent)
+
+    follows = []
+    for profile_id in profile_ids:
+        targets = pick(rng, ranked, follows_per_profile, cum_weights)
+        follows.extend(
+            Follow(from_profile_id=profile_id, to_profile_id=target)
+            for target in targets
+            if target != profile_id
+        )
+    Follow.objects.bulk_create(follows, batch_size=batch_size, ignore_conflicts=True)
+
+    posts = Post.objects.bulk_create(
+        [
+            Post(
+                title=f"Post {index} of {profile_id}",
+                author_id=profile_id,
+                description="Synthetic post",
+            )
+            for profile_id in profile_ids
+            for index in range(posts_per_profile)
+        ],
+        batch_size=batch_size,
+    )
+    # auto_now_add ignores provided values, spread the dates afterwards
+    for post in posts:
+        post.pub_date = now - timedelta(minutes=rng.randrange(60 * 24 * 30))
+    Post.objects.bulk_update(posts, ["pub_date"], batch_size=batch_size)
+
+    comments = Comment.objects.bulk_create(
+        [
+            Comment(
+                author_id=rng.choice(profile_ids),
+                post=post,
+                description="Synthetic comment",
+            )
+            for post in posts
+            for _ in range(comments_per_post)
+        ],
+        batch_size=batch_size,
+    )
+    for comment in comments:
+        comment.created_at = comment.post.pub_date + timedelta(
+            minutes=rng.randrange(60 * 24)
+        )
+    Comment.objects.bulk_update(comments, ["created_at"], batch_size=batch_size)
+
+    if tags_per_post:
+        tag_posts(rng, posts, tags_per_post, tag_vocabulary, prefix, batch_size)
+
+    reactions = []
+    for post in posts:
+        for profile_id in rng.sample(
+            profile_ids, min(reactions_per_post, len(profile_ids))
+        ):
+            reactions.append(
+                Reaction(
+                    user_id=profile_id,
+                    post=post,
+                    reaction_type=rng.choice(Reaction.ReactionChoices.values),
+                )
+            )
+    Reaction.objects.bulk_create(
+        reactions, batch_size=batch_size, ignore_conflicts=True
+    )
+
+    return created_profiles
+
+
+def tag_posts(rng, posts, tags_per_post, vocabulary, prefix, batch_size):
+    names = [f"{prefix}-tag{index}" for index in range(vocabulary)]
+    Tag.objects.bulk_create(
+        [Tag(name=name, slug=name) for name in names],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    tag_ids = list(Tag.objects.filter(name__in=names).values_list("pk", flat=True))
+    ranked, cum_weights = popularity(rng, tag_ids, 1)
+
+    content_type = ContentType.objects.get_for_model(Post)
+    TaggedItem.objects.bulk_create(
+        [
+            TaggedItem(content_type=content_type, object_id=post.pk, tag_id=tag_id)
+            for post in posts
+            for tag_id in pick(rng, ranked, tags_per_post, cum_weights)
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
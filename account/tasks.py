@@ -0,0 +1,16 @@
+from celery import shared_task
+from django.apps import apps
+
+from account import images, suggestions
+
+
+@shared_task
+def process_image(model_label, pk):
+    instance = apps.get_model(model_label).objects.filter(pk=pk).first()
+    if instance is not None and images.needs_processing(instance):
+        images.process(instance)
+
+
+@shared_task
+def refresh_follow_suggestions():
+    suggestions.refresh()
@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from account.models import Profile, Post, Comment
+from user.authentication import local_tokens
+
+ASYNC_FEED_URL = reverse("account:async-post-list")
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        local_tokens.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="async@test.com", password="testpassword"
+        )
+        self.other_user = get_user_model().objects.create_user(
+            email="async-other@test.com", password="testpassword"
+        )
+        self.profile = Profile.objects.create(
+            user=self.user, first_name="async", last_name="async_last"
+        )
+        self.other = Profile.objects.create(
+            user=self.other_user, first_name="other", last_name="other_last"
+        )
+        self.profile.following.add(self.other)
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        for index in range(5):
+            post = Post.objects.create(
+                title=f"Post {index}", author=self.other, description="text"
+            )
+            post.tags.add("django")
+            Comment.objects.create(author=self.profile, post=post, description="hi")
+
+    def get_both(self, sync_url, async_url, params=None):
+        cache.clear()
+        sync_response = self.client.get(sync_url, params)
+        cache.clear()
+        async_response = self.client.get(async_url, params)
+
+        self.assertEqual(sync_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        return sync_response, async_response
+
+    def assertSameResponse(self, sync_url, async_url):
+        sync_response, async_response = self.get_both(sync_url, async_url)
+        self.assertEqual(async_response.content, sync_response.content)
+
+    def test_feed_matches_sync_feed(self):
+        sync_response, async_response = self.get_both(
+            reverse("account:post-list"), ASYNC_FEED_URL, {"limit": 2}
+        )
+        data = async_response.json()
+        self.assertEqual(data["results"], sync_response.json()["results"])
+        self.assertEqual(len(data["results"]), 2)
+        self.assertTrue(data["next"].startswith(f"http://testserver{ASYNC_FEED_URL}"))
+
+        next_page = self.client.get(data["next"])
+        self.assertEqual(next_page.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(next_page.json()["results"]), 2)
+
+    def test_post_detail_matches_sync_retrieve(self):
+        post = Post.objects.first()
+        self.assertSameResponse(
+            reverse("account:post-detail", args=[post.id]),
+            reverse("account:async-post-detail", args=[post.id]),
+        )
+
+    def test_profile_detail_matches_sync_retrieve(self):
+        self.assertSameResponse(
+            reverse("account:profile-detail", args=[self.profile.id]),
+            reverse("account:async-profile-detail", args=[self.profile.id]),
+        )
+
+    def test_other_profile_is_not_found(self):
+        response = self.client.get(
+            reverse("account:async-profile-detail", args=[self.other.id])
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_auth_required(self):
+        self.client.credentials()
+        response = self.client.get(ASYNC_FEED_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.credentials(HTTP_AUTHORIZATION="Token invalid")
+        response = self.client.get(ASYNC_FEED_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+
+from account import benchmark
+from account.models import Profile, Post
+
+
+class BenchmarkTests(TestCase):
+    def seed(self, **options):
+        call_command(
+            "seed_graph",
+            users=30,
+            posts_per_user=2,
+            follows_per_user=10,
+            stdout=StringIO(),
+            **options,
+        )
+
+    def test_seed_graph_skews_followers(self):
+        self.seed(follower_exponent=1.5)
+
+        counts = sorted(
+            Profile.objects.annotate(total=Count("followers")).values_list(
+                "total", flat=True
+            ),
+            reverse=True,
+        )
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertGreater(counts[0], 5 * max(counts[len(counts) // 2], 1))
+        self.assertTrue(Post.objects.filter(tags__isnull=False).exists())
+
+    def test_benchmark_reports_every_scenario(self):
+        self.seed()
+        handle, path = tempfile.mkstemp(suffix=".json")
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+
+        call_command(
+            "benchmark_api",
+            requests=3,
+            warmup=1,
+            output=path,
+            stderr=StringIO(),
+        )
+
+        with open(path) as file:
+            report = json.load(file)
+        self.assertEqual(set(report["scenarios"]), set(benchmark.SCENARIOS))
+        for stats in report["scenarios"].values():
+            self.assertEqual(stats["errors"], 0)
+            self.assertEqual(stats["requests"], 3)
+            self.assertGreaterEqual(stats["p99_ms"], stats["p50_ms"])
+            self.assertGreater(stats["queries_per_request"], 0)
+
+    def test_serializer_benchmark_compares_identical_output(self):
+        self.seed()
+        output = StringIO()
+
+        call_command(
+            "benchmark_serializers",
+            rows=20,
+            repeat=1,
+            stdout=output,
+            stderr=StringIO(),
+        )
+
+        report = json.loads(output.getvalue())
+        self.assertEqual(set(report), set(benchmark.SERIALIZER_CASES))
+        for stats in report.values():
+            self.assertTrue(stats["identical"])
+            self.assertGreater(stats["fast_us_per_row"], 0)
+
+    def test_percentile(self):
+        ordered = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(ordered, 50), 50)
+        self.assertEqual(benchmark.percentile(ordered, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
@@ -0,0 +1,171 @@
+import datetime
+import decimal
+import time
+import uuid
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from account import graph
+from account.models import Comment, Profile, Post
+from account.renderers import FastJSONRenderer
+from user.authentication import local_tokens
+
+POST_URL = reverse("account:post-list")
+ASYNC_FEED_URL = reverse("account:async-post-list")
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def assertSameOutput(self, data):
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_output_matches_stdlib_renderer(self):
+        self.assertSameOutput(
+            {
+                "created": datetime.datetime(
+                    2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc
+                ),
+                "naive": datetime.datetime(2024, 1, 2, 3, 4, 5),
+                "date": datetime.date(2024, 1, 2),
+                "time": datetime.time(3, 4, 5, 600),
+                "decimal": decimal.Decimal("1.50"),
+                "uuid": uuid.UUID(int=1),
+                "lazy": gettext_lazy("text"),
+                "separators": "a b c",
+                "unicode": "zażółć",
+                "nested": [{"float": 1.5, "none": None, "bool": True}],
+                1: "non-str key",
+            }
+        )
+
+    def test_falls_back_on_values_orjson_rejects(self):
+        self.assertSameOutput({"big": 2**70})
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        local_tokens.clear()
+        graph.get_graph().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="conditional@test.com", password="testpassword"
+        )
+        other_user = get_user_model().objects.create_user(
+            email="conditional-other@test.com", password="testpassword"
+        )
+        self.profile = Profile.objects.create(
+            user=self.user, first_name="reader", last_name="reader_last"
+        )
+        self.other = Profile.objects.create(
+            user=other_user, first_name="author", last_name="author_last"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.following.add(self.other)
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        for index in range(3):
+            Post.objects.create(
+                title=f"Post {index}", author=self.other, description="text"
+            )
+        self.post = Post.objects.first()
+
+    def assertRevalidates(self, url, params=None):
+        """Return the ETag of ``url`` after checking it answers 304."""
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        cached = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cached.content, b"")
+        self.assertEqual(cached["ETag"], etag)
+        return etag
+
+    def test_post_retrieve_changes_with_comments(self):
+        url = reverse("account:post-detail", args=[self.post.id])
+        etag = self.assertRevalidates(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(
+                author=self.profile, post=self.post, description="new"
+            )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_post_list_changes_with_author(self):
+        etag = self.assertRevalidates(POST_URL, {"limit": 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.first_name = "renamed"
+            self.other.save()
+        response = self.client.get(POST_URL, {"limit": 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_async_feed_changes_with_author(self):
+        etag = self.assertRevalidates(ASYNC_FEED_URL, {"limit": 2})
+        self.assertNotEqual(etag, self.client.get(POST_URL, {"limit": 2})["ETag"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.first_name = "renamed"
+            self.other.save()
+        response = self.client.get(
+            ASYNC_FEED_URL, {"limit": 2}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_profile_retrieve_changes_with_follows(self):
+        for url, follow in (
+            (reverse("account:profile-detail", args=[self.profile.id]), False),
+            (reverse("account:async-profile-detail", args=[self.profile.id]), True),
+        ):
+            etag = self.assertRevalidates(url)
+            with self.captureOnCommitCallbacks(execute=True):
+                if follow:
+                    self.profile.following.add(self.other)
+                else:
+                    self.profile.following.remove(self.other)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(response["ETag"], etag)
+
+    def test_local_cache_versions_expire(self):
+        url = reverse("account:post-detail", args=[self.post.id])
+        etag = self.assertRevalidates(url)
+
+        # written by another process, its bump never reaches this cache
+        Post.objects.filter(pk=self.post.pk).update(title="elsewhere")
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+        later = time.time() + settings.REPRESENTATION_CACHE_LOCAL_TIMEOUT + 1
+        with mock.patch("time.time", return_value=later):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["title"], "elsewhere")
+
+    def test_if_modified_since(self):
+        url = reverse("account:post-detail", args=[self.post.id])
+        last_modified = self.client.get(url)["Last-Modified"]
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE="Mon, 01 Jan 2001 00:00:00 GMT"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,144 @@
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from account import graph
+from account.fast_serializers import compile_serializer
+from account.models import Comment, Profile, Post, Reaction
+from account.serializers import (
+    PostListSerializer,
+    ProfileListSerializer,
+    ReactionListSerializer,
+)
+
+POST_URL = reverse("account:post-list")
+PROFILE_URL = reverse("account:profile-list")
+REACTION_URL = reverse("account:reaction-list")
+
+
+class CompileSerializerTests(TestCase):
+    def test_list_serializers_compile(self):
+        for serializer_class in (
+            PostListSerializer,
+            ProfileListSerializer,
+            ReactionListSerializer,
+        ):
+            self.assertIsNotNone(compile_serializer(serializer_class))
+
+    def test_unsupported_fields_fall_back(self):
+        class ComputedSerializer(serializers.ModelSerializer):
+            summary = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Post
+                fields = ("id", "summary")
+
+            def get_summary(self, post):
+                return post.title[:10]
+
+        self.assertIsNone(compile_serializer(ComputedSerializer))
+
+
+class FastListTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        graph.get_graph().clear()
+        self.client = APIClient()
+        self.profiles = []
+        for index, (first_name, last_name) in enumerate(
+            [("anna", "same"), ("bob", "same"), ("carl", "other"), ("dora", "")]
+        ):
+            user = get_user_model().objects.create_user(
+                email=f"fast{index}@test.com", password="testpassword"
+            )
+            self.profiles.append(
+                Profile.objects.create(
+                    user=user,
+                    first_name=first_name,
+                    last_name=last_name,
+                    bio="bio" if index % 2 else None,
+                    image="upload/profiles/images/face.jpg" if index == 1 else None,
+                )
+            )
+        self.profile = self.profiles[0]
+        self.client.force_authenticate(self.profile.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.following.add(*self.profiles[1:])
+            self.profiles[2].following.add(self.profile, self.profiles[1])
+
+            for index in range(5):
+                author = self.profiles[index % 3]
+                post = Post.objects.create(
+                    author=author,
+                    title=f"post {index}",
+                    description="text",
+                    image="upload/posts/images/post.jpg" if index == 2 else None,
+                    image_renditions=(
+                        {
+                            "source": {"name": "post.jpg", "width": 8, "height": 8},
+                            "thumb": {"name": "thumb.jpg", "width": 4, "height": 4},
+                        }
+                        if index == 2
+                        else {}
+                    ),
+                    like_count=index,
+                )
+                post.tags.add("zeta", "alpha", f"tag{index}")
+                for number in range(index):
+                    Comment.objects.create(
+                        author=self.profiles[number % 4],
+                        post=post,
+                        description=f"comment {number}",
+                    )
+                Reaction.objects.create(
+                    user=self.profile,
+                    post=post,
+                    reaction_type=Reaction.ReactionChoices.values[index % 2],
+                )
+
+    def assertSameResponses(self, url, **params):
+        cache.clear()
+        fast = self.client.get(url, params)
+        cache.clear()
+        with override_settings(FAST_LIST_SERIALIZERS=False):
+            regular = self.client.get(url, params)
+
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, regular.content)
+        return fast
+
+    def test_post_list_is_byte_identical(self):
+        response = self.assertSameResponses(POST_URL, limit=10)
+        self.assertEqual(len(response.data["results"]), 5)
+        self.assertSameResponses(POST_URL, tags="tag2")
+
+        response = self.assertSameResponses(POST_URL, limit=2)
+        query = parse_qs(urlparse(response.data["next"]).query)
+        self.assertSameResponses(POST_URL, limit=2, cursor=query["cursor"][0])
+
+    def test_profile_list_is_byte_identical(self):
+        self.assertSameResponses(PROFILE_URL, limit=10)
+        self.assertSameResponses(PROFILE_URL, limit=2, offset=2)
+        self.assertSameResponses(PROFILE_URL, last_name="same")
+
+    def test_reaction_list_is_byte_identical(self):
+        response = self.assertSameResponses(REACTION_URL, limit=10)
+        self.assertEqual(len(response.data["results"]), 5)
+        self.assertSameResponses(REACTION_URL, limit=3)
+
+    def test_fast_path_batches_queries(self):
+        with CaptureQueriesContext(connection) as fast:
+            self.client.get(POST_URL, {"limit": 10})
+        with override_settings(FAST_LIST_SERIALIZERS=False):
+            with CaptureQueriesContext(connection) as regular:
+                self.client.get(POST_URL, {"limit": 10})
+
+        self.assertLess(len(fast), len(regular))
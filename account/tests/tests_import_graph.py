@@ -0,0 +1,165 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from account.models import (
+    Profile,
+    Post,
+    Comment,
+    Reaction,
+    TimelineEntry,
+    FollowSuggestion,
+)
+from account.tests.utils import OLD_SQLITE_VARIABLES, sqlite_variable_limit
+
+
+class ImportGraphTests(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_jsonl(self, name, records, compress=False):
+        path = os.path.join(self.directory, name)
+        opener = gzip.open if compress else open
+        with opener(path, "wt", encoding="utf-8") as file:
+            for record in records:
+                file.write(json.dumps(record) + "\n")
+        return path
+
+    def write_csv(self, name, records):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=list(records[0]))
+            writer.writeheader()
+            writer.writerows(records)
+        return path
+
+    def import_graph(self, batch_size=2, **paths):
+        call_command(
+            "import_graph",
+            batch_size=batch_size,
+            default_password="imported-pass",
+            stdout=StringIO(),
+            **paths,
+        )
+
+    def test_import_keeps_ids_dates_and_tags(self):
+        self.import_graph(
+            users=self.write_jsonl(
+                "users.jsonl.gz",
+                [
+                    {"id": 10, "email": "alice@example.com"},
+                    {"id": 11, "email": "bob@example.com"},
+                    {"id": 12, "email": "carol@example.com"},
+                ],
+                compress=True,
+            ),
+            profiles=self.write_csv(
+                "profiles.csv",
+                [
+                    {"id": 20, "user": 10, "first_name": "Alice", "last_name": "A"},
+                    {"id": 21, "user": 11, "first_name": "Bob", "last_name": "B"},
+                    {"id": 22, "user": 12, "first_name": "Carol", "last_name": "C"},
+                ],
+            ),
+            follows=self.write_csv(
+                "follows.csv", [{"from": 21, "to": 20}, {"from": 22, "to": 20}]
+            ),
+            posts=self.write_csv(
+                "posts.csv",
+                [
+                    {
+                        "id": 30,
+                        "author": 20,
+                        "title": "Imported",
+                        "pub_date": "2024-01-02T03:04:05+00:00",
+                        "tags": "django|python",
+                    },
+                ],
+            ),
+            comments=self.write_jsonl(
+                "comments.jsonl",
+                [{"id": 40, "author": 21, "post": 30, "description": "hi"}],
+            ),
+            reactions=self.write_jsonl(
+                "reactions.jsonl",
+                [
+                    {"user": 21, "post": 30, "reaction_type": "Like"},
+                    {"user": 22, "post": 30, "reaction_type": "Like"},
+                ],
+            ),
+        )
+
+        user = get_user_model().objects.get(pk=10)
+        self.assertTrue(user.check_password("imported-pass"))
+        self.assertEqual(
+            set(Profile.objects.get(pk=20).followers.values_list("pk", flat=True)),
+            {21, 22},
+        )
+
+        post = Post.objects.get(pk=30)
+        self.assertEqual(post.pub_date.year, 2024)
+        self.assertEqual(set(post.tags.names()), {"django", "python"})
+        self.assertEqual(post.like_count, 2)
+        self.assertEqual(post.comment_count, 1)
+        self.assertTrue(Comment.objects.filter(pk=40, post=post).exists())
+        self.assertTrue(TimelineEntry.objects.filter(profile_id=21, post=post).exists())
+
+        # sequences continue after the imported ids
+        new_post = Post.objects.create(title="New", author_id=20, description="")
+        self.assertGreater(new_post.pk, 30)
+
+    def test_invalid_rows_abort_with_command_error(self):
+        path = self.write_jsonl("reactions.jsonl", [{"user": 1}])
+
+        with self.assertRaises(CommandError):
+            self.import_graph(reactions=path)
+        self.assertFalse(Reaction.objects.exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=10)
+    def test_import_and_rebuild_past_the_sqlite_variable_limit(self):
+        count = OLD_SQLITE_VARIABLES + 1
+        ids = range(1, count + 1)
+        with sqlite_variable_limit():
+            self.import_graph(
+                batch_size=5000,
+                users=self.write_jsonl(
+                    "users.jsonl", [{"id": i, "email": f"u{i}@test.com"} for i in ids]
+                ),
+                profiles=self.write_jsonl(
+                    "profiles.jsonl",
+                    [
+                        {"id": i, "user": i, "first_name": "F", "last_name": str(i)}
+                        for i in ids
+                    ],
+                ),
+                # everyone follows profile 1, which follows everyone back
+                follows=self.write_jsonl(
+                    "follows.jsonl",
+                    [{"from": i, "to": 1} for i in ids]
+                    + [{"from": 1, "to": i} for i in ids],
+                ),
+                posts=self.write_jsonl(
+                    "posts.jsonl",
+                    [
+                        {"id": i, "author": i, "title": "Post", "tags": [f"tag{i}"]}
+                        for i in ids
+                    ],
+                ),
+            )
+
+        self.assertTrue(Profile.objects.get(pk=1).is_high_fanout)
+        # its own post and those of the profiles it follows
+        self.assertEqual(TimelineEntry.objects.filter(profile_id=1).count(), count)
+        self.assertEqual(Post.objects.get(pk=count).tags.names()[0], f"tag{count}")
+        self.assertFalse(Profile.objects.filter(suggestions_stale=True).exists())
+        self.assertTrue(FollowSuggestion.objects.filter(profile_id=2).exists())
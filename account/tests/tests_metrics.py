@@ -0,0 +1,113 @@
+import re
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from account import metrics
+from account.models import Profile, Post
+
+POST_URL = reverse("account:post-list")
+ASYNC_FEED_URL = reverse("account:async-post-list")
+METRICS_URL = reverse("metrics")
+SLOW_LOG_URL = reverse("metrics-slow")
+
+
+def sample(text, name, **labels):
+    selector = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{name}{{{re.escape(selector)}}} (\S+)$", text, re.M)
+    return float(match.group(1)) if match else None
+
+
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self) -> None:
+        metrics.registry.reset()
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(
+            email="metrics@test.com", password="testpassword"
+        )
+        profile = Profile.objects.create(
+            user=user, first_name="first", last_name="last"
+        )
+        Post.objects.create(author=profile, title="post", description="text")
+        self.token = Token.objects.create(user=user)
+        self.client.force_authenticate(user)
+
+    def test_requests_are_recorded_per_view_action(self):
+        self.client.get(POST_URL)
+        self.client.get(POST_URL)
+
+        text = self.client.get(METRICS_URL).content.decode()
+        labels = {"view": "PostViewSet.list", "method": "GET"}
+        self.assertEqual(
+            sample(text, "http_request_duration_seconds_count", **labels), 2
+        )
+        self.assertGreater(sample(text, "http_request_db_queries_sum", **labels), 0)
+        self.assertGreater(
+            sample(text, "http_request_serializer_duration_seconds_sum", **labels), 0
+        )
+        self.assertGreater(sample(text, "http_response_size_bytes_sum", **labels), 0)
+        self.assertIn(
+            'http_request_duration_seconds_bucket{view="PostViewSet.list",'
+            'method="GET",le="+Inf"} 2',
+            text,
+        )
+
+    async def test_async_requests_are_recorded(self):
+        headers = {"Authorization": f"Token {self.token.key}"}
+        await self.async_client.get(POST_URL, headers=headers)
+        await self.async_client.get(ASYNC_FEED_URL, headers=headers)
+        await self.async_client.generic("BREW", POST_URL, headers=headers)
+
+        text = metrics.registry.expose()
+        for view in ("PostViewSet.list", "FeedView.get"):
+            labels = {"view": view, "method": "GET"}
+            self.assertGreater(sample(text, "http_request_db_queries_sum", **labels), 0)
+            self.assertGreater(
+                sample(text, "http_request_serializer_duration_seconds_sum", **labels),
+                0,
+            )
+        self.assertIn('method="other"', text)
+        self.assertNotIn("BREW", text)
+
+    def test_queries_of_other_threads_are_counted(self):
+        def query():
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            finally:
+                connection.close()
+
+        record = metrics.Record("GET", 10)
+        token = metrics._current.set(record)
+        try:
+            # the async ORM runs queries on an executor thread
+            async_to_sync(sync_to_async(query, thread_sensitive=False))()
+        finally:
+            metrics._current.reset(token)
+        self.assertEqual(record.queries, 1)
+
+    def test_slow_requests_are_logged_with_sql(self):
+        slow = {**metrics.settings.METRICS, "SLOW_REQUEST_MS": 0}
+        with self.settings(METRICS=slow), self.assertLogs("account.metrics", "WARNING"):
+            self.client.get(POST_URL)
+
+        entries = self.client.get(SLOW_LOG_URL).json()["results"]
+        self.assertEqual(entries[0]["view"], "PostViewSet.list")
+        self.assertEqual(len(entries[0]["sql"]), entries[0]["queries"])
+        self.assertTrue(any("account_post" in sql for sql in entries[0]["sql"]))
+
+    def test_endpoints_are_restricted(self):
+        response = self.client.get(METRICS_URL, REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(response.status_code, 403)
+
+        with self.settings(METRICS={**metrics.settings.METRICS, "TOKEN": "secret"}):
+            response = self.client.get(
+                METRICS_URL, REMOTE_ADDR="10.0.0.1", HTTP_AUTHORIZATION="Bearer secret"
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.client.get(SLOW_LOG_URL).status_code, 403)
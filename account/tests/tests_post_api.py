@@ -1,13 +1,35 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
 from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework.test import APIClient
 
-from account.models import Profile, Post
+from account import search, timeline
+from account.management.commands import check_query_plans
+from account.models import Profile, Post, Comment, Reaction, TimelineEntry
+from account.pagination import CommentPagination, PostPagination
 from account.serializers import PostSerializer, PostListSerializer
+from account.tests.utils import (
+    OLD_SQLITE_VARIABLES,
+    bulk_profiles,
+    sqlite_variable_limit,
+)
 
 POST_URL = reverse("account:post-list")
+SEARCH_URL = reverse("account:post-search")
+EXPORT_URL = reverse("account:post-export")
 
 
 def detail_url(post_id):
@@ -148,3 +170,562 @@ class PostAuthTests(TestCase):
                 self.assertEqual(set(payload[key]), set(post.tags.names()))
             else:
                 self.assertEqual(payload[key], getattr(post, key))
+
+
+class TimelineTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.reader_user = get_user_model().objects.create_user(
+            email="reader@test.com", password="testpassword"
+        )
+        self.author_user = get_user_model().objects.create_user(
+            email="author@test.com", password="testpassword"
+        )
+        self.client.force_authenticate(user=self.reader_user)
+        self.reader = Profile.objects.create(
+            user=self.reader_user, first_name="reader", last_name="reader_last"
+        )
+        self.author = Profile.objects.create(
+            user=self.author_user, first_name="author", last_name="author_last"
+        )
+
+    def feed_ids(self):
+        response = self.client.get(POST_URL, {"limit": 50})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post["id"] for post in response.data["results"]]
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        self.reader.following.add(self.author)
+        post = Post.objects.create(
+            title="Fan out", author=self.author, description="text"
+        )
+
+        self.assertTrue(
+            TimelineEntry.objects.filter(profile=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed_ids(), [post.id])
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        post = Post.objects.create(
+            title="Before follow", author=self.author, description="text"
+        )
+        self.assertEqual(self.feed_ids(), [])
+
+        self.reader.following.add(self.author)
+        self.assertEqual(self.feed_ids(), [post.id])
+
+        self.reader.following.remove(self.author)
+        self.assertEqual(self.feed_ids(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_high_fanout_author_is_pulled(self):
+        self.reader.following.add(self.author)
+        self.author.refresh_from_db()
+        self.assertTrue(self.author.is_high_fanout)
+
+        post = Post.objects.create(
+            title="Pulled", author=self.author, description="text"
+        )
+
+        self.assertFalse(
+            TimelineEntry.objects.filter(profile=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed_ids(), [post.id])
+
+    def test_feed_merges_pulled_authors(self):
+        pulled_user = get_user_model().objects.create_user(
+            email="pulled@test.com", password="testpassword"
+        )
+        pulled = Profile.objects.create(
+            user=pulled_user, first_name="pulled", last_name="pulled_last"
+        )
+        self.reader.following.add(self.author, pulled)
+        Profile.objects.filter(pk=pulled.pk).update(is_high_fanout=True)
+        posts = [
+            Post.objects.create(
+                title=f"Post {index}",
+                author=(self.author, pulled)[index % 2],
+                description="text",
+            )
+            for index in range(5)
+        ]
+
+        seen = []
+        url = f"{POST_URL}?limit=2"
+        while url:
+            response = self.client.get(url)
+            seen.extend(post["id"] for post in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(seen, [post.id for post in reversed(posts)])
+        self.assertFalse(
+            TimelineEntry.objects.filter(profile=self.reader, post__author=pulled)
+        )
+
+    @override_settings(TIMELINE_LENGTH=2)
+    def test_timelines_are_trimmed(self):
+        self.reader.following.add(self.author)
+        posts = [
+            Post.objects.create(
+                title=f"Post {index}", author=self.author, description="text"
+            )
+            for index in range(4)
+        ]
+
+        for profile in (self.reader, self.author):
+            self.assertEqual(
+                list(
+                    TimelineEntry.objects.filter(profile=profile)
+                    .order_by("-pub_date")
+                    .values_list("post_id", flat=True)
+                ),
+                [posts[3].id, posts[2].id],
+            )
+
+    def test_unflagged_author_is_backfilled(self):
+        with override_settings(TIMELINE_FANOUT_LIMIT=0):
+            self.reader.following.add(self.author)
+            post = Post.objects.create(
+                title="Pulled", author=self.author, description="text"
+            )
+        self.assertFalse(TimelineEntry.objects.filter(profile=self.reader))
+
+        timeline.refresh_fanout_flags([self.author.id])
+
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.is_high_fanout)
+        self.assertTrue(
+            TimelineEntry.objects.filter(profile=self.reader, post=post).exists()
+        )
+
+    def test_fanout_flags_refresh_past_the_sqlite_variable_limit(self):
+        authors = bulk_profiles(OLD_SQLITE_VARIABLES + 1, is_high_fanout=True)
+        Profile.following.through.objects.create(
+            from_profile=self.reader, to_profile=authors[-1]
+        )
+        post = Post.objects.create(
+            title="Pulled", author=authors[-1], description="text"
+        )
+
+        with sqlite_variable_limit():
+            call_command("rebuild_timelines", stdout=StringIO())
+
+        self.assertFalse(Profile.objects.filter(is_high_fanout=True).exists())
+        self.assertTrue(
+            TimelineEntry.objects.filter(profile=self.reader, post=post).exists()
+        )
+
+    def test_rebuild_timelines_command(self):
+        post = Post.objects.create(
+            title="Rebuild", author=self.author, description="text"
+        )
+        Profile.following.through.objects.bulk_create(
+            [
+                Profile.following.through(
+                    from_profile=self.reader, to_profile=self.author
+                )
+            ]
+        )
+        self.assertEqual(self.feed_ids(), [])
+
+        call_command("rebuild_timelines", profiles=[self.reader.id], stdout=StringIO())
+
+        self.assertEqual(self.feed_ids(), [post.id])
+
+
+class PostPaginationTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="pages@test.com", password="testpassword"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.profile = Profile.objects.create(
+            user=self.user, first_name="pages", last_name="pages_last"
+        )
+        self.posts = [
+            Post.objects.create(
+                title=f"Post {index}", author=self.profile, description="text"
+            )
+            for index in range(5)
+        ]
+
+    def test_cursor_walks_feed_without_gaps(self):
+        seen = []
+        url = POST_URL
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            seen.extend(post["id"] for post in response.data["results"])
+            url = response.data["next"]
+
+        expected = list(
+            Post.objects.order_by("-pub_date", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_page_skips_count_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(POST_URL, {"limit": 3})
+
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertFalse(
+            any("COUNT(" in query["sql"] for query in queries.captured_queries)
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get(POST_URL, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_page_walks_the_ordering_index(self):
+        for paginator, queryset in (
+            (PostPagination(), Post.objects.all()),
+            (CommentPagination(), Comment.objects.all()),
+        ):
+            position = [timezone.now(), 10]
+            plan = (
+                queryset.order_by(*paginator.ordering)
+                .filter(paginator.seek_filter(position))[:3]
+                .explain()
+            )
+            self.assertNotIn("TEMP B-TREE", plan)
+            self.assertNotIn("MULTI-INDEX OR", plan)
+
+    def test_feed_legs_walk_their_indexes(self):
+        position = [timezone.now(), 10]
+        legs = timeline.home_feed(Post.objects.all(), self.profile.id, [1])
+        self.assertEqual(len(legs), 2)
+        for queryset, condition, ordering in legs:
+            condition &= PostPagination().seek_filter(position, ordering)
+            plan = queryset.filter(condition).order_by(*ordering)[:3].explain()
+            self.assertNotIn("TEMP B-TREE", plan)
+            self.assertNotIn("SCAN", plan)
+
+    def test_query_plans_use_indexes(self):
+        out = StringIO()
+        call_command("check_query_plans", profiles=50, stdout=out)
+        self.assertIn("All query plans use indexes.", out.getvalue())
+        self.assertEqual(Post.objects.count(), len(self.posts))
+
+    def test_query_plan_check_flags_sorted_pages(self):
+        command = check_query_plans.Command()
+        self.assertTrue(
+            command.sorts(Post.objects.order_by("-title", "-id")[:3].explain())
+        )
+        self.assertTrue(
+            command.sorts(
+                Post.objects.filter(author=self.profile)
+                .order_by("-pub_date", "-title")[:3]
+                .explain()
+            )
+        )
+        self.assertFalse(
+            command.sorts(Post.objects.order_by("-pub_date", "-id")[:3].explain())
+        )
+
+
+@override_settings(COMMENT_THREAD_SIZE=3)
+class CommentThreadTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="threads@test.com", password="testpassword"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.profile = Profile.objects.create(
+            user=self.user, first_name="threads", last_name="threads_last"
+        )
+
+    def create_post(self, comments):
+        post = Post.objects.create(
+            title="Thread", author=self.profile, description="text"
+        )
+        for index in range(comments):
+            Comment.objects.create(
+                author=self.profile, post=post, description=f"comment {index}"
+            )
+        return post
+
+    def test_latest_comments_are_embedded(self):
+        post = self.create_post(5)
+
+        response = self.client.get(detail_url(post.id))
+
+        thread = response.data["comments"]
+        expected = list(
+            post.post_comments.order_by("-created_at", "-id").values_list(
+                "id", flat=True
+            )
+        )
+        self.assertEqual([comment["id"] for comment in thread["results"]], expected[:3])
+        self.assertIsNotNone(thread["next"])
+
+        response = self.client.get(thread["next"])
+        self.assertEqual(
+            [comment["id"] for comment in response.data["results"]], expected[3:]
+        )
+
+    def test_short_thread_has_no_next_link(self):
+        post = self.create_post(2)
+
+        response = self.client.get(detail_url(post.id))
+
+        self.assertEqual(len(response.data["comments"]["results"]), 2)
+        self.assertIsNone(response.data["comments"]["next"])
+
+    def test_new_comment_invalidates_cached_post(self):
+        post = self.create_post(1)
+        self.client.get(detail_url(post.id))
+
+        comment = Comment.objects.create(
+            author=self.profile, post=post, description="fresh"
+        )
+
+        response = self.client.get(detail_url(post.id))
+        self.assertEqual(response.data["comments"]["results"][0]["id"], comment.id)
+
+    def test_feed_loads_threads_with_one_query(self):
+        def comment_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(POST_URL)
+            return [
+                query["sql"]
+                for query in queries.captured_queries
+                if '"account_comment"' in query["sql"]
+            ]
+
+        self.create_post(4)
+        self.assertEqual(len(comment_queries()), 1)
+
+        for _ in range(3):
+            self.create_post(4)
+        self.assertEqual(len(comment_queries()), 1)
+
+
+class PostImageRenditionTests(TestCase):
+    def setUp(self) -> None:
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="images@test.com", password="testpassword"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.profile = Profile.objects.create(
+            user=self.user, first_name="images", last_name="images_last"
+        )
+
+    def tearDown(self) -> None:
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def upload(self):
+        exif = Image.Exif()
+        exif[0x010F] = "Camera maker"
+        buffer = BytesIO()
+        Image.new("RGB", (2000, 1000), "red").save(buffer, "JPEG", exif=exif)
+        buffer.name = "photo.jpg"
+        buffer.seek(0)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                POST_URL,
+                {
+                    "title": "With image",
+                    "author": self.profile.id,
+                    "description": "text",
+                    "tags": ["photo"],
+                    "image": buffer,
+                },
+                format="multipart",
+            )
+
+    def test_upload_generates_bounded_renditions_without_exif(self):
+        response = self.upload()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        post = Post.objects.get(id=response.data["id"])
+        self.assertEqual(post.image_renditions["source"], post.image.name)
+        self.assertEqual(
+            (
+                post.image_renditions["thumbnail"]["width"],
+                post.image_renditions["thumbnail"]["height"],
+            ),
+            (320, 160),
+        )
+
+        with post.image.storage.open(
+            post.image_renditions["medium"]["name"]
+        ) as rendition:
+            image = Image.open(rendition)
+            self.assertEqual(image.format, "WEBP")
+            self.assertEqual(image.size, (1080, 540))
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_renditions_are_exposed_as_urls(self):
+        post_id = self.upload().data["id"]
+
+        response = self.client.get(detail_url(post_id))
+
+        thumbnail = response.data["image_renditions"]["thumbnail"]
+        self.assertTrue(thumbnail["url"].startswith("http://testserver/media/"))
+        self.assertEqual(thumbnail["width"], 320)
+
+
+class PostSearchTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="search@test.com", password="testpassword"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.profile = Profile.objects.create(
+            user=self.user, first_name="search", last_name="search_last"
+        )
+        self.in_title = Post.objects.create(
+            title="Django tips", author=self.profile, description="Short notes"
+        )
+        self.in_description = Post.objects.create(
+            title="Weekly notes",
+            author=self.profile,
+            description="Some words about django and other frameworks",
+        )
+        self.tagged = Post.objects.create(
+            title="Holidays", author=self.profile, description="Sea and sun"
+        )
+        self.tagged.tags.add("travel")
+
+    def search(self, query):
+        response = self.client.get(SEARCH_URL, {"q": query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post["id"] for post in response.data["results"]]
+
+    def assert_search_behaviour(self):
+        self.assertEqual(
+            self.search("django"), [self.in_title.id, self.in_description.id]
+        )
+        self.assertEqual(
+            self.search("djan*"), [self.in_title.id, self.in_description.id]
+        )
+        self.assertEqual(self.search("djan"), [])
+        self.assertEqual(
+            self.search("django notes"), [self.in_title.id, self.in_description.id]
+        )
+        self.assertEqual(self.search("travel"), [self.tagged.id])
+
+        self.in_title.title = "Flask tips"
+        self.in_title.save()
+        self.tagged.tags.remove("travel")
+        self.in_description.delete()
+
+        self.assertEqual(self.search("django"), [])
+        self.assertEqual(self.search("travel"), [])
+
+    def test_search_with_fts5(self):
+        self.assertIsInstance(search.get_backend(), search.FTS5Backend)
+        self.assert_search_behaviour()
+
+    @override_settings(POST_SEARCH_BACKEND="table")
+    def test_search_with_table_index(self):
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assert_search_behaviour()
+
+    def test_search_clamps_limit_and_offset(self):
+        for backend in ("fts5", "table"):
+            with override_settings(POST_SEARCH_BACKEND=backend):
+                search.rebuild()
+                response = self.client.get(
+                    SEARCH_URL, {"q": "django", "limit": -1, "offset": -5}
+                )
+                self.assertEqual(
+                    [post["id"] for post in response.data["results"]],
+                    [self.in_title.id],
+                )
+
+    def test_search_requires_query(self):
+        response = self.client.get(SEARCH_URL)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PostExportTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="export@test.com", password="testpassword"
+        )
+        self.other_user = get_user_model().objects.create_user(
+            email="other-export@test.com", password="testpassword"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.profile = Profile.objects.create(
+            user=self.user, first_name="export", last_name="export_last"
+        )
+        self.other = Profile.objects.create(
+            user=self.other_user, first_name="other", last_name="other_last"
+        )
+
+    def create_post(self, author, title="Exported"):
+        post = Post.objects.create(title=title, author=author, description="text")
+        post.tags.add("django")
+        Comment.objects.create(author=self.other, post=post, description="nice")
+        Reaction.objects.create(
+            user=self.other, post=post, reaction_type=Reaction.ReactionChoices.LIKE
+        )
+        return post
+
+    def read(self, response):
+        return [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+
+    def test_export_streams_own_posts(self):
+        post = self.create_post(self.profile)
+        self.create_post(self.other)
+
+        response = self.client.get(EXPORT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        records = self.read(response)
+        self.assertEqual([record["id"] for record in records], [post.id])
+        self.assertEqual(records[0]["tags"], ["django"])
+        self.assertEqual(records[0]["comments"][0]["description"], "nice")
+        self.assertEqual(
+            records[0]["reactions"],
+            [{"user": self.other.id, "reaction_type": "Like"}],
+        )
+
+    def test_gzip_export(self):
+        self.create_post(self.profile)
+
+        plain = b"".join(self.client.get(EXPORT_URL).streaming_content)
+        response = self.client.get(EXPORT_URL, {"compression": "gzip"})
+
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), plain)
+
+    def test_query_count_does_not_grow_with_posts(self):
+        def export_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.read(self.client.get(EXPORT_URL))
+            return len(queries)
+
+        self.create_post(self.profile)
+        single = export_queries()
+        for index in range(5):
+            self.create_post(self.profile, title=f"More {index}")
+        self.assertEqual(export_queries(), single)
+
+    def test_export_posts_command(self):
+        self.create_post(self.profile)
+        self.create_post(self.other)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "posts.ndjson.gz")
+
+        call_command("export_posts", output=path, stderr=StringIO())
+
+        with gzip.open(path, "rt") as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual(len(records), 2)
@@ -1,13 +1,24 @@
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed
 from django.test import TestCase
 from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework.test import APIClient
 
+from account import graph, profile_search
 from account.models import Profile
 from account.serializers import ProfileListSerializer
 
 PROFILE_URL_LIST = reverse("account:profile-list")
+PROFILE_SEARCH_URL = reverse("account:profile-search")
+BULK_FOLLOW_URL = reverse("account:profile-bulk-follow")
+
+
+def relationship_url(profile_id):
+    return reverse("account:profile-relationship", args=[profile_id])
 
 
 def detail_url(profile_id):
@@ -105,3 +116,312 @@ class ProfileAuthTests(TestCase):
                 self.assertEqual(payload[key], profile.user.id)
             else:
                 self.assertEqual(payload[key], getattr(profile, key))
+
+
+class ProfileQueryCountTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.profiles = []
+        for index in range(6):
+            user = get_user_model().objects.create_user(
+                email=f"user{index}@test.com", password="testpassword"
+            )
+            self.profiles.append(
+                Profile.objects.create(
+                    user=user, first_name=f"first{index}", last_name=f"last{index}"
+                )
+            )
+        for profile in self.profiles:
+            profile.following.add(*[p for p in self.profiles if p != profile])
+        self.client.force_authenticate(self.profiles[0].user)
+
+    def test_list_query_count_does_not_depend_on_page_size(self):
+        for limit in (1, 3, 6):
+            cache.clear()
+            graph.get_graph().clear()
+            # count, page with joined user, following and followers prefetches
+            # and one batched adjacency load per direction for the counts
+            with self.assertNumQueries(6):
+                response = self.client.get(PROFILE_URL_LIST, {"limit": limit})
+            self.assertEqual(len(response.data["results"]), limit)
+            self.assertEqual(len(response.data["results"][0]["following"]), 5)
+
+
+class ProfileSearchTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        people = [
+            ("volodymyr.s@test.com", "Volodymyr", "Struhanets"),
+            ("olga@test.com", "Ólga", "Volkova"),
+            ("ivan@test.com", "Ivan", "Petrenko"),
+        ]
+        self.profiles = []
+        for email, first_name, last_name in people:
+            user = get_user_model().objects.create_user(
+                email=email, password="testpassword"
+            )
+            self.profiles.append(
+                Profile.objects.create(
+                    user=user, first_name=first_name, last_name=last_name
+                )
+            )
+        self.client.force_authenticate(self.profiles[0].user)
+
+    def search(self, query):
+        response = self.client.get(PROFILE_SEARCH_URL, {"q": query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [profile["id"] for profile in response.data["results"]]
+
+    def test_prefix_matches_across_fields_ranked(self):
+        volodymyr, olga, ivan = self.profiles
+
+        # both are bare prefix matches of a name, ties keep id order
+        self.assertEqual(self.search("vol"), [volodymyr.id, olga.id])
+        self.assertEqual(self.search("volkova"), [olga.id])
+        self.assertEqual(self.search("olga"), [olga.id])
+        self.assertEqual(self.search("vol stru"), [volodymyr.id])
+        self.assertEqual(self.search("ivan@"), [ivan.id])
+        self.assertEqual(self.search("x"), [])
+
+    def test_prefixes_are_read_off_indexes(self):
+        plan = profile_search.matches({"vol"})[:10].explain()
+        self.assertIn("COVERING INDEX account_search_key_rank_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+        plan = profile_search.matches({"vol", "stru"})[:10].explain()
+        self.assertNotIn("SCAN", plan)
+
+    def test_several_words_score_the_candidates_of_the_rarest(self):
+        volodymyr, olga, ivan = self.profiles
+
+        # "vol" matches two profiles, best Volodymyr, "ol" only Olga
+        with mock.patch.object(profile_search, "MAX_CANDIDATES", 1):
+            self.assertEqual(self.search("vol ol"), [olga.id])
+            self.assertEqual(self.search("vol stru"), [volodymyr.id])
+
+    def test_limit_is_clamped(self):
+        for limit, expected in ((-1, 1), (0, 1), (1, 1), (100, 2)):
+            response = self.client.get(PROFILE_SEARCH_URL, {"q": "vol", "limit": limit})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data["results"]), expected)
+
+        response = self.client.get(PROFILE_SEARCH_URL, {"q": "vol", "limit": "x"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_index_follows_profile_and_email_changes(self):
+        ivan = self.profiles[2]
+        ivan.last_name = "Shevchenko"
+        ivan.save()
+        ivan.user.email = "kobzar@test.com"
+        ivan.user.save()
+
+        self.assertEqual(self.search("petrenko"), [])
+        self.assertEqual(self.search("shev"), [ivan.id])
+        self.assertEqual(self.search("kobz"), [ivan.id])
+
+
+class ProfileRepresentationCacheTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+        self.profiles = []
+        for index in range(3):
+            user = get_user_model().objects.create_user(
+                email=f"cached{index}@test.com", password="testpassword"
+            )
+            self.profiles.append(
+                Profile.objects.create(
+                    user=user, first_name=f"first{index}", last_name=f"last{index}"
+                )
+            )
+        self.client.force_authenticate(self.profiles[0].user)
+
+    def list_profiles(self):
+        response = self.client.get(PROFILE_URL_LIST, {"limit": 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {profile["id"]: profile for profile in response.data["results"]}
+
+    def test_warm_page_skips_prefetches(self):
+        self.list_profiles()
+
+        # count and page only, every fragment comes from the cache
+        with self.assertNumQueries(2):
+            self.list_profiles()
+
+    def test_follow_and_rename_invalidate_nested_representations(self):
+        first, second, _ = self.profiles
+        self.list_profiles()
+
+        first.following.add(second)
+        profiles = self.list_profiles()
+        self.assertEqual(
+            [profile["id"] for profile in profiles[first.id]["following"]],
+            [second.id],
+        )
+        self.assertEqual(
+            [profile["id"] for profile in profiles[second.id]["followers"]],
+            [first.id],
+        )
+
+        second.first_name = "renamed"
+        second.save()
+        profiles = self.list_profiles()
+        self.assertEqual(profiles[first.id]["following"][0]["first_name"], "renamed")
+        expected = ProfileListSerializer(Profile.objects.all(), many=True).data
+        self.assertEqual(profiles, {profile["id"]: profile for profile in expected})
+
+
+class BulkFollowTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.profiles = []
+        for index in range(4):
+            user = get_user_model().objects.create_user(
+                email=f"bulk{index}@test.com", password="testpassword"
+            )
+            self.profiles.append(
+                Profile.objects.create(
+                    user=user, first_name=f"first{index}", last_name=f"last{index}"
+                )
+            )
+        self.me = self.profiles[0]
+        self.client.force_authenticate(self.me.user)
+
+    def test_bulk_follow_and_unfollow(self):
+        _, second, third, fourth = self.profiles
+        self.me.following.add(fourth)
+
+        response = self.client.post(
+            BULK_FOLLOW_URL,
+            {
+                "follow": [second.id, third.id, third.id, fourth.id, 999],
+                "unfollow": [fourth.id, second.id],
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item["id"], item["status"]) for item in response.data["results"]],
+            [
+                (second.id, "followed"),
+                (third.id, "followed"),
+                (fourth.id, "already_following"),
+                (999, "not_found"),
+                (fourth.id, "unfollowed"),
+                (second.id, "not_following"),
+            ],
+        )
+        self.assertEqual(
+            set(self.me.following.values_list("id", flat=True)),
+            {second.id, third.id},
+        )
+
+    def test_bulk_follow_signals_surround_the_write(self):
+        second = self.profiles[1]
+        self.me.following.add(second)
+        sent = []
+
+        def receiver(action, pk_set, **kwargs):
+            exists = self.me.following.filter(pk__in=pk_set).exists()
+            sent.append((action, pk_set, exists))
+
+        m2m_changed.connect(receiver, sender=Profile.following.through)
+        self.addCleanup(
+            m2m_changed.disconnect, receiver, sender=Profile.following.through
+        )
+        self.client.post(
+            BULK_FOLLOW_URL,
+            {"follow": [second.id, self.profiles[2].id], "unfollow": [second.id]},
+            format="json",
+        )
+
+        third = {self.profiles[2].id}
+        self.assertEqual(
+            sent,
+            [
+                ("pre_add", third, False),
+                ("post_add", third, True),
+                ("pre_remove", {second.id}, True),
+                ("post_remove", {second.id}, False),
+            ],
+        )
+
+    def test_bulk_follow_requires_ids(self):
+        response = self.client.post(BULK_FOLLOW_URL, {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FollowGraphTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+        self.profiles = []
+        for index in range(4):
+            user = get_user_model().objects.create_user(
+                email=f"graph{index}@test.com", password="testpassword"
+            )
+            self.profiles.append(
+                Profile.objects.create(
+                    user=user, first_name=f"first{index}", last_name=f"last{index}"
+                )
+            )
+        self.me = self.profiles[0]
+        self.client.force_authenticate(self.me.user)
+
+    def test_adjacency_sets_are_cached_and_follow_changes(self):
+        me, second, third, _ = self.profiles
+        me.following.add(second, third)
+        self.assertEqual(graph.following_ids(me.pk), {second.pk, third.pk})
+
+        with self.assertNumQueries(0):
+            self.assertTrue(graph.is_following(me.pk, second.pk))
+            self.assertEqual(graph.following_ids(me.pk), {second.pk, third.pk})
+
+        second.followers.remove(me)
+        self.assertEqual(graph.following_ids(me.pk), {third.pk})
+        self.assertEqual(graph.follower_ids(second.pk), set())
+
+        me.following.clear()
+        self.assertEqual(graph.following_ids(me.pk), set())
+        self.assertEqual(graph.follower_counts([third.pk]), {third.pk: 0})
+
+    def test_list_renders_follow_counts(self):
+        me, second, third, _ = self.profiles
+        me.following.add(second, third)
+        second.following.add(me)
+
+        response = self.client.get(PROFILE_URL_LIST, {"limit": 10})
+        profiles = {profile["id"]: profile for profile in response.data["results"]}
+        self.assertEqual(profiles[me.pk]["following_count"], 2)
+        self.assertEqual(profiles[me.pk]["followers_count"], 1)
+        self.assertEqual(profiles[third.pk]["followers_count"], 1)
+
+        third.followers.remove(me)
+        response = self.client.get(PROFILE_URL_LIST, {"limit": 10})
+        profiles = {profile["id"]: profile for profile in response.data["results"]}
+        self.assertEqual(profiles[me.pk]["following_count"], 1)
+        self.assertEqual(profiles[third.pk]["followers_count"], 0)
+
+    def test_relationship(self):
+        me, second, third, fourth = self.profiles
+        me.following.add(second, third, fourth)
+        second.following.add(me, third, fourth)
+
+        response = self.client.get(relationship_url(second.pk))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["id"], second.pk)
+        self.assertTrue(response.data["is_following"])
+        self.assertTrue(response.data["is_followed_by"])
+        self.assertEqual(
+            [profile["id"] for profile in response.data["common_following"]],
+            [third.pk, fourth.pk],
+        )
+
+        response = self.client.get(relationship_url(third.pk))
+        self.assertTrue(response.data["is_following"])
+        self.assertFalse(response.data["is_followed_by"])
+        self.assertEqual(response.data["common_following"], [])
+
+        response = self.client.get(relationship_url(9999))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,13 +1,18 @@
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework.test import APIClient
 
-from account.models import Profile, Reaction, Post
+from account.models import Profile, Reaction, Post, Comment
 from account.serializers import ReactionListSerializer
 
 REACTION_URL = reverse("account:reaction-list")
+BULK_REACTION_URL = reverse("account:reaction-bulk")
 
 
 class ReactionUnAuthTests(TestCase):
@@ -83,3 +88,168 @@ class ReactionAuthTests(TestCase):
                 self.assertEqual(payload[key], self.post1.id)
             else:
                 self.assertEqual(payload[key], getattr(reaction, key))
+
+
+class ReactionCounterTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="counter@example.com", password="default12345"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.profile = Profile.objects.create(
+            user=self.user, first_name="counter", last_name="counter_last"
+        )
+        self.post = Post.objects.create(
+            title="Counted", author=self.profile, description="text"
+        )
+
+    def react(self, reaction_type):
+        return self.client.post(
+            REACTION_URL, {"post": self.post.id, "reaction_type": reaction_type}
+        )
+
+    def assertCounts(self, likes, dislikes):
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, likes)
+        self.assertEqual(self.post.dislike_count, dislikes)
+
+    def test_create_switch_and_delete_update_counters(self):
+        response = self.react(Reaction.ReactionChoices.LIKE)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertCounts(1, 0)
+
+        self.react(Reaction.ReactionChoices.LIKE)
+        self.assertCounts(1, 0)
+
+        self.react(Reaction.ReactionChoices.DISLIKE)
+        self.assertCounts(0, 1)
+
+        response = self.client.delete(
+            reverse("account:reaction-detail", args=[response.data["id"]])
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertCounts(0, 0)
+
+    def test_unknown_reaction_type(self):
+        response = self.react("Love")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reaction_to_missing_post(self):
+        response = self.client.post(
+            REACTION_URL, {"post": 999, "reaction_type": Reaction.ReactionChoices.LIKE}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Reaction.objects.exists())
+
+    def test_comment_counter(self):
+        comment = Comment.objects.create(author=self.profile, post=self.post)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_reconcile_command(self):
+        Reaction.objects.create(
+            user=self.profile,
+            post=self.post,
+            reaction_type=Reaction.ReactionChoices.LIKE,
+        )
+        Post.objects.update(like_count=7, dislike_count=3)
+
+        call_command("reconcile_post_counters", chunk_size=1, stdout=StringIO())
+
+        self.assertCounts(1, 0)
+
+
+class BulkReactionTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="bulk@example.com", password="default12345"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.profile = Profile.objects.create(
+            user=self.user, first_name="bulk", last_name="bulk_last"
+        )
+        self.posts = [
+            Post.objects.create(
+                title=f"Post {index}", author=self.profile, description="text"
+            )
+            for index in range(3)
+        ]
+
+    def test_bulk_reactions(self):
+        first, second, third = self.posts
+        Reaction.objects.create(
+            user=self.profile,
+            post=second,
+            reaction_type=Reaction.ReactionChoices.LIKE,
+        )
+        Reaction.objects.create(
+            user=self.profile,
+            post=third,
+            reaction_type=Reaction.ReactionChoices.LIKE,
+        )
+        Post.objects.filter(pk__in=[second.pk, third.pk]).update(like_count=1)
+
+        response = self.client.post(
+            BULK_REACTION_URL,
+            {
+                "reactions": [
+                    {"post": first.id, "reaction_type": "Like"},
+                    {"post": second.id, "reaction_type": "Dislike"},
+                    {"post": third.id, "reaction_type": "Like"},
+                    {"post": 999, "reaction_type": "Like"},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["status"] for item in response.data["results"]],
+            ["created", "updated", "unchanged", "not_found"],
+        )
+        counts = {
+            post.pk: (post.like_count, post.dislike_count)
+            for post in Post.objects.all()
+        }
+        self.assertEqual(
+            counts, {first.pk: (1, 0), second.pk: (0, 1), third.pk: (1, 0)}
+        )
+
+    def test_bulk_reaction_created_concurrently_is_retried(self):
+        post = self.posts[0]
+        # another request reacts after this one read the existing reactions
+        Reaction.objects.create(
+            user=self.profile, post=post, reaction_type=Reaction.ReactionChoices.DISLIKE
+        )
+        Post.objects.filter(pk=post.pk).update(dislike_count=1)
+        select_for_update = Reaction.objects.select_for_update
+        reads = [Reaction.objects.none]
+
+        with mock.patch.object(
+            Reaction.objects,
+            "select_for_update",
+            side_effect=lambda: (reads.pop() if reads else select_for_update)(),
+        ):
+            response = self.client.post(
+                BULK_REACTION_URL,
+                {"reactions": [{"post": post.id, "reaction_type": "Like"}]},
+                format="json",
+            )
+
+        self.assertEqual(response.data["results"][0]["status"], "updated")
+        post.refresh_from_db()
+        self.assertEqual((post.like_count, post.dislike_count), (1, 0))
+
+    def test_bulk_reactions_validate_type(self):
+        response = self.client.post(
+            BULK_REACTION_URL,
+            {"reactions": [{"post": self.posts[0].id, "reaction_type": "Love"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+
+from account import realtime, signals
+from account.models import Profile, Post, Comment, Reaction
+from user.authentication import local_tokens
+
+STREAM_URL = reverse("account:async-event-stream")
+
+
+class HubTests(TestCase):
+    async def test_publish_from_another_thread(self):
+        hub = realtime.LocalHub()
+        subscription = hub.subscribe(["author:1"], maxsize=10)
+        other = hub.subscribe(["author:2"], maxsize=10)
+
+        thread = threading.Thread(
+            target=hub.publish, args=(["author:1"], {"type": "post", "id": 5})
+        )
+        thread.start()
+        thread.join()
+
+        event = await asyncio.wait_for(subscription.get(), 1)
+        self.assertEqual(event["id"], 5)
+        self.assertTrue(other.queue.empty())
+
+    async def test_full_buffer_drops_oldest_events(self):
+        hub = realtime.LocalHub()
+        subscription = hub.subscribe(["profile:1"], maxsize=2)
+
+        for index in range(3):
+            subscription.offer({"type": "comment", "id": index})
+
+        self.assertEqual(subscription.take_dropped(), 1)
+        self.assertEqual((await subscription.get())["id"], 1)
+        self.assertEqual((await subscription.get())["id"], 2)
+
+    async def test_unsubscribed_connection_gets_nothing(self):
+        hub = realtime.LocalHub()
+        subscription = hub.subscribe(["author:1"], maxsize=2)
+        hub.unsubscribe(subscription)
+
+        hub.publish(["author:1"], {"type": "post"})
+        await asyncio.sleep(0)
+
+        self.assertTrue(subscription.queue.empty())
+
+
+class RealtimeSignalTests(TestCase):
+    def setUp(self) -> None:
+        self.author = Profile.objects.create(
+            user=get_user_model().objects.create_user(
+                email="rt-author@test.com", password="testpassword"
+            ),
+            first_name="author",
+        )
+        self.reader = Profile.objects.create(
+            user=get_user_model().objects.create_user(
+                email="rt-reader@test.com", password="testpassword"
+            ),
+            first_name="reader",
+        )
+
+    def published(self, create):
+        with mock.patch.object(realtime.LocalHub, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                create()
+        return [
+            (topics, event["type"]) for (topics, event), _ in publish.call_args_list
+        ]
+
+    def test_events_are_routed_to_topics(self):
+        post = Post.objects.create(title="t", author=self.author, description="d")
+
+        self.assertEqual(
+            self.published(
+                lambda: Post.objects.create(
+                    title="new", author=self.author, description="d"
+                )
+            ),
+            [([f"author:{self.author.id}"], "post")],
+        )
+        self.assertEqual(
+            self.published(
+                lambda: Comment.objects.create(author=self.reader, post=post)
+            ),
+            [([f"profile:{self.author.id}"], "comment")],
+        )
+        self.assertEqual(
+            self.published(
+                lambda: Reaction.objects.create(
+                    user=self.reader,
+                    post=post,
+                    reaction_type=Reaction.ReactionChoices.LIKE,
+                )
+            ),
+            [([f"profile:{self.author.id}"], "reaction")],
+        )
+
+    def test_unchanged_reaction_is_not_published(self):
+        post = Post.objects.create(title="t", author=self.author, description="d")
+        reaction = Reaction.objects.create(
+            user=self.reader, post=post, reaction_type=Reaction.ReactionChoices.LIKE
+        )
+
+        self.assertEqual(self.published(reaction.save), [])
+        reaction = Reaction.objects.get(pk=reaction.pk)
+        self.assertEqual(self.published(reaction.save), [])
+
+        reaction.reaction_type = Reaction.ReactionChoices.DISLIKE
+        self.assertEqual(
+            self.published(reaction.save), [([f"profile:{self.author.id}"], "reaction")]
+        )
+        self.assertEqual(self.published(reaction.save), [])
+
+    def test_comment_reads_only_the_post_author(self):
+        post = Post.objects.create(title="t", author=self.author, description="d")
+
+        comment = Comment(author=self.reader, post_id=post.id)
+        with CaptureQueriesContext(connection) as queries:
+            signals.publish_new_comment(Comment, comment, created=True)
+
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("title", queries[0]["sql"])
+
+    def test_own_activity_is_not_notified(self):
+        post = Post.objects.create(title="t", author=self.author, description="d")
+
+        self.assertEqual(
+            self.published(
+                lambda: Comment.objects.create(author=self.author, post=post)
+            ),
+            [],
+        )
+
+
+class EventStreamTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        local_tokens.clear()
+        self.user = get_user_model().objects.create_user(
+            email="stream@test.com", password="testpassword"
+        )
+        self.profile = Profile.objects.create(user=self.user, first_name="stream")
+        self.author = Profile.objects.create(
+            user=get_user_model().objects.create_user(
+                email="stream-author@test.com", password="testpassword"
+            ),
+            first_name="author",
+        )
+        self.profile.following.add(self.author)
+        self.token = Token.objects.create(user=self.user)
+
+    async def test_stream_pushes_followed_author_posts(self):
+        response = await self.async_client.get(
+            STREAM_URL, headers={"Authorization": f"Token {self.token.key}"}
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        frames = aiter(response.streaming_content)
+        self.assertTrue((await anext(frames)).startswith(b"retry:"))
+
+        realtime.get_hub().publish(
+            [f"author:{self.author.id}"], {"type": "post", "id": 42}
+        )
+        frame = (await asyncio.wait_for(anext(frames), 1)).decode()
+
+        self.assertIn("event: post", frame)
+        data = frame.split("data: ", 1)[1].strip()
+        self.assertEqual(json.loads(data), {"type": "post", "id": 42})
+        await frames.aclose()
+
+    async def test_stream_requires_authentication(self):
+        response = await self.async_client.get(STREAM_URL)
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from account import replicas
+from account.models import Profile, Post
+from account.views import PostViewSet
+
+POST_URL = reverse("account:post-list")
+COMMENT_URL = reverse("account:comment-list")
+
+
+class PrimaryReplicaRouterTests(TestCase):
+    def setUp(self) -> None:
+        self.router = replicas.PrimaryReplicaRouter()
+        token = replicas._replica_reads.set(True)
+        self.addCleanup(replicas._replica_reads.reset, token)
+
+    def test_reads_stay_on_primary_without_replica(self):
+        self.assertIsNone(self.router.db_for_read(Profile))
+
+    def test_reads_go_to_configured_replica(self):
+        with mock.patch.dict(
+            connections.databases, {"replica": connections.databases["default"]}
+        ):
+            self.assertEqual(self.router.db_for_read(Profile), "replica")
+            self.assertEqual(replicas.cache_timeout(3600), 5)
+            self.assertEqual(self.router.db_for_write(Profile), "default")
+            self.assertFalse(self.router.allow_migrate("replica", "account"))
+
+    def test_replica_requires_a_shared_cache(self):
+        replicas.check_configuration()
+        with mock.patch.dict(
+            connections.databases, {"replica": connections.databases["default"]}
+        ):
+            with self.settings(SHARED_CACHE=False):
+                self.assertRaises(ImproperlyConfigured, replicas.check_configuration)
+            with self.settings(SHARED_CACHE=True):
+                replicas.check_configuration()
+
+
+class ReplicaReadMixinTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(
+            email="replica@test.com", password="testpassword"
+        )
+        self.profile = Profile.objects.create(
+            user=user, first_name="first", last_name="last"
+        )
+        self.client.force_authenticate(user)
+
+        self.replica_reads = []
+        get_queryset = PostViewSet.get_queryset
+
+        def record(view):
+            self.replica_reads.append(replicas._replica_reads.get())
+            return get_queryset(view)
+
+        patcher = mock.patch.object(PostViewSet, "get_queryset", record)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_use_replica_until_own_write(self):
+        self.client.get(POST_URL)
+        self.assertEqual(self.replica_reads, [True])
+        self.assertFalse(replicas._replica_reads.get())
+
+        response = self.client.post(
+            POST_URL,
+            {
+                "title": "title",
+                "author": self.profile.id,
+                "description": "text",
+                "tags": ["replica"],
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(replicas.is_pinned(self.profile.user_id))
+
+        self.replica_reads.clear()
+        self.client.get(POST_URL)
+        self.assertEqual(self.replica_reads, [False])
+
+    def test_writes_of_any_view_pin_the_user(self):
+        post = Post.objects.create(
+            title="title", author=self.profile, description="text"
+        )
+
+        response = self.client.post(
+            COMMENT_URL,
+            {"author": self.profile.id, "post": post.id, "description": "text"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(replicas.is_pinned(self.profile.user_id))
+
+    def test_failed_writes_do_not_pin(self):
+        response = self.client.post(COMMENT_URL, {})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(replicas.is_pinned(self.profile.user_id))
@@ -0,0 +1,119 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from account import suggestions
+from account.models import FollowSuggestion, Profile, Post
+from account.tests.utils import (
+    OLD_SQLITE_VARIABLES,
+    bulk_profiles,
+    sqlite_variable_limit,
+)
+
+SUGGESTIONS_URL = reverse("account:profile-suggestions")
+
+
+class FollowSuggestionTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.profiles = []
+        for index in range(6):
+            user = get_user_model().objects.create_user(
+                email=f"suggest{index}@test.com", password="testpassword"
+            )
+            self.profiles.append(
+                Profile.objects.create(
+                    user=user, first_name=f"first{index}", last_name=f"last{index}"
+                )
+            )
+        me, a, b, c, d, e = self.profiles
+        me.following.add(a, b)
+        a.following.add(c, d, me)
+        b.following.add(c, e)
+        self.client.force_authenticate(me.user)
+
+    def suggested(self):
+        response = self.client.get(SUGGESTIONS_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item["profile"]["id"] for item in response.data["results"]]
+
+    def tag(self, profile, *tags):
+        post = Post.objects.create(author=profile, title="post", description="text")
+        post.tags.add(*tags)
+
+    def test_friends_of_friends_ranked_by_mutual_count_and_tags(self):
+        me, a, b, c, d, e = self.profiles
+        self.tag(me, "django")
+        self.tag(e, "django")
+
+        self.assertEqual(suggestions.refresh(tag_weight=0.5), 6)
+
+        # c is followed by both a and b, e wins the tie with d on shared tags
+        self.assertEqual(self.suggested(), [c.pk, e.pk, d.pk])
+        first = FollowSuggestion.objects.filter(profile=me).first()
+        self.assertEqual((first.suggested_id, first.mutual_count), (c.pk, 2))
+        second = FollowSuggestion.objects.get(profile=me, rank=1)
+        self.assertAlmostEqual(second.tag_affinity, 1.0, places=5)
+
+    def test_follow_changes_flag_stale_profiles_only(self):
+        me, a, b, c, d, e = self.profiles
+        suggestions.refresh()
+        self.assertFalse(Profile.objects.filter(suggestions_stale=True).exists())
+
+        # b's followers see b's new follow as a friend of a friend
+        b.following.add(d)
+        stale = set(
+            Profile.objects.filter(suggestions_stale=True).values_list("pk", flat=True)
+        )
+        self.assertEqual(stale, {b.pk, me.pk})
+
+        self.assertEqual(suggestions.refresh(), 2)
+        mutual = FollowSuggestion.objects.get(profile=me, suggested=d).mutual_count
+        self.assertEqual(mutual, 2)
+
+    def test_endpoint_hides_profiles_followed_since_refresh(self):
+        me, a, b, c, d, e = self.profiles
+        suggestions.refresh(top_k=2)
+        self.assertEqual(self.suggested(), [c.pk, d.pk])
+
+        me.following.add(c)
+        self.assertEqual(self.suggested(), [d.pk])
+
+    def test_command_refreshes_all_profiles(self):
+        suggestions.refresh()
+        out = StringIO()
+        call_command("refresh_follow_suggestions", all=True, stdout=out)
+        self.assertIn("Refreshed suggestions of 6 profile(s).", out.getvalue())
+
+    def test_only_follows_within_two_hops_are_read(self):
+        me, a, b, c, d, e = self.profiles
+        d.following.add(e)
+
+        pairs = {tuple(pair) for pair in suggestions.reachable_follows([b.pk])}
+        self.assertEqual(pairs, {(b.pk, c.pk), (b.pk, e.pk)})
+        pairs = {tuple(pair) for pair in suggestions.reachable_follows([me.pk])}
+        self.assertNotIn((d.pk, e.pk), pairs)
+        self.assertIn((a.pk, d.pk), pairs)
+
+    def test_refresh_past_the_sqlite_variable_limit(self):
+        crowd = bulk_profiles(OLD_SQLITE_VARIABLES + 1)
+        me = self.profiles[0]
+        Profile.following.through.objects.bulk_create(
+            Profile.following.through(from_profile=profile, to_profile=me)
+            for profile in crowd
+        )
+
+        with sqlite_variable_limit():
+            call_command("refresh_follow_suggestions", all=True, stdout=StringIO())
+            # me and all its followers, a included, are flagged
+            me.following.add(self.profiles[5])
+            self.assertEqual(suggestions.refresh(), len(crowd) + 2)
+
+        self.assertFalse(Profile.objects.filter(suggestions_stale=True).exists())
+        # what me follows: a, b and e
+        self.assertEqual(FollowSuggestion.objects.filter(profile=crowd[0]).count(), 3)
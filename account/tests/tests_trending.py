@@ -0,0 +1,147 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from account import trending
+from account.models import Profile, Post
+
+POST_URL = reverse("account:post-list")
+TRENDING_URL = reverse("account:post-trending-tags")
+
+
+class SketchTests(TestCase):
+    def test_heavy_hitters_stay_bounded_and_ranked(self):
+        sketch = trending.LocalTrending(
+            depth=4, width=256, candidates=5, window_buckets=3
+        )
+        sketch.add(1, {f"rare{index}": 1 for index in range(500)})
+        sketch.add(1, {"django": 40, "python": 30})
+        sketch.add(2, {"django": 10, "celery": 20})
+
+        self.assertLessEqual(len(sketch._buckets[1][1]), 5)
+        top = sketch.top([1, 2], 3)
+        self.assertEqual([tag for tag, _ in top], ["django", "python", "celery"])
+        # count-min estimates never undercount
+        self.assertGreaterEqual(top[0][1], 50)
+
+        sketch.add(4, {"django": 1})
+        self.assertEqual(sorted(sketch._buckets), [2, 4])
+
+
+class TrendingTagsTests(TestCase):
+    def setUp(self) -> None:
+        trending.get_trending().clear()
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(
+            email="trending@test.com", password="testpassword"
+        )
+        self.profile = Profile.objects.create(
+            user=user, first_name="first", last_name="last"
+        )
+        self.client.force_authenticate(user)
+
+    def trending_tags(self, **params):
+        response = self.client.get(TRENDING_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(item["tag"], item["count"]) for item in response.data["results"]]
+
+    def post(self, *tags):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                author=self.profile, title="post", description="text"
+            )
+            post.tags.add(*tags)
+        return post
+
+    def test_created_posts_are_counted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                POST_URL,
+                {
+                    "title": "api",
+                    "author": self.profile.id,
+                    "description": "text",
+                    "tags": ["django"],
+                },
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.post("django", "python")
+        self.post("python", "django")
+        self.post("celery")
+
+        self.assertEqual(
+            self.trending_tags(),
+            [("django", 3), ("python", 2), ("celery", 1)],
+        )
+        self.assertEqual(self.trending_tags(limit=1), [("django", 3)])
+
+    def test_tag_changes_and_deletion_are_subtracted(self):
+        first = self.post("django", "python")
+        second = self.post("django")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.tags.remove("python")
+            second.tags.clear()
+        self.assertEqual(self.trending_tags(), [("django", 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.trending_tags(), [])
+
+    def test_posts_outside_the_window_are_ignored(self):
+        old = self.post("archive")
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - timedelta(days=2)
+        )
+        trending.get_trending().clear()
+        self.post("fresh")
+
+        call_command("rebuild_trending_tags", stdout=StringIO())
+        self.assertEqual(self.trending_tags(), [("fresh", 1)])
+
+    def test_local_sketches_refill_from_the_database(self):
+        self.post("django", "python")
+        self.assertEqual(self.trending_tags(), [("django", 1), ("python", 1)])
+
+        # a restarted process starts empty
+        trending.get_trending().clear()
+        self.assertEqual(self.trending_tags(), [("django", 1), ("python", 1)])
+
+        # written by another process, never counted by this one
+        Post.objects.create(
+            author=self.profile, title="elsewhere", description="text"
+        ).tags.add("django")
+        self.assertEqual(self.trending_tags(), [("django", 1), ("python", 1)])
+        trending.get_trending().loaded_at -= (
+            settings.TRENDING["LOCAL_REFRESH_SECONDS"] + 1
+        )
+        self.assertEqual(self.trending_tags(), [("django", 2), ("python", 1)])
+
+    def test_one_thread_refills_a_stale_ring(self):
+        self.post("django")
+        self.assertEqual(self.trending_tags(), [("django", 1)])
+        Post.objects.create(
+            author=self.profile, title="elsewhere", description="text"
+        ).tags.add("python")
+        sketch = trending.get_trending()
+        sketch.loaded_at -= settings.TRENDING["LOCAL_REFRESH_SECONDS"] + 1
+
+        # another thread is refilling, the old ring is served meanwhile
+        with sketch._refill_lock:
+            self.assertEqual(self.trending_tags(), [("django", 1)])
+        with mock.patch.object(trending, "REBUILD_CHUNK", 1):
+            self.assertEqual(self.trending_tags(), [("django", 1), ("python", 1)])
+
+    def test_invalid_limit(self):
+        response = self.client.get(TRENDING_URL, {"limit": "many"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {"error": "Must be integer limit and window"})
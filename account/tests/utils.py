@@ -0,0 +1,35 @@
+import sqlite3
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from account.models import Profile
+
+# variables per statement of SQLite builds older than 3.32
+OLD_SQLITE_VARIABLES = 999
+
+
+@contextmanager
+def sqlite_variable_limit(limit=OLD_SQLITE_VARIABLES):
+    """Make the test connection reject statements with more than ``limit``
+    variables, as SQLite does at scale."""
+    connection.ensure_connection()
+    raw = connection.connection
+    previous = raw.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, limit)
+    try:
+        yield
+    finally:
+        raw.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, previous)
+
+
+def bulk_profiles(count, prefix="bulk", **fields):
+    """Insert ``count`` profiles and their users without signals."""
+    users = get_user_model().objects.bulk_create(
+        get_user_model()(email=f"{prefix}{index}@test.com", password="!")
+        for index in range(count)
+    )
+    return Profile.objects.bulk_create(
+        Profile(user=user, first_name=prefix, last_name=str(index), **fields)
+        for index, user in enumerate(users)
+    )
@@ -0,0 +1,205 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Count, F, FilteredRelation, Q, Window
+from django.db.models.functions import RowNumber
+
+from account.models import Profile, Post, TimelineEntry
+
+Follow = Profile.following.through
+
+# ids bound into a single statement, under the 999 variables older SQLite
+# builds allow
+ID_BATCH_SIZE = 500
+
+
+def batched(ids, size=ID_BATCH_SIZE):
+    ids = iter(ids)
+    while batch := list(islice(ids, size)):
+        yield batch
+
+
+def follower_ids(profile_id):
+    return Follow.objects.filter(to_profile_id=profile_id).values_list(
+        "from_profile_id", flat=True
+    )
+
+
+def _insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=settings.TIMELINE_FANOUT_BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def trim(profile_ids):
+    """Drop the entries past ``TIMELINE_LENGTH`` from the given timelines."""
+    overflow = (
+        TimelineEntry.objects.filter(profile_id__in=profile_ids)
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F("profile_id"),
+                order_by=(F("pub_date").desc(), F("post_id").desc()),
+            )
+        )
+        .filter(position__gt=settings.TIMELINE_LENGTH)
+        .values_list("pk", flat=True)
+    )
+    for batch in batched(list(overflow)):
+        TimelineEntry.objects.filter(pk__in=batch).delete()
+
+
+def _fan_out(profile_ids, posts):
+    """Insert ``(post_id, pub_date)`` posts into the timelines of
+    ``profile_ids`` in batches, trimming every batch of timelines."""
+    batch = []
+    for profile_id in profile_ids:
+        batch.append(profile_id)
+        if (
+            len(batch) >= ID_BATCH_SIZE
+            or len(batch) * len(posts) >= settings.TIMELINE_FANOUT_BATCH_SIZE
+        ):
+            _fan_out_batch(batch, posts)
+            batch = []
+    if batch:
+        _fan_out_batch(batch, posts)
+
+
+def _fan_out_batch(profile_ids, posts):
+    _insert(
+        [
+            TimelineEntry(profile_id=profile_id, post_id=post_id, pub_date=pub_date)
+            for profile_id in profile_ids
+            for post_id, pub_date in posts
+        ]
+    )
+    trim(profile_ids)
+
+
+def fan_out_post(post):
+    """Push a new post into the timelines of its author and followers.
+
+    Authors flagged as high fan-out only get the entry in their own
+    timeline; their followers pull those posts at read time instead.
+    """
+    posts = [(post.pk, post.pub_date)]
+    _fan_out([post.author_id], posts)
+    if Profile.objects.filter(pk=post.author_id, is_high_fanout=True).exists():
+        return
+
+    _fan_out(
+        follower_ids(post.author_id).iterator(
+            chunk_size=settings.TIMELINE_FANOUT_BATCH_SIZE
+        ),
+        posts,
+    )
+
+
+def latest_posts(author_id):
+    return list(
+        Post.objects.filter(author_id=author_id)
+        .order_by("-pub_date", "-id")
+        .values_list("id", "pub_date")[: settings.TIMELINE_BACKFILL_SIZE]
+    )
+
+
+def backfill(profile_id, author_ids):
+    """Copy the latest posts of ``author_ids`` into a profile's timeline."""
+    author_ids = Profile.objects.filter(
+        pk__in=author_ids, is_high_fanout=False
+    ).values_list("pk", flat=True)
+    posts = [post for author_id in author_ids for post in latest_posts(author_id)]
+    if posts:
+        _fan_out([profile_id], posts)
+
+
+def backfill_followers(author_id):
+    """Copy the latest posts of an author into the timelines of all its
+    followers, when its posts stop being pulled at read time."""
+    posts = latest_posts(author_id)
+    if posts:
+        _fan_out(
+            follower_ids(author_id).iterator(
+                chunk_size=settings.TIMELINE_FANOUT_BATCH_SIZE
+            ),
+            posts,
+        )
+
+
+def remove_authors(profile_ids, author_ids):
+    TimelineEntry.objects.filter(
+        profile_id__in=profile_ids, post__author_id__in=author_ids
+    ).exclude(post__author_id=F("profile_id")).delete()
+
+
+def refresh_fanout_flags(profile_ids=None):
+    """Flag authors whose follower count exceeds ``TIMELINE_FANOUT_LIMIT``."""
+    profiles = Profile.objects.all()
+    if profile_ids is not None:
+        profiles = profiles.filter(pk__in=profile_ids)
+
+    counts = profiles.annotate(followers_total=Count("followers"))
+    # a single UPDATE over the grouped counts, whatever the number of profiles
+    Profile.objects.filter(
+        pk__in=counts.filter(
+            followers_total__gt=settings.TIMELINE_FANOUT_LIMIT, is_high_fanout=False
+        ).values("pk")
+    ).update(is_high_fanout=True)
+
+    lowered = counts.filter(
+        followers_total__lte=settings.TIMELINE_FANOUT_LIMIT, is_high_fanout=True
+    ).values_list("pk", flat=True)
+    for batch in batched(list(lowered)):
+        Profile.objects.filter(pk__in=batch).update(is_high_fanout=False)
+        # their followers no longer pull their posts
+        for author_id in batch:
+            backfill_followers(author_id)
+
+
+def rebuild(profile):
+    """Recompute a profile's timeline from its own and followed posts."""
+    TimelineEntry.objects.filter(profile=profile).delete()
+    authors = Profile.objects.filter(
+        Q(pk=profile.pk) | Q(followers=profile, is_high_fanout=False)
+    )
+    posts = Post.objects.filter(author__in=authors).values_list("id", "pub_date")
+    _insert(
+        [
+            TimelineEntry(profile=profile, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts[: settings.TIMELINE_LENGTH]
+        ]
+    )
+
+
+def pulled_author_ids(profile_id):
+    """Followed high fan-out authors, their posts are pulled at read time."""
+    return Follow.objects.filter(
+        from_profile_id=profile_id, to_profile__is_high_fanout=True
+    ).values_list("to_profile_id", flat=True)
+
+
+def home_feed(queryset, profile_id, pulled_author_ids):
+    """Legs of the home feed of ``profile_id`` over the posts of
+    ``queryset``, as ``(queryset, condition, ordering)`` for
+    ``FeedPagination``.
+
+    The materialized timeline is walked on ``account_timeline_feed_idx``
+    through the ``(pub_date, post_id)`` copy of the post ordering its
+    entries keep, and the posts of every pulled author on
+    ``account_post_author_idx``. Every leg stops at the page size.
+    """
+    entries = FilteredRelation(
+        "timeline_entries", condition=Q(timeline_entries__profile_id=profile_id)
+    )
+    legs = [
+        (
+            queryset.alias(feed_entry=entries),
+            Q(feed_entry__isnull=False),
+            ("-feed_entry__pub_date", "-feed_entry__post_id"),
+        )
+    ]
+    legs.extend(
+        (queryset, Q(author_id=author_id), ("-pub_date", "-id"))
+        for author_id in pulled_author_ids
+    )
+    return legs
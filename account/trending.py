@@ -0,0 +1,306 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from functools import lru_cache
+from itertools import islice
+
+import numpy as np
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from account.models import Post
+
+# (pub_date, tag) rows counted together while the sketches are refilled
+REBUILD_CHUNK = 2000
+
+
+def bucket_of(moment):
+    return int(moment.timestamp()) // settings.TRENDING["BUCKET_SECONDS"]
+
+
+def window_buckets(window=None, now=None):
+    """Ids of the buckets covering the last ``window`` seconds."""
+    config = settings.TRENDING
+    window = window or config["WINDOW_SECONDS"]
+    last = bucket_of(now or timezone.now())
+    count = max(1, -(-window // config["BUCKET_SECONDS"]))
+    return range(last - count + 1, last + 1)
+
+
+def cells(tag, depth, width):
+    """Column of ``tag`` in every row of a count-min sketch.
+
+    The hash is stable across processes so that redis sketches written by
+    one process can be read by another.
+    """
+    digest = hashlib.blake2b(tag.encode(), digest_size=4 * depth).digest()
+    return [
+        int.from_bytes(digest[4 * row : 4 * row + 4], "little") % width
+        for row in range(depth)
+    ]
+
+
+class LocalTrending:
+    """Per-process ring of count-min sketches with heavy-hitter candidates.
+
+    Every bucket holds a ``depth`` x ``width`` counter matrix estimating the
+    count of any tag and the ``candidates`` tags with the largest estimates,
+    so memory is bounded whatever the tag vocabulary.
+
+    A process only counts its own writes, so the ring is refilled from the
+    database when it is empty, e.g. after a restart, and every
+    ``refresh_seconds`` to pick up the writes of other processes. One
+    thread refills at a time while the others keep reading the old ring.
+    """
+
+    def __init__(self, depth, width, candidates, window_buckets, refresh_seconds=None):
+        self.depth = depth
+        self.width = width
+        self.candidates = candidates
+        self.window_buckets = window_buckets
+        self.refresh_seconds = refresh_seconds
+        self.loaded_at = None
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._refill_lock = threading.Lock()
+
+    def _bucket(self, bucket):
+        if bucket not in self._buckets:
+            horizon = max([bucket, *self._buckets]) - self.window_buckets
+            for stale in [b for b in self._buckets if b <= horizon]:
+                del self._buckets[stale]
+            self._buckets[bucket] = (
+                np.zeros((self.depth, self.width), dtype=np.int32),
+                {},
+            )
+        return self._buckets[bucket]
+
+    def add(self, bucket, counts):
+        rows = np.arange(self.depth)
+        with self._lock:
+            sketch, candidates = self._bucket(bucket)
+            for tag, delta in counts.items():
+                columns = cells(tag, self.depth, self.width)
+                sketch[rows, columns] += delta
+                estimate = int(sketch[rows, columns].min())
+                if estimate <= 0:
+                    candidates.pop(tag, None)
+                    continue
+                candidates[tag] = estimate
+                if len(candidates) > self.candidates:
+                    del candidates[min(candidates, key=candidates.get)]
+
+    def top(self, buckets, limit):
+        with self._lock:
+            present = [self._buckets[b] for b in buckets if b in self._buckets]
+            tags = sorted({tag for _, candidates in present for tag in candidates})
+            if not tags:
+                return []
+            rows = np.arange(self.depth)[:, None]
+            columns = np.array([cells(tag, self.depth, self.width) for tag in tags]).T
+            totals = sum(sketch[rows, columns].min(axis=0) for sketch, _ in present)
+        return rank(tags, totals, limit)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self.loaded_at = None
+
+    def stale(self):
+        if self.loaded_at is None:
+            return True
+        if self.refresh_seconds is None:
+            return False
+        return time.monotonic() - self.loaded_at > self.refresh_seconds
+
+    def replace(self, chunks):
+        """Swap the ring for the sum of the ``{bucket: counts}`` of
+        ``chunks``."""
+        ring = LocalTrending(
+            self.depth, self.width, self.candidates, self.window_buckets
+        )
+        for buckets in chunks:
+            for bucket, counts in sorted(buckets.items()):
+                ring.add(bucket, counts)
+        with self._lock:
+            self._buckets = ring._buckets
+            self.loaded_at = time.monotonic()
+
+    def refill(self, rebuild):
+        """Call ``rebuild`` unless another thread is refilling the ring, an
+        empty ring waits for it instead."""
+        if not self._refill_lock.acquire(blocking=self.loaded_at is None):
+            return
+        try:
+            if self.stale():
+                rebuild()
+        finally:
+            self._refill_lock.release()
+
+
+class RedisTrending:
+    """The same sketches shared by all processes: a hash of counter cells
+    and a sorted set of candidates per bucket, expiring with the window."""
+
+    def __init__(self, url, depth, width, candidates, ttl):
+        self.client = redis.Redis.from_url(url)
+        self.depth = depth
+        self.width = width
+        self.candidates = candidates
+        self.ttl = ttl
+
+    def sketch_key(self, bucket):
+        return f"trending:sketch:{bucket}"
+
+    def candidates_key(self, bucket):
+        return f"trending:top:{bucket}"
+
+    def fields(self, tag):
+        columns = cells(tag, self.depth, self.width)
+        return [f"{row}:{column}" for row, column in enumerate(columns)]
+
+    def add(self, bucket, counts):
+        sketch_key = self.sketch_key(bucket)
+        candidates_key = self.candidates_key(bucket)
+        tags = list(counts)
+        pipeline = self.client.pipeline(transaction=False)
+        for tag in tags:
+            for field in self.fields(tag):
+                pipeline.hincrby(sketch_key, field, counts[tag])
+        pipeline.expire(sketch_key, self.ttl)
+        values = pipeline.execute()
+
+        pipeline = self.client.pipeline(transaction=False)
+        for index, tag in enumerate(tags):
+            estimate = min(values[index * self.depth : (index + 1) * self.depth])
+            if estimate > 0:
+                pipeline.zadd(candidates_key, {tag: estimate})
+            else:
+                pipeline.zrem(candidates_key, tag)
+        pipeline.zremrangebyrank(candidates_key, 0, -self.candidates - 1)
+        pipeline.expire(candidates_key, self.ttl)
+        pipeline.execute()
+
+    def top(self, buckets, limit):
+        buckets = list(buckets)
+        pipeline = self.client.pipeline(transaction=False)
+        for bucket in buckets:
+            pipeline.zrange(self.candidates_key(bucket), 0, -1)
+        tags = sorted(
+            {tag.decode() for members in pipeline.execute() for tag in members}
+        )
+        if not tags:
+            return []
+
+        fields = [field for tag in tags for field in self.fields(tag)]
+        pipeline = self.client.pipeline(transaction=False)
+        for bucket in buckets:
+            pipeline.hmget(self.sketch_key(bucket), fields)
+        totals = np.zeros(len(tags), dtype=np.int64)
+        for values in pipeline.execute():
+            counters = np.array([int(value or 0) for value in values])
+            totals += counters.reshape(len(tags), self.depth).min(axis=1)
+        return rank(tags, totals, limit)
+
+    def clear(self):
+        for key in self.client.scan_iter("trending:*"):
+            self.client.delete(key)
+
+    def stale(self):
+        # shared by all processes, refilled by rebuild_trending_tags
+        return False
+
+    def replace(self, chunks):
+        self.clear()
+        for buckets in chunks:
+            for bucket, counts in sorted(buckets.items()):
+                self.add(bucket, counts)
+
+
+def rank(tags, totals, limit):
+    ranked = sorted(
+        ((tag, int(total)) for tag, total in zip(tags, totals) if total > 0),
+        key=lambda item: (-item[1], item[0]),
+    )
+    return ranked[:limit]
+
+
+@lru_cache(maxsize=None)
+def get_trending():
+    config = settings.TRENDING
+    window_buckets = -(-config["WINDOW_SECONDS"] // config["BUCKET_SECONDS"])
+    if config["BACKEND"] == "redis":
+        return RedisTrending(
+            config["REDIS_URL"],
+            config["DEPTH"],
+            config["WIDTH"],
+            config["CANDIDATES"],
+            config["WINDOW_SECONDS"] + config["BUCKET_SECONDS"],
+        )
+    return LocalTrending(
+        config["DEPTH"],
+        config["WIDTH"],
+        config["CANDIDATES"],
+        window_buckets,
+        config["LOCAL_REFRESH_SECONDS"],
+    )
+
+
+def count(pub_date, tags, delta=1):
+    """Count ``tags`` of a post published at ``pub_date`` after commit.
+
+    Tags are counted in the bucket of the post's publication, so removing
+    a tag later subtracts it from the bucket it was added to. Posts older
+    than the window are ignored.
+    """
+    bucket = bucket_of(pub_date)
+    tags = list(tags)
+    if not tags or bucket not in window_buckets():
+        return
+    counts = {tag: delta for tag in tags}
+    transaction.on_commit(lambda: get_trending().add(bucket, counts))
+
+
+def top(limit=10, window=None):
+    """``[(tag, count), ...]`` of the most used tags in the last ``window``
+    seconds, estimated from the sketches. Only an empty or stale local ring
+    is refilled from the database first."""
+    if get_trending().stale():
+        get_trending().refill(lambda: rebuild(recent_tags()))
+    return get_trending().top(window_buckets(window), limit)
+
+
+def recent_tags():
+    """``(pub_date, tag)`` rows of the posts published within the window."""
+    since = timezone.now() - timedelta(seconds=settings.TRENDING["WINDOW_SECONDS"])
+    return (
+        Post.objects.filter(pub_date__gte=since, tags__isnull=False)
+        .values_list("pub_date", "tags__name")
+        .iterator(chunk_size=2000)
+    )
+
+
+def rebuild(posts):
+    """Refill the sketches from ``(pub_date, tag)`` rows of recent posts,
+    streamed ``REBUILD_CHUNK`` rows at a time."""
+    current = set(window_buckets())
+    counted = 0
+
+    def chunks():
+        nonlocal counted
+        rows = iter(posts)
+        while chunk := list(islice(rows, REBUILD_CHUNK)):
+            buckets = {}
+            for pub_date, tag in chunk:
+                bucket = bucket_of(pub_date)
+                if bucket in current:
+                    buckets.setdefault(bucket, Counter())[tag] += 1
+                    counted += 1
+            yield buckets
+
+    get_trending().replace(chunks())
+    return counted
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework import routers
 
-from account import views
+from account import async_views, views
 from account.views import ReactionViewSet
 
 router = routers.DefaultRouter()
@@ -12,6 +12,24 @@ router.register("comments", views.CommentViewSet)
 router.register(r"reactions", ReactionViewSet, basename="reaction")
 
 
-urlpatterns = [path("", include(router.urls))]
+urlpatterns = [
+    path("", include(router.urls)),
+    path("async/posts/", async_views.FeedView.as_view(), name="async-post-list"),
+    path(
+        "async/posts/<int:pk>/",
+        async_views.PostDetailView.as_view(),
+        name="async-post-detail",
+    ),
+    path(
+        "async/stream/",
+        async_views.EventStreamView.as_view(),
+        name="async-event-stream",
+    ),
+    path(
+        "async/profiles/<int:pk>/",
+        async_views.ProfileDetailView.as_view(),
+        name="async-profile-detail",
+    ),
+]
 
 app_name = "account"
@@ -1,18 +1,48 @@
-from django.db.models import Q
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, status
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 
-from account.models import Profile, Post, Comment, Reaction
+from user.authentication import CachedTokenAuthentication
+from user.throttling import RateLimitMixin
+from account import (
+    bulk,
+    counters,
+    export,
+    graph,
+    profile_search,
+    search,
+    trending,
+)
+from account.conditional import ConditionalGetMixin
+from account.fast_serializers import FastListMixin
+from account.query_planning import plan_queryset
+from account.replicas import ReplicaReadMixin
+from account.representation_cache import CachedRepresentationMixin
+from account.pagination import (
+    FeedPagination,
+    CommentPagination,
+    ReactionPagination,
+)
+from account.models import FollowSuggestion, Profile, Post, Comment, Reaction
 from account.permissions import IsOwnerOrReadOnly
 from account.serializers import (
+    BulkFollowSerializer,
+    BulkReactionSerializer,
+    FollowerSerializer,
+    FollowSuggestionSerializer,
     ProfileSerializer,
     PostSerializer,
     CommentSerializer,
     ProfileListSerializer,
     ProfileRetrieveSerializer,
+    ProfileSearchSerializer,
     PostRetrieveSerializer,
     ReactionSerializer,
     ReactionListSerializer,
@@ -26,10 +56,17 @@ from account.serializers import (
     "Allows authenticated users to retrieve or "
     "update their profile information.",
 )
-class ProfileViewSet(viewsets.ModelViewSet):
+class ProfileViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    FastListMixin,
+    CachedRepresentationMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Profile.objects.all()
     serializer_class = ProfileSerializer
-    authentication_classes = (TokenAuthentication,)
+    conditional_actions = {"retrieve": ()}
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (
         IsAuthenticated,
         IsOwnerOrReadOnly,
@@ -50,15 +87,14 @@ class ProfileViewSet(viewsets.ModelViewSet):
             last_name = self.request.query_params.get("last_name")
             first_name = self.request.query_params.get("first_name")
             if last_name:
-                return queryset.filter(last_name__icontains=last_name)
+                queryset = queryset.filter(last_name__icontains=last_name)
             elif first_name:
-                return queryset.filter(first_name__icontains=first_name)
-            return queryset.all()
+                queryset = queryset.filter(first_name__icontains=first_name)
 
         if self.action == "retrieve":
-            return queryset.filter(user=self.request.user)
+            queryset = queryset.filter(user=self.request.user)
 
-        return queryset
+        return plan_queryset(queryset, self.get_serializer_class())
 
     @extend_schema(
         parameters=[
@@ -77,6 +113,141 @@ class ProfileViewSet(viewsets.ModelViewSet):
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="q",
+                type={"type": "string"},
+                description="typeahead over first name, last name and email, "
+                "every word matches as a prefix, ex. (?q=vol stru)",
+                required=True,
+            ),
+            OpenApiParameter(
+                name="limit",
+                type={"type": "integer"},
+                description="number of results, 10 by default, 50 at most",
+            ),
+        ],
+        responses=ProfileSearchSerializer(many=True),
+    )
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), 50)
+        except ValueError:
+            return Response(
+                {"error": "Must be integer limit"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        profile_ids = profile_search.search(
+            request.query_params.get("q", ""), limit=limit
+        )
+        profiles = Profile.objects.select_related("user").in_bulk(profile_ids)
+        serializer = ProfileSearchSerializer(
+            [profiles[pk] for pk in profile_ids if pk in profiles], many=True
+        )
+        return Response({"results": serializer.data})
+
+    @extend_schema(
+        request=BulkFollowSerializer,
+        responses={
+            200: {
+                "type": "object",
+                "properties": {
+                    "results": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "id": {"type": "integer"},
+                                "action": {"enum": ["follow", "unfollow"]},
+                                "status": {"type": "string"},
+                            },
+                        },
+                    }
+                },
+            }
+        },
+        description="Follow and unfollow many profiles in one transaction.",
+    )
+    @action(detail=False, methods=["post"], url_path="bulk-follow")
+    def bulk_follow(self, request):
+        serializer = BulkFollowSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = bulk.bulk_follow(
+            request.user.profile,
+            follow_ids=serializer.validated_data["follow"],
+            unfollow_ids=serializer.validated_data["unfollow"],
+        )
+        return Response({"results": results})
+
+    @extend_schema(
+        responses=FollowSuggestionSerializer(many=True),
+        description="People you may know: friends of friends ranked by mutual "
+        "follows and shared tags, refreshed by a background job.",
+    )
+    @action(detail=False, methods=["get"])
+    def suggestions(self, request):
+        profile = request.user.profile
+        suggestions = FollowSuggestion.objects.filter(profile=profile).select_related(
+            "suggested"
+        )
+        # follows made since the last refresh
+        following = graph.following_ids(profile.pk)
+        serializer = FollowSuggestionSerializer(
+            [
+                suggestion
+                for suggestion in suggestions
+                if suggestion.suggested_id not in following
+            ],
+            many=True,
+        )
+        return Response({"results": serializer.data})
+
+    @extend_schema(
+        request=None,
+        responses={
+            200: {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "is_following": {"type": "boolean"},
+                    "is_followed_by": {"type": "boolean"},
+                    "common_following": {
+                        "type": "array",
+                        "items": {"type": "object"},
+                    },
+                },
+            }
+        },
+        description="How the current user and the profile follow each other "
+        "and which profiles both of them follow.",
+    )
+    @action(detail=True, methods=["get"])
+    def relationship(self, request, pk=None):
+        other = get_object_or_404(Profile.objects.only("id"), pk=pk)
+        profile_id = request.user.profile.pk
+
+        common = sorted(graph.common_following(profile_id, other.pk))
+        profiles = Profile.objects.only("id", "first_name", "last_name").in_bulk(common)
+        return Response(
+            {
+                "id": other.pk,
+                "is_following": graph.is_following(profile_id, other.pk),
+                "is_followed_by": graph.is_following(other.pk, profile_id),
+                "common_following": FollowerSerializer(
+                    [
+                        profiles[related_id]
+                        for related_id in common
+                        if related_id in profiles
+                    ],
+                    many=True,
+                ).data,
+            }
+        )
+
 
 @extend_schema(
     tags=["Reaction"],
@@ -84,13 +255,21 @@ class ProfileViewSet(viewsets.ModelViewSet):
     "Allows authenticated users to like or dislike posts and "
     "retrieve existing reactions.",
 )
-class ReactionViewSet(viewsets.ModelViewSet):
+class ReactionViewSet(RateLimitMixin, FastListMixin, viewsets.ModelViewSet):
     serializer_class = ReactionSerializer
+    pagination_class = ReactionPagination
+    throttle_scopes = {
+        "create": "reactions",
+        "update": "reactions",
+        "partial_update": "reactions",
+        "destroy": "reactions",
+        "bulk": "reactions.bulk",
+    }
     permission_classes = (
         IsOwnerOrReadOnly,
         IsAuthenticated,
     )
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
 
     def get_queryset(self):
         return Reaction.objects.filter(user=self.request.user.profile)
@@ -107,12 +286,28 @@ class ReactionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Перевіряємо, чи вже існує реакція
-        reaction, created = Reaction.objects.update_or_create(
-            user=user,
-            post_id=post_id,
-            defaults={"reaction_type": reaction_type},
-        )
+        if reaction_type not in Reaction.ReactionChoices.values:
+            return Response(
+                {"error": "Unknown reaction_type"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        with transaction.atomic():
+            # the post row serializes reactions to it, a missing reaction row
+            # could not be locked
+            get_object_or_404(Post.objects.select_for_update().only("id"), pk=post_id)
+            # Перевіряємо, чи вже існує реакція
+            previous_type = (
+                Reaction.objects.filter(user=user, post_id=post_id)
+                .values_list("reaction_type", flat=True)
+                .first()
+            )
+            reaction, created = Reaction.objects.update_or_create(
+                user=user,
+                post_id=post_id,
+                defaults={"reaction_type": reaction_type},
+            )
+            counters.reaction_changed(post_id, previous_type, reaction.reaction_type)
 
         serializer = self.get_serializer(reaction)
         return Response(
@@ -120,6 +315,54 @@ class ReactionViewSet(viewsets.ModelViewSet):
             status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
         )
 
+    @extend_schema(
+        request=BulkReactionSerializer,
+        responses={
+            200: {
+                "type": "object",
+                "properties": {
+                    "results": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "post": {"type": "integer"},
+                                "reaction_type": {"type": "string"},
+                                "status": {"type": "string"},
+                            },
+                        },
+                    }
+                },
+            }
+        },
+        description="Like or dislike many posts in one transaction.",
+    )
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        serializer = BulkReactionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = bulk.bulk_react(
+            request.user.profile, serializer.validated_data["reactions"]
+        )
+        return Response({"results": results})
+
+    def perform_update(self, serializer):
+        previous = serializer.instance
+        previous_post_id, previous_type = previous.post_id, previous.reaction_type
+
+        with transaction.atomic():
+            reaction = serializer.save()
+            if reaction.post_id != previous_post_id:
+                counters.reaction_changed(previous_post_id, old_type=previous_type)
+                counters.reaction_changed(
+                    reaction.post_id, new_type=reaction.reaction_type
+                )
+            else:
+                counters.reaction_changed(
+                    reaction.post_id, previous_type, reaction.reaction_type
+                )
+
     def get_serializer_class(self):
         if self.action == "list":
             return ReactionListSerializer
@@ -133,11 +376,23 @@ class ReactionViewSet(viewsets.ModelViewSet):
     "and deleting posts. Allows authenticated users to "
     "manage their posts.",
 )
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    FastListMixin,
+    CachedRepresentationMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
+    pagination_class = FeedPagination
+    # the feed renders author names, it stays uncached
+    cached_representation_actions = ("retrieve",)
+    # and its validators cover the authors' versions
+    conditional_actions = {"retrieve": (), "list": ("author",)}
+    row_columns = ("author_id",)
     permission_classes = (IsOwnerOrReadOnly, IsAuthenticated)
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -149,13 +404,10 @@ class PostViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         queryset = self.queryset
-        profile = self.request.user.profile
-        following = profile.following.all()
 
         if self.action == "list":
-            queryset = queryset.filter(
-                Q(author=profile) | Q(author__in=following)
-            ).prefetch_related("author__user__profile")
+            # FeedPagination restricts the posts to the home feed and pages it
+            queryset = queryset.prefetch_related("author__user__profile")
 
             hash_tags = self.request.query_params.get("tags")
             if hash_tags:
@@ -173,6 +425,126 @@ class PostViewSet(viewsets.ModelViewSet):
 
         return super().update(request, *args, **kwargs)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="q",
+                type={"type": "string"},
+                description="search in title, description and tags, "
+                "a trailing * matches a prefix, ex. (?q=djan*)",
+                required=True,
+            ),
+            OpenApiParameter(
+                name="limit",
+                type={"type": "integer"},
+                description="number of results, 20 by default, 100 at most",
+            ),
+            OpenApiParameter(
+                name="offset",
+                type={"type": "integer"},
+                description="number of ranked results to skip",
+            ),
+        ],
+        responses=PostListSerializer(many=True),
+    )
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response({"error": "Must be q"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get("limit", 20)), 1), 100)
+            offset = max(int(request.query_params.get("offset", 0)), 0)
+        except ValueError:
+            return Response(
+                {"error": "Must be integer limit and offset"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        post_ids = search.search(query, limit=limit, offset=offset)
+        posts = plan_queryset(
+            Post.objects.filter(id__in=post_ids), PostListSerializer
+        ).in_bulk()
+        serializer = PostListSerializer(
+            [posts[post_id] for post_id in post_ids if post_id in posts],
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return Response({"results": serializer.data})
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="limit",
+                type={"type": "integer"},
+                description="number of tags, 10 by default, 50 at most",
+            ),
+            OpenApiParameter(
+                name="window",
+                type={"type": "integer"},
+                description="minutes to look back, 24 hours by default and at most",
+            ),
+        ],
+        responses={
+            200: {
+                "type": "object",
+                "properties": {
+                    "results": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "tag": {"type": "string"},
+                                "count": {"type": "integer"},
+                            },
+                        },
+                    }
+                },
+            }
+        },
+        description="Most used tags of recently published posts, estimated "
+        "from time-bucketed count-min sketches.",
+    )
+    @action(detail=False, methods=["get"], url_path="trending-tags")
+    def trending_tags(self, request):
+        maximum = settings.TRENDING["WINDOW_SECONDS"]
+        try:
+            limit = min(int(request.query_params.get("limit", 10)), 50)
+            window = int(request.query_params.get("window", maximum // 60)) * 60
+        except ValueError:
+            return Response(
+                {"error": "Must be integer limit and window"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        tags = trending.top(limit=max(limit, 0), window=min(max(window, 60), maximum))
+        return Response(
+            {"results": [{"tag": tag, "count": count} for tag, count in tags]}
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="compression",
+                type={"type": "string", "enum": ["gzip"]},
+                description="gzip compress the export, ex. (?compression=gzip)",
+            ),
+        ],
+        responses={(200, "application/x-ndjson"): bytes},
+    )
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """Stream the user's posts with tags, comments and reactions as NDJSON."""
+        compress = request.query_params.get("compression") == "gzip"
+        posts = Post.objects.filter(author=request.user.profile)
+        response = StreamingHttpResponse(
+            export.export(posts, compress=compress),
+            content_type="application/gzip" if compress else "application/x-ndjson",
+        )
+        filename = "posts.ndjson.gz" if compress else "posts.ndjson"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -192,11 +564,50 @@ class PostViewSet(viewsets.ModelViewSet):
     "updating, and deleting comments. "
     "Allows users to interact with comments on posts.",
 )
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(RateLimitMixin, CachedRepresentationMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
-    authentication_classes = (TokenAuthentication,)
+    pagination_class = CommentPagination
+    throttle_scopes = {
+        "create": "comments",
+        "update": "comments",
+        "partial_update": "comments",
+        "destroy": "comments",
+    }
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (
         IsOwnerOrReadOnly,
         IsAuthenticated,
     )
+
+    def get_queryset(self):
+        queryset = self.queryset
+
+        if self.action == "list":
+            post_id = self.request.query_params.get("post")
+            if post_id:
+                if not post_id.isdigit():
+                    raise ValidationError({"post": "A valid integer is required."})
+                queryset = queryset.filter(post_id=post_id)
+        return queryset
+
+    def perform_update(self, serializer):
+        previous_post_id = serializer.instance.post_id
+
+        with transaction.atomic():
+            comment = serializer.save()
+            if comment.post_id != previous_post_id:
+                counters.comment_removed(previous_post_id)
+                counters.comment_added(comment.post_id)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="post",
+                type={"type": "integer"},
+                description="comments of a single post, newest first, ex. (?post=1)",
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
@@ -25,7 +25,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv("SECRET_KEY")
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv("DEBUG", "True") == "True"
 
 ALLOWED_HOSTS = []
 
@@ -42,7 +42,6 @@ INSTALLED_APPS = [
     "user",
     "taggit",
     "rest_framework",
-    "debug_toolbar",
     "rest_framework.authtoken",
     "drf_spectacular",
 ]
@@ -52,16 +51,22 @@ TAGGIT_CASE_INSENSITIVE = True
 AUTH_USER_MODEL = "user.User"
 
 MIDDLEWARE = [
+    "account.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "account.replicas.ReplicaPinMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# The debug toolbar instruments every request and is only for development.
+if DEBUG:
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.insert(2, "debug_toolbar.middleware.DebugToolbarMiddleware")
+
 ROOT_URLCONF = "social_media_api.urls"
 
 TEMPLATES = [
@@ -85,12 +90,83 @@ WSGI_APPLICATION = "social_media_api.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# DB_ENGINE=postgresql switches to PostgreSQL configured by the POSTGRES_*
+# variables, with a psycopg connection pool (DB_POOL_MAX_SIZE connections
+# per process) or persistent connections when DB_POOL=0. POSTGRES_REPLICA_HOST
+# adds a "replica" alias that PostViewSet/ProfileViewSet reads go to.
+#
+# SQLite runs in WAL mode so that readers never block the writer, waits up
+# to DB_TIMEOUT seconds on a locked database and takes the write lock when
+# a transaction begins, instead of failing with "database is locked" when
+# two transactions try to upgrade their read locks.
+
+if os.getenv("DB_ENGINE") == "postgresql":
+
+    def postgres(host):
+        database = {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("POSTGRES_DB"),
+            "USER": os.getenv("POSTGRES_USER"),
+            "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
+            "HOST": host,
+            "PORT": os.getenv("POSTGRES_PORT", "5432"),
+            "OPTIONS": {},
+        }
+        if os.getenv("DB_POOL", "1") == "1":
+            database["OPTIONS"]["pool"] = {
+                "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+                "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+                "timeout": int(os.getenv("DB_POOL_TIMEOUT", 10)),
+            }
+        else:
+            database["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", 60))
+            database["CONN_HEALTH_CHECKS"] = True
+        return database
+
+    DATABASES = {"default": postgres(os.getenv("POSTGRES_HOST", "localhost"))}
+    if os.getenv("POSTGRES_REPLICA_HOST"):
+        DATABASES["replica"] = postgres(os.getenv("POSTGRES_REPLICA_HOST"))
+        DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+            "OPTIONS": {
+                "timeout": int(os.getenv("DB_TIMEOUT", 20)),
+                "transaction_mode": "IMMEDIATE",
+                "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL",
+            },
+        }
+    }
+
+DATABASE_ROUTERS = ["account.replicas.PrimaryReplicaRouter"]
+
+# Reads of a user go to the primary for REPLICA_PIN_SECONDS after a write of
+# theirs, so they see their own changes despite replication lag. The pins
+# live in the default cache, a replica requires REDIS_URL.
+REPLICA_PIN_SECONDS = 5
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
     }
-}
+
+# Whether every process sees the default cache. What one process writes to
+# the local memory fallback, invalidations included, stays in that process.
+SHARED_CACHE = bool(os.getenv("REDIS_URL"))
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -129,6 +205,32 @@ STATIC_URL = "static/"
 MEDIA_ROOT = BASE_DIR / "media"
 MEDIA_URL = "/media/"
 
+# Post full-text search: "fts5" (SQLite only), "table" or "auto".
+POST_SEARCH_BACKEND = "auto"
+
+# Renditions generated for uploaded Post/Profile images, bounded to the
+# given (width, height) and re-encoded without EXIF metadata.
+IMAGE_RENDITIONS = {
+    "thumbnail": (320, 320),
+    "medium": (1080, 1080),
+}
+IMAGE_RENDITION_FORMAT = "WEBP"
+IMAGE_RENDITION_QUALITY = 82
+
+# Celery
+# https://docs.celeryq.dev/en/stable/django/first-steps-with-django.html
+# Without a configured broker tasks run eagerly in-process.
+
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "memory://")
+CELERY_TASK_ALWAYS_EAGER = not os.getenv("CELERY_BROKER_URL")
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_BEAT_SCHEDULE = {
+    "refresh-follow-suggestions": {
+        "task": "account.tasks.refresh_follow_suggestions",
+        "schedule": 600,
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -141,11 +243,137 @@ INTERNAL_IPS = [
 ]
 
 REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "account.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 2,
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # client IPs of the throttles: X-Forwarded-For is only trusted for the
+    # addresses appended by this many reverse proxies, none by default
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", 0)),
+}
+
+# Resolved tokens are kept in a per-process LRU in front of the default
+# cache. Logout, deactivation and password changes delete the cache entry
+# and a local hit only counts while it exists, so with a shared cache every
+# process stops accepting the token at once. Without one the entry is per
+# process too: other processes keep accepting an invalidated token for up
+# to SHARED_TTL seconds.
+TOKEN_AUTH_CACHE = {
+    "LOCAL_TTL": 30,
+    "LOCAL_MAX_SIZE": 10000,
+    "SHARED_TTL": 300 if SHARED_CACHE else 5,
 }
 
+# Lifetime of cached per-object API representations, they are invalidated
+# by version bumps on every relevant write. Without a shared cache the bumps
+# only reach the writing process, so versions and representations expire
+# after REPRESENTATION_CACHE_LOCAL_TIMEOUT, which bounds how long other
+# processes serve stale bodies and ETags.
+REPRESENTATION_CACHE_TIMEOUT = 3600
+REPRESENTATION_CACHE_LOCAL_TIMEOUT = 5
+
+# Largest number of items accepted by the bulk follow/reaction endpoints.
+BULK_MAX_ITEMS = 500
+
+# Home timeline fan-out. Authors with more followers than the limit are not
+# pushed into follower timelines; their posts are pulled at read time.
+TIMELINE_FANOUT_LIMIT = 10000
+TIMELINE_FANOUT_BATCH_SIZE = 1000
+TIMELINE_BACKFILL_SIZE = 200
+TIMELINE_LENGTH = 1000
+
+# Server-sent events. Every connection buffers at most BUFFER_SIZE events,
+# older ones are dropped for slow clients. With REDIS_URL set, events are
+# relayed between processes through redis.
+REALTIME = {
+    "HUB": os.getenv("REALTIME_HUB", "redis" if os.getenv("REDIS_URL") else "local"),
+    "REDIS_URL": os.getenv("REDIS_URL"),
+    "BUFFER_SIZE": 100,
+    "KEEPALIVE": 15,
+    "RETRY_MS": 5000,
+}
+
+# Follower/following adjacency sets. The local backend keeps them in a
+# per-process LRU whose TTL bounds staleness across processes, the redis
+# backend shares them between processes.
+FOLLOW_GRAPH = {
+    "BACKEND": os.getenv(
+        "FOLLOW_GRAPH_BACKEND", "redis" if os.getenv("REDIS_URL") else "local"
+    ),
+    "REDIS_URL": os.getenv("REDIS_URL"),
+    "TTL": 300,
+    "LOCAL_MAX_SIZE": 20000,
+}
+
+# "People you may know": the TOP_K best friends-of-friends of every profile,
+# scored by mutual follows plus TAG_WEIGHT times the cosine similarity of
+# the tags they post. Stale profiles are recomputed in batches of
+# BATCH_SIZE by the refresh_follow_suggestions task.
+FOLLOW_SUGGESTIONS = {
+    "TOP_K": 20,
+    "TAG_WEIGHT": 2.0,
+    "BATCH_SIZE": 500,
+}
+
+# Trending tags over the last WINDOW_SECONDS in buckets of BUCKET_SECONDS.
+# Every bucket is a DEPTH x WIDTH count-min sketch plus the CANDIDATES tags
+# with the highest estimates, kept in redis or per process, where they are
+# refilled from the database every LOCAL_REFRESH_SECONDS.
+TRENDING = {
+    "BACKEND": os.getenv(
+        "TRENDING_BACKEND", "redis" if os.getenv("REDIS_URL") else "local"
+    ),
+    "REDIS_URL": os.getenv("REDIS_URL"),
+    "BUCKET_SECONDS": 300,
+    "WINDOW_SECONDS": 24 * 60 * 60,
+    "DEPTH": 4,
+    "WIDTH": 2048,
+    "CANDIDATES": 100,
+    "LOCAL_REFRESH_SECONDS": 60,
+}
+
+# Token buckets of the write endpoints. A scope allows a burst of <count>
+# requests refilled over <period> per user and per client IP, the buckets
+# are kept per process in SHARDS locked LRUs or shared in redis.
+THROTTLING = {
+    "ENABLED": os.getenv("THROTTLING_ENABLED", "True") == "True",
+    "BACKEND": os.getenv(
+        "THROTTLING_BACKEND", "redis" if os.getenv("REDIS_URL") else "local"
+    ),
+    "REDIS_URL": os.getenv("REDIS_URL"),
+    "SHARDS": 16,
+    "LOCAL_MAX_SIZE": 100000,
+    "SCOPES": {
+        "reactions": {"user": "60/min", "ip": "600/min"},
+        "reactions.bulk": {"user": "10/min", "ip": "100/min"},
+        "comments": {"user": "30/min", "ip": "300/min"},
+        "register": {"user": "10/hour", "ip": "20/hour"},
+    },
+}
+
+# Per view action histograms exposed at /metrics/ in the Prometheus text
+# format and a log of the last SLOW_LOG_SIZE requests slower than
+# SLOW_REQUEST_MS with up to SLOW_LOG_STATEMENTS of their SQL statements at
+# /metrics/slow/. Both are served to INTERNAL_IPS, or with a bearer TOKEN.
+METRICS = {
+    "ENABLED": os.getenv("METRICS_ENABLED", "True") == "True",
+    "TOKEN": os.getenv("METRICS_TOKEN"),
+    "SLOW_REQUEST_MS": 500,
+    "SLOW_LOG_SIZE": 100,
+    "SLOW_LOG_STATEMENTS": 50,
+}
+
+# List actions of viewsets with FastListMixin render their pages from
+# values() rows instead of model instances and serializer fields.
+FAST_LIST_SERIALIZERS = os.getenv("FAST_LIST_SERIALIZERS", "True") == "True"
+
+# Number of latest comments embedded in every post, the rest of a thread
+# is paged through the comment list.
+COMMENT_THREAD_SIZE = 3
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Social Media Project API",
     "DESCRIPTION": "Users can create and manage own profile,"
@@ -25,13 +25,15 @@ from drf_spectacular.views import (
 )
 
 
+from account import metrics
 from social_media_api import settings
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/account/", include("account.urls", namespace="account")),
     path("api/user/", include("user.urls", namespace="user")),
-    path("__debug__", include("debug_toolbar.urls")),
+    path("metrics/", metrics.metrics_view, name="metrics"),
+    path("metrics/slow/", metrics.slow_log_view, name="metrics-slow"),
     path("api/doc/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/doc/swagger/",
@@ -42,3 +44,6 @@ urlpatterns = [
         "api/doc/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"
     ),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+if "debug_toolbar" in settings.INSTALLED_APPS:
+    urlpatterns.append(path("__debug__", include("debug_toolbar.urls")))
@@ -0,0 +1,171 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class LocalTokenCache:
+    """Thread-safe in-process LRU of pickled (user, token) pairs with a TTL.
+
+    Entries are only deleted in the process that handled the change, other
+    processes drop theirs once the shared entry is gone.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def set(self, key, payload):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_tokens = LocalTokenCache(
+    max_size=settings.TOKEN_AUTH_CACHE["LOCAL_MAX_SIZE"],
+    ttl=settings.TOKEN_AUTH_CACHE["LOCAL_TTL"],
+)
+
+
+# never copied into the caches, loaded from the database on access
+UNCACHED = ("user__password",)
+
+
+def shared_key(key):
+    return f"auth-token:{key}"
+
+
+def invalidate_token(key):
+    local_tokens.delete(key)
+    cache.delete(shared_key(key))
+
+
+def invalidate_user(user_id):
+    for key in Token.objects.filter(user_id=user_id).values_list("key", flat=True):
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication resolving ``key -> (user, profile)`` from cache.
+
+    Lookups go to the in-process LRU first, then to the shared Django cache
+    and only then to the database, where the token, user and profile are
+    loaded with a single join. Warm requests issue no authentication
+    queries, and ``request.user.profile`` is served from the cached object.
+    The password hash is left out of the cached user.
+
+    Invalidations delete the shared entry, so a local hit only counts while
+    the shared entry still exists.
+    """
+
+    def authenticate_credentials(self, key):
+        payload = local_tokens.get(key)
+        if payload is not None and not cache.has_key(shared_key(key)):
+            local_tokens.delete(key)
+            payload = None
+        if payload is None:
+            payload = cache.get(shared_key(key))
+            if payload is None:
+                payload = self.load_credentials(key)
+                cache.set(
+                    shared_key(key),
+                    payload,
+                    timeout=settings.TOKEN_AUTH_CACHE["SHARED_TTL"],
+                )
+            local_tokens.set(key, payload)
+
+        # every request gets its own copy, cached objects are never mutated
+        user, token = pickle.loads(payload)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+
+        return (user, token)
+
+    def load_credentials(self, key):
+        model = self.get_model()
+        try:
+            token = (
+                model.objects.select_related("user__profile")
+                .defer(*UNCACHED)
+                .get(key=key)
+            )
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+        return pickle.dumps((token.user, token), pickle.HIGHEST_PROTOCOL)
+
+    async def aauthenticate(self, request):
+        """Async counterpart of ``authenticate`` for plain Django requests."""
+        auth = request.headers.get("Authorization", "").split()
+        if not auth or auth[0].lower() != self.keyword.lower():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_("Invalid token header."))
+
+        return await self.aauthenticate_credentials(auth[1])
+
+    async def aauthenticate_credentials(self, key):
+        payload = local_tokens.get(key)
+        if payload is not None and not await cache.ahas_key(shared_key(key)):
+            local_tokens.delete(key)
+            payload = None
+        if payload is None:
+            payload = await cache.aget(shared_key(key))
+            if payload is None:
+                payload = await self.aload_credentials(key)
+                await cache.aset(
+                    shared_key(key),
+                    payload,
+                    timeout=settings.TOKEN_AUTH_CACHE["SHARED_TTL"],
+                )
+            local_tokens.set(key, payload)
+
+        user, token = pickle.loads(payload)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+
+        return (user, token)
+
+    async def aload_credentials(self, key):
+        model = self.get_model()
+        try:
+            token = (
+                await model.objects.select_related("user__profile")
+                .defer(*UNCACHED)
+                .aget(key=key)
+            )
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+        return pickle.dumps((token.user, token), pickle.HIGHEST_PROTOCOL)
@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import invalidate_token, invalidate_user
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_cached_user(sender, instance, created, **kwargs):
+    # covers password changes, deactivation and any other profile edit
+    if not created:
+        invalidate_user(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
@@ -0,0 +1,112 @@
+import pickle
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from account.models import Profile
+from user.authentication import CachedTokenAuthentication, local_tokens, shared_key
+
+LOGOUT_URL = reverse("user:logout")
+MANAGE_URL = reverse("user:manage")
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email="cached@test.com", password="testpassword"
+        )
+        self.profile = Profile.objects.create(
+            user=self.user, first_name="cached", last_name="cached_last"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.authentication = CachedTokenAuthentication()
+
+    def tearDown(self) -> None:
+        local_tokens.clear()
+
+    def test_warm_lookup_issues_no_queries(self):
+        with self.assertNumQueries(1):
+            self.authentication.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            user, token = self.authentication.authenticate_credentials(self.token.key)
+            self.assertEqual(user.profile, self.profile)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_deactivation_invalidates(self):
+        self.authentication.authenticate_credentials(self.token.key)
+
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_invalidation_in_another_process_applies(self):
+        self.authentication.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            self.authentication.authenticate_credentials(self.token.key)
+
+        # deactivated by another process, which deleted the shared entry only
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        cache.delete(shared_key(self.token.key))
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_password_hash_is_not_cached(self):
+        self.authentication.authenticate_credentials(self.token.key)
+
+        for payload in (
+            local_tokens.get(self.token.key),
+            cache.get(shared_key(self.token.key)),
+        ):
+            user, _ = pickle.loads(payload)
+            self.assertNotIn("password", user.__dict__)
+            self.assertNotIn(self.user.password.encode(), payload)
+
+    def test_update_writes_a_fresh_user(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.authentication.authenticate_credentials(self.token.key)
+        # changed behind the cached user's back
+        get_user_model().objects.filter(pk=self.user.pk).update(is_staff=True)
+
+        response = client.patch(MANAGE_URL, {"email": "renamed@test.com"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, "renamed@test.com")
+        self.assertTrue(self.user.is_staff)
+        self.assertTrue(self.user.check_password("testpassword"))
+
+    def test_password_change_invalidates(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.authentication.authenticate_credentials(self.token.key)
+
+        response = client.patch(MANAGE_URL, {"password": "new-password"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(1):
+            user, _ = self.authentication.authenticate_credentials(self.token.key)
+        self.assertTrue(user.check_password("new-password"))
+
+    def test_logout_deletes_token(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.assertEqual(client.get(MANAGE_URL).status_code, status.HTTP_200_OK)
+
+        response = client.post(LOGOUT_URL)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+        self.assertEqual(
+            client.get(MANAGE_URL).status_code, status.HTTP_401_UNAUTHORIZED
+        )
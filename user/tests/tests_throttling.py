@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from account.models import Profile, Post, Reaction
+from user.throttling import LocalBuckets, get_buckets, parse_rate
+
+COMMENT_URL = reverse("account:comment-list")
+REACTION_URL = reverse("account:reaction-list")
+
+
+def scopes(**rates):
+    return {
+        **settings.THROTTLING,
+        "ENABLED": True,
+        "SCOPES": {scope.replace("_", "."): rate for scope, rate in rates.items()},
+    }
+
+
+class LocalBucketsTests(SimpleTestCase):
+    def test_buckets_refill_at_their_rate(self):
+        buckets = LocalBuckets(shards=4, max_size=100)
+        limit = ("key", *parse_rate("2/min"))
+
+        self.assertEqual(buckets.take([limit], now=0), (True, [1]))
+        self.assertEqual(buckets.take([limit], now=0), (True, [0]))
+        self.assertEqual(buckets.take([limit], now=15), (False, [0.5]))
+        self.assertEqual(buckets.take([limit], now=30), (True, [0]))
+        self.assertEqual(buckets.take([limit], now=1000), (True, [1]))
+
+    def test_empty_bucket_takes_from_none(self):
+        buckets = LocalBuckets(shards=4, max_size=100)
+        small = ("small", *parse_rate("1/min"))
+        large = ("large", *parse_rate("10/min"))
+
+        self.assertTrue(buckets.take([small, large], now=0)[0])
+        self.assertEqual(buckets.take([small, large], now=0), (False, [0, 9]))
+        self.assertEqual(buckets.take([large], now=0), (True, [8]))
+
+    def test_shards_are_bounded(self):
+        buckets = LocalBuckets(shards=2, max_size=4)
+        for index in range(100):
+            buckets.take([(f"key{index}", 1, 1)], now=0)
+        self.assertLessEqual(sum(len(shard) for _, shard in buckets._shards), 4)
+
+
+class ThrottledWriteTests(TestCase):
+    def setUp(self) -> None:
+        get_buckets().clear()
+        self.addCleanup(get_buckets().clear)
+        self.client = APIClient()
+        self.profiles = []
+        for index in range(2):
+            user = get_user_model().objects.create_user(
+                email=f"throttled{index}@test.com", password="testpassword"
+            )
+            self.profiles.append(
+                Profile.objects.create(
+                    user=user, first_name="throttled", last_name=f"last{index}"
+                )
+            )
+        self.post = Post.objects.create(
+            title="throttled", author=self.profiles[1], description="text"
+        )
+        self.client.force_authenticate(self.profiles[0].user)
+
+    def comment(self):
+        return self.client.post(
+            COMMENT_URL,
+            {
+                "author": self.profiles[0].id,
+                "post": self.post.id,
+                "description": "text",
+            },
+        )
+
+    @override_settings(THROTTLING=scopes(comments={"user": "2/min"}))
+    def test_user_bucket_limits_writes(self):
+        first, second, third = self.comment(), self.comment(), self.comment()
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(first["RateLimit-Limit"], "2")
+        self.assertEqual(first["RateLimit-Remaining"], "1")
+        self.assertEqual(first["RateLimit-Policy"], "2;w=60")
+        self.assertEqual(second["RateLimit-Remaining"], "0")
+        self.assertEqual(third.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(third["RateLimit-Remaining"], "0")
+        self.assertIn(third["Retry-After"], ("29", "30"))
+
+        self.client.force_authenticate(self.profiles[1].user)
+        self.assertEqual(self.comment().status_code, status.HTTP_201_CREATED)
+
+    @override_settings(THROTTLING=scopes(comments={"user": "2/min", "ip": "3/min"}))
+    def test_ip_bucket_is_shared_by_users(self):
+        self.comment()
+        self.comment()
+        self.client.force_authenticate(self.profiles[1].user)
+
+        response = self.comment()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response["RateLimit-Remaining"], "0")
+        self.assertEqual(response["RateLimit-Limit"], "3")
+        response = self.comment()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(THROTTLING=scopes(comments={"ip": "2/min"}))
+    def test_forwarded_for_header_does_not_pick_the_ip_bucket(self):
+        for index in range(2):
+            self.client.credentials(HTTP_X_FORWARDED_FOR=f"10.0.0.{index}")
+            self.assertEqual(self.comment().status_code, status.HTTP_201_CREATED)
+
+        self.client.credentials(HTTP_X_FORWARDED_FOR="10.0.0.2")
+        response = self.comment()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(THROTTLING=scopes(reactions={"user": "1/min"}))
+    def test_reads_and_other_scopes_are_not_throttled(self):
+        payload = {"post": self.post.id, "reaction_type": Reaction.ReactionChoices.LIKE}
+        self.assertEqual(
+            self.client.post(REACTION_URL, payload, format="json").status_code,
+            status.HTTP_201_CREATED,
+        )
+
+        response = self.client.get(REACTION_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("RateLimit-Limit", response)
+        self.assertEqual(self.comment().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            self.client.post(REACTION_URL, payload, format="json").status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+        )
+
+    @override_settings(
+        THROTTLING={**scopes(comments={"user": "1/min"}), "ENABLED": False}
+    )
+    def test_disabled(self):
+        for _ in range(3):
+            response = self.comment()
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertNotIn("RateLimit-Limit", response)
+
+    @override_settings(THROTTLING=scopes(comments={"user": "1/min"}))
+    def test_throttled_request_issues_no_queries(self):
+        self.comment()
+        with self.assertNumQueries(0):
+            response = self.comment()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
@@ -0,0 +1,202 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import ExitStack
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+# Refill and take one token from every bucket of KEYS, or from none of them
+# when one is empty. ARGV holds the capacity and refill rate per second of
+# every bucket, the reply is the allow flag followed by the bucket levels.
+TAKE = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local levels = {}
+local allowed = 1
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'at')
+    local level = capacity
+    if state[1] then
+        level = math.min(capacity, tonumber(state[1]) + (now - tonumber(state[2])) * rate)
+    end
+    levels[i] = level
+    if level < 1 then
+        allowed = 0
+    end
+end
+local reply = {allowed}
+for i, key in ipairs(KEYS) do
+    if allowed == 1 then
+        local capacity = tonumber(ARGV[2 * i - 1])
+        local rate = tonumber(ARGV[2 * i])
+        levels[i] = levels[i] - 1
+        redis.call('HSET', key, 'tokens', tostring(levels[i]), 'at', tostring(now))
+        redis.call('EXPIRE', key, math.ceil((capacity - levels[i]) / rate))
+    end
+    reply[i + 1] = tostring(levels[i])
+end
+return reply
+"""
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """``(capacity, tokens per second)`` of a ``"<count>/<period>"`` rate,
+    the bucket holds a whole period of requests."""
+    count, period = rate.split("/")
+    count = int(count)
+    return count, count / PERIODS[period[0]]
+
+
+def refill(state, capacity, rate, now):
+    if state is None:
+        return capacity
+    tokens, at = state
+    return min(capacity, tokens + (now - at) * rate)
+
+
+class LocalBuckets:
+    """Per-process token buckets in LRU shards with one lock each.
+
+    A bucket is two floats, its level and when it was last refilled. The
+    least recently used buckets of a full shard are dropped, which only
+    refills them early.
+    """
+
+    def __init__(self, shards, max_size):
+        self.max_size = max(1, max_size // shards)
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(shards)]
+
+    def take(self, limits, now=None):
+        """Take a token from every ``(key, capacity, rate)`` bucket if none
+        of them is empty, return whether they did and their levels."""
+        now = time.monotonic() if now is None else now
+        indexes = [hash(key) % len(self._shards) for key, _, _ in limits]
+        shards = [self._shards[index] for index in indexes]
+        with ExitStack() as stack:
+            # locks are taken in shard order so that requests never deadlock
+            for index in sorted(set(indexes)):
+                stack.enter_context(self._shards[index][0])
+
+            levels = [
+                refill(buckets.get(key), capacity, rate, now)
+                for (_, buckets), (key, capacity, rate) in zip(shards, limits)
+            ]
+            allowed = all(level >= 1 for level in levels)
+            if allowed:
+                levels = [level - 1 for level in levels]
+                for (_, buckets), (key, _, _), level in zip(shards, limits, levels):
+                    buckets[key] = (level, now)
+                    buckets.move_to_end(key)
+                    while len(buckets) > self.max_size:
+                        buckets.popitem(last=False)
+        return allowed, levels
+
+    def clear(self):
+        for lock, buckets in self._shards:
+            with lock:
+                buckets.clear()
+
+
+class RedisBuckets:
+    """The same buckets shared by all processes, one hash per bucket taken
+    and refilled atomically by a Lua script in a single round trip."""
+
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(TAKE)
+
+    def take(self, limits, now=None):
+        reply = self.script(
+            keys=[key for key, _, _ in limits],
+            args=[value for _, capacity, rate in limits for value in (capacity, rate)],
+        )
+        return bool(reply[0]), [float(level) for level in reply[1:]]
+
+    def clear(self):
+        for key in self.client.scan_iter("throttle:*"):
+            self.client.delete(key)
+
+
+@lru_cache(maxsize=None)
+def get_buckets():
+    config = settings.THROTTLING
+    if config["BACKEND"] == "redis":
+        return RedisBuckets(config["REDIS_URL"])
+    return LocalBuckets(config["SHARDS"], config["LOCAL_MAX_SIZE"])
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle the actions a view maps to a scope in ``throttle_scopes``.
+
+    Every scope of ``THROTTLING["SCOPES"]`` has a bucket per user and one
+    per client IP, shared by everyone behind it. A request takes a token
+    from each, without touching the database. Scopes missing from the
+    settings are not throttled.
+    """
+
+    def allow_request(self, request, view):
+        config = settings.THROTTLING
+        scope = view.throttle_scopes.get(
+            getattr(view, "action", None) or request.method.lower()
+        )
+        rates = config["SCOPES"].get(scope)
+        if not config["ENABLED"] or rates is None:
+            return True
+
+        limits = []
+        if "user" in rates and request.user.is_authenticated:
+            limits.append((f"throttle:{scope}:user:{request.user.pk}", rates["user"]))
+        if "ip" in rates:
+            limits.append(
+                (f"throttle:{scope}:ip:{self.get_ident(request)}", rates["ip"])
+            )
+        if not limits:
+            return True
+
+        limits = [(key, *parse_rate(rate)) for key, rate in limits]
+        allowed, levels = get_buckets().take(limits)
+        self.wait_seconds = max(
+            [(1 - level) / rate for (_, _, rate), level in zip(limits, levels)]
+        )
+        request.rate_limit = headers(limits, levels)
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+def headers(limits, levels):
+    """``RateLimit-*`` headers of the bucket closest to running out."""
+    (_, capacity, rate), level = min(
+        zip(limits, levels), key=lambda limit: math.floor(limit[1])
+    )
+    return {
+        "RateLimit-Limit": str(capacity),
+        "RateLimit-Remaining": str(max(0, math.floor(level))),
+        "RateLimit-Reset": str(math.ceil((capacity - level) / rate)),
+        "RateLimit-Policy": f"{capacity};w={round(capacity / rate)}",
+    }
+
+
+class RateLimitMixin:
+    """Throttle write actions with token buckets and report the remaining
+    quota in ``RateLimit-*`` headers, ``throttle_scopes`` maps actions (or
+    methods of plain views) to scopes of ``THROTTLING["SCOPES"]``."""
+
+    throttle_classes = (TokenBucketThrottle,)
+    throttle_scopes = {}
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        for header, value in getattr(request, "rate_limit", {}).items():
+            response.headers.setdefault(header, value)
+        return response
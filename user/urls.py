@@ -1,10 +1,11 @@
 from django.urls import path
 
-from user.views import CreateUserView, LoginUserView, ManageUserView
+from user.views import CreateUserView, LoginUserView, LogoutUserView, ManageUserView
 
 urlpatterns = [
     path("register/", CreateUserView.as_view(), name="create"),
     path("login/", LoginUserView.as_view(), name="token"),
+    path("logout/", LogoutUserView.as_view(), name="logout"),
     path("me/", ManageUserView.as_view(), name="manage"),
 ]
 
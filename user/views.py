@@ -1,10 +1,14 @@
-from rest_framework import generics
-from rest_framework.authentication import TokenAuthentication
+from django.contrib.auth import get_user_model
+from rest_framework import generics, status
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 from drf_spectacular.utils import extend_schema
 
+from user.authentication import CachedTokenAuthentication
+from user.throttling import RateLimitMixin
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
@@ -16,8 +20,9 @@ from user.serializers import UserSerializer, AuthTokenSerializer
     request=UserSerializer,
     responses={201: UserSerializer, 400: "Validation errors"},
 )
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(RateLimitMixin, generics.CreateAPIView):
     serializer_class = UserSerializer
+    throttle_scopes = {"post": "register"}
     permission_classes = (IsAuthenticated,)
 
 
@@ -46,6 +51,23 @@ class LoginUserView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
 
 
+@extend_schema(
+    tags=["Authentication"],
+    description="Endpoint for user logout. "
+    "Deletes the authentication token used for the request.",
+    request=None,
+    responses={204: None},
+)
+class LogoutUserView(APIView):
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        if request.auth is not None:
+            request.auth.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 @extend_schema(
     tags=["User Management"],
     description="Endpoint for retrieving and updating "
@@ -54,8 +76,11 @@ class LoginUserView(ObtainAuthToken):
 )
 class ManageUserView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
     def get_object(self):
+        if self.request.method in ("PUT", "PATCH"):
+            # the authenticated user comes from the token cache
+            return get_user_model().objects.get(pk=self.request.user.pk)
         return self.request.user